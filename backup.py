@@ -0,0 +1,156 @@
+"""Copias de seguridad en caliente de la base de datos con la API de backup de SQLite.
+
+Copiar el archivo .db mientras la aplicación escribe puede dar una copia corrupta; backup_database
+usa Connection.backup, que copia páginas de forma consistente. La copia avanza en tramos de
+`pages_per_step` páginas con una pausa entre tramos, y se ejecuta en un hilo con su propia
+conexión de solo lectura, así que la interfaz y las escrituras no se detienen.
+
+Las copias se guardan con fecha y hora en el nombre (opcionalmente comprimidas con gzip) y solo se
+conservan las `keep` más recientes. BackupScheduler las programa periódicamente desde el bucle de Tk.
+"""
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from urllib.request import pathname2url
+
+INTERVAL_ENV_VAR = "BARBATE_BACKUP_INTERVAL_MIN"
+KEEP_ENV_VAR = "BARBATE_BACKUP_KEEP"
+DEFAULT_BACKUP_FOLDER = "data/backups"
+DEFAULT_INTERVAL_MINUTES = 60       # 0 desactiva las copias programadas
+DEFAULT_KEEP = 10
+DEFAULT_PAGES_PER_STEP = 256        # Con páginas de 4 KiB, 1 MB por tramo
+DEFAULT_STEP_SLEEP = 0.01           # Segundos entre tramos para dejar paso a las escrituras
+FIRST_BACKUP_DELAY_MS = 2 * 60 * 1000
+
+BackupResult = namedtuple('BackupResult', 'path started duration pages size')
+
+def _backup_name_pattern(prefix):
+    return re.compile(rf"^{re.escape(prefix)}-\d{{8}}-\d{{6}}\.db(\.gz)?$")
+
+def list_backups(folder=DEFAULT_BACKUP_FOLDER, prefix="barbate_cf"):
+    """Rutas de las copias existentes, de la más reciente a la más antigua."""
+    if not os.path.isdir(folder): return []
+    pattern = _backup_name_pattern(prefix)
+    names = sorted((n for n in os.listdir(folder) if pattern.match(n)), reverse=True)
+    return [os.path.join(folder, n) for n in names]
+
+def prune_backups(folder=DEFAULT_BACKUP_FOLDER, keep=DEFAULT_KEEP, prefix="barbate_cf"):
+    """Borra las copias más antiguas dejando solo las `keep` más recientes; devuelve las borradas."""
+    removed = []
+    for path in list_backups(folder, prefix)[max(keep, 1):]:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            print(f"Error al borrar la copia de seguridad {path}: {e}")
+    return removed
+
+def backup_database(db_path, folder=DEFAULT_BACKUP_FOLDER, compress=True, keep=DEFAULT_KEEP,
+                    pages_per_step=DEFAULT_PAGES_PER_STEP, step_sleep=DEFAULT_STEP_SLEEP):
+    """Hace una copia consistente de `db_path` en `folder` y aplica la política de retención.
+
+    Devuelve un BackupResult con la ruta final, la duración en segundos, las páginas copiadas y el tamaño.
+    """
+    if not os.path.exists(folder): os.makedirs(folder)
+    started = datetime.now()
+    prefix = os.path.splitext(os.path.basename(db_path))[0]
+    final_path = os.path.join(folder, f"{prefix}-{started:%Y%m%d-%H%M%S}.db" + (".gz" if compress else ""))
+    partial_path = os.path.join(folder, f"{prefix}-{started:%Y%m%d-%H%M%S}.partial")
+    pages = {'total': 0}
+
+    def progress(status, remaining, total):
+        pages['total'] = total
+
+    start = time.perf_counter()
+    source = sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True, check_same_thread=False)
+    target = sqlite3.connect(partial_path)
+    try:
+        source.backup(target, pages=pages_per_step, progress=progress, sleep=step_sleep)
+    except Exception:
+        target.close()
+        if os.path.exists(partial_path): os.remove(partial_path)
+        raise
+    finally:
+        source.close()
+    target.close()
+
+    if compress:
+        with open(partial_path, 'rb') as src, gzip.open(final_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.remove(partial_path)
+    else:
+        os.replace(partial_path, final_path)
+    duration = time.perf_counter() - start
+    prune_backups(folder, keep, prefix)
+    return BackupResult(final_path, started, duration, pages['total'], os.path.getsize(final_path))
+
+class BackupScheduler:
+    """Lanza backup_database cada `interval_minutes` en un hilo y avisa del resultado en el hilo de Tk."""
+    def __init__(self, root, db_path, interval_minutes=None, keep=None, compress=True, folder=DEFAULT_BACKUP_FOLDER, on_done=None):
+        if interval_minutes is None:
+            interval_minutes = float(os.environ.get(INTERVAL_ENV_VAR, DEFAULT_INTERVAL_MINUTES))
+        if keep is None:
+            keep = int(os.environ.get(KEEP_ENV_VAR, DEFAULT_KEEP))
+        self.root = root
+        self.db_path = db_path
+        self.interval_ms = int(interval_minutes * 60 * 1000)
+        self.keep = keep
+        self.compress = compress
+        self.folder = folder
+        self.on_done = on_done
+        self.last_result = None
+        self._thread = None
+        self._outcome = None
+        self._timer_id = None
+        self._stopped = False
+
+    def start(self):
+        """Programa la primera copia unos minutos después del arranque y las siguientes cada intervalo."""
+        if self.interval_ms <= 0: return
+        self._timer_id = self.root.after(min(FIRST_BACKUP_DELAY_MS, self.interval_ms), self._on_timer)
+
+    def _on_timer(self):
+        self.run_now()
+        if not self._stopped:
+            self._timer_id = self.root.after(self.interval_ms, self._on_timer)
+
+    def run_now(self):
+        """Inicia una copia si no hay otra en curso; devuelve False si ya había una."""
+        if self._thread and self._thread.is_alive(): return False
+        self._outcome = None
+        self._thread = threading.Thread(target=self._run, name="BackupScheduler", daemon=True)
+        self._thread.start()
+        self.root.after(200, self._check)
+        return True
+
+    def _run(self):
+        try:
+            self._outcome = (backup_database(self.db_path, self.folder, self.compress, self.keep), None)
+        except Exception as e:
+            self._outcome = (None, e)
+
+    def _check(self):
+        if self._thread.is_alive():
+            if not self._stopped: self.root.after(200, self._check)
+            return
+        result, error = self._outcome
+        if error is not None:
+            print(f"Error al hacer la copia de seguridad: {error}")
+        else:
+            self.last_result = result
+            print(f"Copia de seguridad guardada en {result.path} ({result.pages} páginas, {result.size / 1024:.0f} KiB, {result.duration:.2f} s)")
+        if self.on_done: self.on_done(result, error)
+
+    def stop(self, timeout=30):
+        """Cancela las copias programadas y espera a que termine la que esté en curso."""
+        self._stopped = True
+        if self._timer_id is not None:
+            try: self.root.after_cancel(self._timer_id)
+            except Exception: pass
+        if self._thread: self._thread.join(timeout)
@@ -0,0 +1,54 @@
+"""Benchmark de las rutas de guardado de Database con distintos perfiles de conexión.
+
+Uso: python bench_database.py [iteraciones]
+
+Crea bases de datos temporales (no toca data/barbate_cf.db), las rellena con una
+plantilla de ejemplo y mide save_match_callup y save_player_stats_for_match.
+"""
+import os
+import sys
+import time
+import tempfile
+from database import Database, DEFAULT_CONNECTION_PROFILE, LEGACY_CONNECTION_PROFILE
+
+SQUAD_SIZE = 25
+COACHES = 3
+
+def seed(db):
+    player_ids = [db.insert_player(f"Jugador {i}", "Defensa", i, "", "", "", None, None, None, "", f"J{i}", "", "", "", "", "") for i in range(1, SQUAD_SIZE + 1)]
+    coach_ids = [db.insert_coach(f"Entrenador {i}", "Técnico", None, "", "", "", "", "") for i in range(1, COACHES + 1)]
+    match_id = db.save_match({'id': None, 'match_date': "2025-09-14", 'competition': "Liga", 'rival': "Rival", 'venue': "Campo", 'is_home': True, 'result': ""})
+    return player_ids, coach_ids, match_id
+
+def bench_callups(db, player_ids, coach_ids, iterations):
+    details = {'id': None, 'match_date': "2025-09-14", 'rival': "Rival", 'venue': "Campo", 'is_home': True, 'city': "Barbate"}
+    start = time.perf_counter()
+    for i in range(iterations):
+        # Simula a un entrenador moviendo una ficha en cada guardado
+        starters = [(pid, 10 * n + i % 5, 20 * n) for n, pid in enumerate(player_ids[:11])]
+        player_lists = {'convocado': starters, 'suplentes': player_ids[11:18], 'lesionados': player_ids[18:20]}
+        details['id'] = db.save_match_callup(details, player_lists, coach_ids)
+    return time.perf_counter() - start
+
+def bench_stats(db, player_ids, match_id, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        stats = [(pid, 90 if n < 11 else 0, i % 2, 0, 1, 0, 0) for n, pid in enumerate(player_ids)]
+        db.save_player_stats_for_match(match_id, stats)
+    return time.perf_counter() - start
+
+def run(profile_name, profile, iterations):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"), profile=profile)
+        player_ids, coach_ids, match_id = seed(db)
+        t_callup = bench_callups(db, player_ids, coach_ids, iterations)
+        t_stats = bench_stats(db, player_ids, match_id, iterations)
+        db.conn.close()
+    print(f"{profile_name:<10} save_match_callup: {t_callup * 1000 / iterations:7.2f} ms/op   "
+          f"save_player_stats_for_match: {t_stats * 1000 / iterations:7.2f} ms/op")
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{n} iteraciones, plantilla de {SQUAD_SIZE} jugadores")
+    run("legacy", LEGACY_CONNECTION_PROFILE, n)
+    run("default", DEFAULT_CONNECTION_PROFILE, n)
@@ -1,9 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from PIL import Image, ImageTk, ImageDraw, ImageFont
+from thumbnails import load_thumbnail
 import os
 import sys
 import json
+from date_utils import to_display_date
+from db_worker import ImmediateRunner
+from database import ConcurrentEditError
+from virtual_list import PagedTreeview
 
 def resource_path(relative_path):
     try:
@@ -131,10 +136,13 @@ class FormationDetailWindow(tk.Toplevel):
 
 # --- Pestaña Principal de Convocatorias ---
 class CallupsTab:
-    def __init__(self, notebook, db):
+    def __init__(self, notebook, db, worker=None):
         self.db = db
+        self.worker = worker or ImmediateRunner(db)
         self.frame = ttk.Frame(notebook)
         self.current_callup_id = None
+        self.current_callup_version = None
+        self.saving_callup = False
         self.player_tokens = {}
         self.formation_guides = []
         self.images = {}
@@ -170,6 +178,7 @@ class CallupsTab:
         self.callups_tree.column("id", width=0, stretch=tk.NO)
         self.callups_tree.pack(fill="both", expand=True)
         self.callups_tree.bind("<<TreeviewSelect>>", self.on_callup_select)
+        self.callups_pager = PagedTreeview(self.callups_tree, self.db.get_match_callups_page, lambda c: (c.id, to_display_date(c.match_date), c.rival))
 
         details_frame = ttk.LabelFrame(left_pane, text="Detalles del Partido")
         details_frame.pack(fill="x")
@@ -266,7 +275,7 @@ class CallupsTab:
 
                 self.pickup_data = {
                     'source': 'canvas', 'canvas_id': item,
-                    'values': (player_data[0], player_data[1], player_data[3] or '')
+                    'values': (player_data.id, player_data.name, player_data.number or '')
                 }
             else: # Es un Treeview
                 tree = widget
@@ -282,7 +291,7 @@ class CallupsTab:
             values_to_drop = self.pickup_data['values']
             
             # Determinar si el destino es válido
-            is_coach = self.pickup_data['values'][0] in [c[0] for c in self.db.get_all_coaches()]
+            is_coach = self.db.get_coach_by_id(self.pickup_data['values'][0]) is not None
             
             if widget == self.canvas and not is_coach:
                 self.place_player_token(values_to_drop[0], event.x, event.y)
@@ -321,11 +330,12 @@ class CallupsTab:
         if not selected_item: return
         self.current_callup_id = self.callups_tree.item(selected_item)['values'][0]
         details = self.db.get_match_callup_details(self.current_callup_id)
+        self.current_callup_version = self.db.get_row_version('match_callups', self.current_callup_id)
         self.clear_form_and_field()
         if not details: return
-        self.date_entry.insert(0, details[1] or ""); self.rival_entry.insert(0, details[2] or "")
-        self.venue_entry.insert(0, details[3] or ""); self.is_home_var.set(bool(details[4]))
-        self.city_entry.insert(0, details[5] or "")
+        self.date_entry.insert(0, to_display_date(details.match_date)); self.rival_entry.insert(0, details.rival or "")
+        self.venue_entry.insert(0, details.venue or ""); self.is_home_var.set(bool(details.is_home))
+        self.city_entry.insert(0, details.city or "")
         for status_name, tree in self.status_trees.items():
             db_status = status_name.lower().replace(' ', '_').replace('asignado','')
             if "cuerpo_técnico" in db_status:
@@ -342,12 +352,13 @@ class CallupsTab:
 
     def prepare_new_callup(self):
         self.pickup_data = None; self.frame.config(cursor="")
-        self.current_callup_id = None; self.clear_form_and_field()
+        self.current_callup_id = None; self.current_callup_version = None; self.clear_form_and_field()
         if self.callups_tree.selection(): self.callups_tree.selection_remove(self.callups_tree.selection())
         self.load_available_personnel()
     
     def save_callup(self):
-        details = {'id': self.current_callup_id, 'match_date': self.date_entry.get(), 'rival': self.rival_entry.get(), 'venue': self.venue_entry.get(), 'is_home': self.is_home_var.get(), 'city': self.city_entry.get()}
+        details = {'id': self.current_callup_id, 'match_date': self.date_entry.get(), 'rival': self.rival_entry.get(), 'venue': self.venue_entry.get(), 'is_home': self.is_home_var.get(), 'city': self.city_entry.get(),
+                   'row_version': self.current_callup_version if self.current_callup_id else None}
         if not details['match_date'] or not details['rival']: messagebox.showwarning("Faltan datos", "Fecha y Rival son obligatorios."); return
         player_lists = {}
         convocados = []
@@ -362,12 +373,29 @@ class CallupsTab:
             player_lists[db_status] = player_ids
         coach_tree = self.status_trees["Cuerpo Técnico Asignado"]
         coach_ids = [coach_tree.item(item, "values")[0] for item in coach_tree.get_children()]
-        try:
-            new_id = self.db.save_match_callup(details, player_lists, coach_ids)
-            if not self.current_callup_id: self.current_callup_id = new_id
-            messagebox.showinfo("Éxito", "Convocatoria guardada.")
-            self.load_callups_dropdown()
-        except Exception as e: messagebox.showerror("Error", f"No se pudo guardar la convocatoria.\n{e}")
+        # Evita un segundo guardado mientras el primero está en curso (podría duplicar una convocatoria nueva)
+        if self.saving_callup: return
+        self.saving_callup = True
+        self.worker.submit('save_match_callup_changes', details, player_lists, coach_ids,
+                           callback=self.on_callup_saved, errback=self.on_callup_save_error)
+
+    def on_callup_saved(self, changes):
+        self.saving_callup = False
+        if not self.current_callup_id: self.current_callup_id = changes['callup_id']
+        self.current_callup_version = changes['row_version']
+        messagebox.showinfo("Éxito", "Convocatoria guardada.")
+        # La lista solo muestra fecha y rival: si no han cambiado no hace falta recargarla
+        if changes['details_changed']: self.load_callups_dropdown()
+
+    def on_callup_save_error(self, error):
+        self.saving_callup = False
+        if isinstance(error, ConcurrentEditError):
+            if error.deleted:
+                messagebox.showerror("Convocatoria Eliminada", "Otro usuario ha eliminado esta convocatoria. No se han guardado los cambios.")
+                self.prepare_new_callup(); self.load_callups_dropdown(); return
+            messagebox.showwarning("Convocatoria Modificada", "Otro usuario ha modificado esta convocatoria mientras la editabas.\nSe ha recargado la versión guardada; vuelve a aplicar tus cambios.")
+            self.on_callup_select(); return
+        messagebox.showerror("Error", f"No se pudo guardar la convocatoria.\n{error}")
 
     def delete_callup(self):
         if not self.current_callup_id: messagebox.showwarning("Sin selección", "Selecciona una convocatoria para eliminar."); return
@@ -408,13 +436,11 @@ class CallupsTab:
         self.load_available_personnel()
 
     def load_callups_dropdown(self):
-        for item in self.callups_tree.get_children(): self.callups_tree.delete(item)
-        callups = self.db.get_all_match_callups()
-        for c_id, date, rival in callups: self.callups_tree.insert("", "end", values=(c_id, date, rival))
+        self.callups_pager.reload()
 
     def load_available_personnel(self):
-        all_db_players = self.db.get_all_players()
-        all_db_coaches = self.db.get_all_coaches()
+        all_db_players = self.db.get_player_summaries()
+        all_db_coaches = self.db.get_coach_summaries()
         used_player_ids = set(data['player_id'] for data in self.player_tokens.values())
         for tree in self.status_trees.values():
             if "cuerpo" not in tree.winfo_parent().lower():
@@ -423,7 +449,7 @@ class CallupsTab:
                     except (ValueError, IndexError): pass
         self.players_tree.delete(*self.players_tree.get_children())
         for p in all_db_players:
-            if p[0] not in used_player_ids: self.players_tree.insert("", "end", values=(p[0], p[1], p[3] or ''))
+            if p.id not in used_player_ids: self.players_tree.insert("", "end", values=(p.id, p.name, p.number or ''))
         used_coach_ids = set()
         coach_tree = self.status_trees["Cuerpo Técnico Asignado"]
         for item in coach_tree.get_children():
@@ -431,7 +457,7 @@ class CallupsTab:
             except (ValueError, IndexError): pass
         self.coaches_tree.delete(*self.coaches_tree.get_children())
         for c in all_db_coaches:
-            if c[0] not in used_coach_ids: self.coaches_tree.insert("", "end", values=(c[0], c[1], c[2]))
+            if c.id not in used_coach_ids: self.coaches_tree.insert("", "end", values=c)
 
     def place_player_token(self, player_id, x, y):
         photo_image = self._create_player_pil(player_id)
@@ -444,14 +470,14 @@ class CallupsTab:
         if not player_data: return None
         size = (50, 50); img = Image.new('RGBA', size, (0,0,0,0)); draw = ImageDraw.Draw(img)
         draw.ellipse((0, 0, size[0]-1, size[1]-1), fill="#2e2e2e", outline="white", width=2)
-        photo_path = player_data[9]
+        photo_path = player_data.photo_path
         if photo_path and os.path.exists(resource_path(photo_path)):
             try:
-                player_photo = Image.open(resource_path(photo_path)).convert("RGBA")
+                player_photo = load_thumbnail(resource_path(photo_path), size).convert("RGBA")
                 mask = Image.new('L', size, 0); mask_draw = ImageDraw.Draw(mask); mask_draw.ellipse((4, 4, size[0]-5, size[1]-5), fill=255)
                 player_photo = player_photo.resize(size, Image.LANCZOS); img.paste(player_photo, (0,0), mask)
             except Exception: pass
-        number = str(player_data[3] or '?')
+        number = str(player_data.number or '?')
         try: font = ImageFont.truetype("arialbd.ttf", 14)
         except IOError: font = ImageFont.load_default()
         text_bbox = draw.textbbox((0,0), number, font=font); text_w, text_h = text_bbox[2]-text_bbox[0], text_bbox[3]-text_bbox[1]
@@ -0,0 +1,54 @@
+"""Aviso a las pestañas cuando otra conexión o instancia modifica la base de datos.
+
+PRAGMA data_version solo cambia cuando otra conexión (otra instancia de la aplicación en la
+carpeta compartida, o el hilo de DatabaseWorker) confirma una transacción; leerlo no toca el
+archivo de datos, así que el sondeo es barato. Cuando cambia, Database.sync_changes lee change_log
+desde la última versión vista, invalida en la caché solo las entidades afectadas y devuelve las
+tablas modificadas: cada pestaña solo se recarga si alguna de las suyas está entre ellas.
+"""
+import os
+
+WATCH_INTERVAL_MS = int(os.environ.get("BARBATE_WATCH_INTERVAL_MS", "2000"))
+
+class ChangeWatcher:
+    def __init__(self, root, db, interval_ms=WATCH_INTERVAL_MS):
+        self.root = root
+        self.db = db
+        self.interval_ms = interval_ms
+        self._subscribers = []
+        self._data_version = None
+        self._after_id = None
+
+    def subscribe(self, tables, callback):
+        """Llama a `callback()` cuando otra conexión cambie alguna de `tables`."""
+        self._subscribers.append((set(tables), callback))
+
+    def start(self):
+        self._data_version = self._read_data_version()
+        self._after_id = self.root.after(self.interval_ms, self._poll)
+
+    def stop(self):
+        if self._after_id:
+            try: self.root.after_cancel(self._after_id)
+            except Exception: pass
+            self._after_id = None
+
+    def _read_data_version(self):
+        return self.db.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def check_now(self):
+        """Comprueba si hay cambios y avisa a los suscriptores; devuelve las tablas cambiadas (None = todas)."""
+        version = self._read_data_version()
+        if version == self._data_version: return set()
+        self._data_version = version
+        tables = self.db.sync_changes()
+        for wanted, callback in self._subscribers:
+            if tables is None or wanted & tables:
+                try: callback()
+                except Exception as e: print(f"Error al recargar tras cambios externos: {e}")
+        return tables
+
+    def _poll(self):
+        try: self.check_now()
+        except Exception as e: print(f"Error al comprobar cambios en la base de datos: {e}")
+        self._after_id = self.root.after(self.interval_ms, self._poll)
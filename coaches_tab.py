@@ -1,6 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from PIL import Image, ImageTk
+from thumbnails import photo_thumbnail
 import os
 import shutil
 import sys
@@ -100,16 +100,15 @@ class CoachesTab:
     def load_coaches(self):
         for item in self.coaches_tree.get_children():
             self.coaches_tree.delete(item)
-        for coach in self.db.get_all_coaches():
-            self.coaches_tree.insert("", "end", values=coach[:3], iid=coach[0])
+        for coach in self.db.get_coach_summaries():
+            self.coaches_tree.insert("", "end", values=coach, iid=coach.id)
     
     def on_coach_select(self, event=None):
         selected_items = self.coaches_tree.selection()
         if not selected_items: return
         self.current_coach_id = int(selected_items[0])
         
-        all_coaches = self.db.get_all_coaches()
-        coach_data = next((c for c in all_coaches if c[0] == self.current_coach_id), None)
+        coach_data = self.db.get_coach_by_id(self.current_coach_id)
         
         if coach_data:
             self.clear_form()
@@ -201,10 +200,7 @@ class CoachesTab:
             return
         try:
             full_path = resource_path(path)
-            # --- CORRECCIÓN: Usar 'Image' en lugar de 'PILImage' ---
-            img = Image.open(full_path)
-            img.thumbnail((150, 150), Image.LANCZOS)
-            self.photo_image = ImageTk.PhotoImage(img)
+            self.photo_image = photo_thumbnail(full_path, (150, 150))
             self.photo_label.config(image=self.photo_image, text="")
         except Exception as e:
             print(f"Error al cargar imagen de cuerpo técnico: {e}")
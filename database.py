@@ -1,7 +1,40 @@
 import sqlite3
 import os
-import json
 import sys
+import re
+import time
+import random
+from contextlib import contextmanager
+from migrations import apply_migrations, rebuild_season_totals, create_exercises_fts, fts5_available, TEMPLATE_EXERCISE_COLUMNS, VERSIONED_TABLES
+from date_utils import to_iso_date, day_range, season_range
+from query_profiler import QueryProfiler, profiling_enabled
+import season_archive
+from records import (Player, PlayerSummary, Coach, CoachSummary, Training, TrainingSummary, Exercise, ExerciseSummary,
+                     Match, MatchSummary, Callup, CallupSummary, AttendanceEntry, ChangeEntry, LayoutElement,
+                     layout_element_from_data, layout_element_to_data, columns)
+
+# Perfil de conexión aplicado al abrir la base de datos.
+# WAL permite leer informes mientras se escribe y, junto con synchronous=NORMAL,
+# evita un fsync completo del journal en cada commit.
+DEFAULT_CONNECTION_PROFILE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,       # Negativo = KiB (unos 16 MB de caché de páginas)
+    'mmap_size': 64 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,       # Milisegundos de espera si otra conexión tiene el bloqueo
+}
+
+# Perfil equivalente a los valores por defecto de SQLite (journal de rollback).
+# Útil para carpetas compartidas en red, donde WAL no está soportado.
+LEGACY_CONNECTION_PROFILE = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'cache_size': -2000,
+    'mmap_size': 0,
+    'temp_store': 'DEFAULT',
+    'busy_timeout': 0,
+}
 
 def resource_path(relative_path):
     """ Obtiene la ruta absoluta al recurso, funciona para dev y para PyInstaller """
@@ -12,59 +45,278 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+# Filas por página en las listas largas (ver get_*_page y virtual_list.PagedTreeview)
+PAGE_SIZE = 200
+
+# Reintentos de BEGIN IMMEDIATE cuando otra instancia mantiene el bloqueo más allá de busy_timeout
+BUSY_RETRIES = 4
+BUSY_BACKOFF_SECONDS = 0.2
+
+class ConcurrentEditError(Exception):
+    """Otro usuario ha guardado o borrado el registro desde que se cargó en el formulario."""
+    def __init__(self, table, row_id, deleted=False):
+        self.table, self.row_id, self.deleted = table, row_id, deleted
+        super().__init__(f"El registro {row_id} de {table} ha sido {'eliminado' if deleted else 'modificado'} por otro usuario")
+
+def _is_busy(error):
+    return getattr(error, 'sqlite_errorcode', None) in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED) or "locked" in str(error)
+
+SEASON_TOTAL_STATS = ("matches_played", "minutes_played", "goals", "assists", "shots", "yellow_cards", "red_cards")
+
 class Database:
-    def __init__(self):
-        db_path = resource_path("data/barbate_cf.db")
-        if not os.path.exists(os.path.dirname(db_path)):
-            os.makedirs(os.path.dirname(db_path))
-        self.conn = sqlite3.connect(db_path)
+    def __init__(self, db_path=None, profile=None, profile_queries=None):
+        """Abre la base de datos. `profile` sobrescribe claves de DEFAULT_CONNECTION_PROFILE.
+
+        `profile_queries` activa el perfilador de consultas; por defecto depende de BARBATE_PROFILE_SQL.
+        """
+        self.db_path = db_path or resource_path("data/barbate_cf.db")
+        if not os.path.exists(os.path.dirname(os.path.abspath(self.db_path))):
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)))
+        self.profile = {**DEFAULT_CONNECTION_PROFILE, **(profile or {})}
+        # Las escrituras implícitas abren BEGIN IMMEDIATE: el bloqueo se pide al empezar, no a mitad de la transacción
+        conn = sqlite3.connect(self.db_path, isolation_level="IMMEDIATE")
+        query_profiler = None
+        if profile_queries if profile_queries is not None else profiling_enabled():
+            query_profiler = QueryProfiler()
+            conn = query_profiler.wrap(conn)
+        self._init_state(conn)
+        self.query_profiler = query_profiler
         self.conn.execute("PRAGMA foreign_keys = ON")
-        self.create_tables()
+        if self.conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+            # Archivo nuevo: auto_vacuum solo se puede fijar antes de crear la primera tabla
+            self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.apply_connection_profile()
+        self.schema_version = apply_migrations(self.conn)
+        self._ensure_exercise_fts()
+        self._load_change_state()
 
-    def create_tables(self):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS players (
-                id INTEGER PRIMARY KEY, name TEXT NOT NULL, position TEXT NOT NULL, number INTEGER, 
-                date_of_birth TEXT, nationality TEXT, dominant_foot TEXT, height_cm INTEGER, 
-                weight_kg INTEGER, photo_path TEXT, observations TEXT, shirt_name TEXT,
-                phone TEXT, email TEXT, address TEXT, town TEXT, city TEXT
-            )''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS coaches (
-                id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                name TEXT NOT NULL, 
-                role TEXT, 
-                photo_path TEXT,
-                phone TEXT,
-                address TEXT,
-                town TEXT,
-                province TEXT,
-                observations TEXT
-            )''')
-        
-        cursor.execute('''CREATE TABLE IF NOT EXISTS career_history (id INTEGER PRIMARY KEY, player_id INTEGER NOT NULL, season TEXT, team_name TEXT, matches_played INTEGER DEFAULT 0, goals_scored INTEGER DEFAULT 0, assists INTEGER DEFAULT 0, yellow_cards INTEGER DEFAULT 0, red_cards INTEGER DEFAULT 0, saves INTEGER DEFAULT 0, goals_conceded INTEGER DEFAULT 0, FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS injuries (id INTEGER PRIMARY KEY, player_id INTEGER NOT NULL, injury_date TEXT, injury_type TEXT, recovery_period TEXT, notes TEXT, FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS trainings (id INTEGER PRIMARY KEY, date TEXT NOT NULL, mesocycle TEXT, session_number INTEGER, coach TEXT, assistant_coach TEXT, material TEXT)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS exercises (id INTEGER PRIMARY KEY, training_id INTEGER, name TEXT, description TEXT, duration INTEGER, repetitions TEXT, space TEXT, objectives TEXT, rules TEXT, variants TEXT, image_path TEXT, category TEXT, FOREIGN KEY (training_id) REFERENCES trainings (id) ON DELETE CASCADE)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS training_attendance (training_id INTEGER NOT NULL, player_id INTEGER NOT NULL, status TEXT NOT NULL, PRIMARY KEY (training_id, player_id), FOREIGN KEY (training_id) REFERENCES trainings (id) ON DELETE CASCADE, FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS field_layouts (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, layout_data TEXT NOT NULL)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS match_callups (id INTEGER PRIMARY KEY AUTOINCREMENT, match_date TEXT, rival TEXT, venue TEXT, is_home BOOLEAN, city TEXT)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS callup_players (callup_id INTEGER NOT NULL, player_id INTEGER NOT NULL, status TEXT NOT NULL, pos_x INTEGER, pos_y INTEGER, PRIMARY KEY (callup_id, player_id), FOREIGN KEY (callup_id) REFERENCES match_callups (id) ON DELETE CASCADE, FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS training_templates (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, exercises_data TEXT, attendance_data TEXT, material TEXT)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS matches (id INTEGER PRIMARY KEY AUTOINCREMENT, match_date TEXT, competition TEXT, rival TEXT, venue TEXT, is_home BOOLEAN, result TEXT)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS player_match_stats (match_id INTEGER NOT NULL, player_id INTEGER NOT NULL, minutes_played INTEGER DEFAULT 0, goals INTEGER DEFAULT 0, assists INTEGER DEFAULT 0, shots INTEGER DEFAULT 0, yellow_cards INTEGER DEFAULT 0, red_cards INTEGER DEFAULT 0, PRIMARY KEY (match_id, player_id), FOREIGN KEY (match_id) REFERENCES matches (id) ON DELETE CASCADE, FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS callup_coaches (callup_id INTEGER NOT NULL, coach_id INTEGER NOT NULL, PRIMARY KEY (callup_id, coach_id), FOREIGN KEY (callup_id) REFERENCES match_callups (id) ON DELETE CASCADE, FOREIGN KEY (coach_id) REFERENCES coaches (id) ON DELETE CASCADE)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS formations (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, positions_json TEXT)''')
-        
-        coach_columns = [desc[1] for desc in cursor.execute("PRAGMA table_info(coaches)").fetchall()]
-        new_coach_cols = {'phone': 'TEXT', 'address': 'TEXT', 'town': 'TEXT', 'province': 'TEXT', 'observations': 'TEXT'}
-        for col, col_type in new_coach_cols.items():
-            if col not in coach_columns:
-                cursor.execute(f"ALTER TABLE coaches ADD COLUMN {col} {col_type}")
+    def _init_state(self, conn):
+        """Estado interno de la conexión; también lo usa read_pool.ReadOnlyDatabase, que no pasa por __init__."""
+        self.conn = conn
+        self.query_profiler = None
+        self._tx_depth = 0
+        self._exercise_fts = None
+        # Temporadas archivadas adjuntas a esta conexión (esquema -> temporada), ver season_archive
+        self._attached_archives = {}
+        self._history_views = False
+        # Caché en memoria de jugadores y entrenadores por id; la invalidan sus propios métodos de escritura
+        # y, para lo que escriben otras conexiones, sync_changes (ver change_watcher)
+        self._entity_cache = {'players': {}, 'coaches': {}}
+        self._cache_counters = {'players': {'hits': 0, 'misses': 0}, 'coaches': {'hits': 0, 'misses': 0}}
+
+    def _load_change_state(self):
+        """Estado que depende del esquema ya migrado; se llama tras _init_state y las migraciones."""
+        # Última versión de change_log aplicada a la caché de entidades (ver sync_changes)
+        self._change_version = self.get_change_version()
+        # ATTACH no se admite dentro de una transacción: las temporadas archivadas se adjuntan ya
+        self._has_archives()
+
+    def apply_connection_profile(self):
+        """Aplica los PRAGMA del perfil de conexión a la conexión abierta."""
+        p = self.profile
+        # busy_timeout primero, para que el cambio de journal_mode espere a otras conexiones
+        self.conn.execute(f"PRAGMA busy_timeout = {int(p['busy_timeout'])}")
+        mode = self.conn.execute(f"PRAGMA journal_mode = {p['journal_mode']}").fetchone()[0]
+        if mode.upper() != p['journal_mode'].upper():
+            print(f"Aviso: journal_mode '{p['journal_mode']}' no disponible, se usa '{mode}'")
+        self.conn.execute(f"PRAGMA synchronous = {p['synchronous']}")
+        self.conn.execute(f"PRAGMA cache_size = {int(p['cache_size'])}")
+        self.conn.execute(f"PRAGMA mmap_size = {int(p['mmap_size'])}")
+        self.conn.execute(f"PRAGMA temp_store = {p['temp_store']}")
+
+    def close(self):
+        """Cierra la conexión tras PRAGMA optimize, escribiendo antes el informe del perfilador si está activo."""
+        if self.query_profiler:
+            try:
+                path = self.query_profiler.write_report(self.conn.raw)
+                print(f"Informe de consultas SQL guardado en {path}")
+            except Exception as e:
+                print(f"Error al escribir el informe de consultas: {e}")
+        try:
+            # Actualiza las estadísticas del planificador que hayan quedado desfasadas en esta sesión
+            self.conn.execute("PRAGMA optimize").fetchall()
+        except sqlite3.Error as e:
+            print(f"Error al optimizar la base de datos: {e}")
+        self.conn.close()
+
+    # --- Transacciones ---
+    @contextmanager
+    def transaction(self):
+        """Agrupa varias operaciones en una sola transacción: un único commit al salir, rollback si hay excepción.
+
+        Dentro del bloque los métodos no hacen commit. Un bloque anidado abre un SAVEPOINT: si falla
+        solo se deshace lo suyo, aunque quien lo llama capture la excepción y el bloque exterior siga.
+        El bloque exterior empieza con BEGIN IMMEDIATE (ver _begin_immediate).
+        """
+        nested = self._tx_depth > 0
+        savepoint = f"tx_{self._tx_depth}"
+        if nested: self.conn.execute(f"SAVEPOINT {savepoint}")
+        elif not self.conn.in_transaction: self._begin_immediate()
+        self._tx_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth -= 1
+            if nested: self.conn.execute(f"ROLLBACK TO {savepoint}"); self.conn.execute(f"RELEASE {savepoint}")
+            else: self.conn.rollback()
+            self.clear_entity_cache()
+            raise
+        self._tx_depth -= 1
+        if nested: self.conn.execute(f"RELEASE {savepoint}")
+        else: self.conn.commit()
+
+    def _begin_immediate(self):
+        """Toma el bloqueo de escritura; si otra instancia lo retiene más allá de busy_timeout, reintenta con espera creciente."""
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == BUSY_RETRIES: raise
+                time.sleep(BUSY_BACKOFF_SECONDS * 2 ** attempt * (1 + random.random()))
+
+    def _commit(self):
+        if self._tx_depth == 0: self.conn.commit()
+
+    def _rollback(self):
+        # Dentro de una transacción la deshace el bloque exterior al propagarse la excepción
+        if self._tx_depth == 0:
+            self.conn.rollback()
+            self.clear_entity_cache()
 
-        self.conn.commit()
+    # --- Registros ---
+    def _records(self, record, query, params=()):
+        """Ejecuta la consulta y devuelve las filas como registros del tipo indicado."""
+        return list(map(record._make, self.conn.execute(query, params)))
+
+    def _record(self, record, query, params=()):
+        row = self.conn.execute(query, params).fetchone()
+        return record._make(row) if row is not None else None
+
+    def _keyset_page(self, record, table, sort_column, descending, after, limit, where="", params=()):
+        """Una página ordenada por (sort_column, id) a partir del último registro de la página anterior.
+
+        Paginación por clave: en lugar de OFFSET se filtra por la clave de la última fila, así que el
+        coste de cada página no depende de cuántas filas haya antes. SQLite pone los NULL primero en
+        orden ascendente y al final en descendente; cada tramo (con y sin NULL) se consulta por separado
+        para que ambas consultas puedan buscar directamente en el índice. `where` (con `params`) es un
+        filtro adicional, p. ej. "category = ?".
+        """
+        direction, cmp = ("DESC", "<") if descending else ("ASC", ">")
+        segments = ("values", "nulls") if descending else ("nulls", "values")
+        if after is None: start, key = segments[0], None
+        else:
+            value = getattr(after, sort_column)
+            start, key = ("nulls", (after.id,)) if value is None else ("values", (value, after.id))
+        extra = f" AND ({where})" if where else ""
+        rows = []
+        for segment in segments[segments.index(start):]:
+            if segment == "nulls":
+                condition = f"{sort_column} IS NULL" + (f" AND id {cmp} ?" if key else "")
+                order = f"id {direction}"
+            else:
+                condition = f"({sort_column}, id) {cmp} (?, ?)" if key else f"{sort_column} IS NOT NULL"
+                order = f"{sort_column} {direction}, id {direction}"
+            query = f"SELECT {columns(record)} FROM {table} WHERE {condition}{extra} ORDER BY {order} LIMIT ?"
+            rows += self._records(record, query, (*(key or ()), *params, limit - len(rows)))
+            if len(rows) >= limit: break
+            key = None
+        return rows
+
+    # --- Caché de entidades ---
+    def _cached_entity(self, kind, record, entity_id, query):
+        try: key = int(entity_id)
+        except (TypeError, ValueError): return None
+        cache = self._entity_cache[kind]
+        if key in cache:
+            self._cache_counters[kind]['hits'] += 1
+            return cache[key]
+        self._cache_counters[kind]['misses'] += 1
+        row = self._record(record, query, (key,))
+        if row is not None: cache[key] = row
+        return row
+
+    def _fill_cache(self, kind, rows):
+        cache = self._entity_cache[kind]
+        for row in rows: cache[row[0]] = row
+        return rows
+
+    def _invalidate(self, kind, entity_id):
+        try: self._entity_cache[kind].pop(int(entity_id), None)
+        except (TypeError, ValueError): pass
+
+    def clear_entity_cache(self):
+        """Vacía la caché de jugadores y entrenadores (p. ej. si otra instancia ha modificado la base de datos)."""
+        for cache in self._entity_cache.values(): cache.clear()
+
+    # --- Registro de cambios ---
+    def get_change_version(self):
+        """Versión del último cambio registrado en change_log (0 si no hay ninguno)."""
+        return self.conn.execute("SELECT COALESCE(MAX(version), 0) FROM change_log").fetchone()[0]
+
+    def changes_since(self, version, tables=None):
+        """Cambios posteriores a `version`, en orden, como ChangeEntry.
+
+        Devuelve None si el registro ya se ha purgado por debajo de `version`: quien pregunta tiene
+        que recargarlo todo. Un mismo registro puede aparecer varias veces (una por cambio).
+        """
+        oldest = self.conn.execute("SELECT MIN(version) FROM change_log").fetchone()[0]
+        if oldest is not None and oldest > version + 1 and version < self.get_change_version(): return None
+        query = f"SELECT {columns(ChangeEntry)} FROM change_log WHERE version > ?"
+        params = [version]
+        if tables:
+            query += f" AND table_name IN ({', '.join('?' for _ in tables)})"; params += list(tables)
+        return self._records(ChangeEntry, query + " ORDER BY version", params)
+
+    def sync_changes(self):
+        """Invalida en la caché de entidades solo los jugadores y entrenadores cambiados desde la última llamada.
+
+        Devuelve el conjunto de tablas con cambios, o None si hay que recargarlo todo. La llama
+        ChangeWatcher cuando otra conexión confirma cambios (ver DatabaseWorker.after_write).
+        """
+        changes = self.changes_since(self._change_version)
+        if changes is None:
+            self.clear_entity_cache()
+            self._change_version = self.get_change_version()
+            return None
+        for change in changes:
+            if change.table_name in self._entity_cache: self._invalidate(change.table_name, change.row_id)
+        if changes: self._change_version = changes[-1].version
+        return {change.table_name for change in changes}
+
+    def prune_change_log(self, keep):
+        """Borra las entradas más antiguas de change_log dejando las últimas `keep`."""
+        deleted = self.conn.execute("DELETE FROM change_log WHERE version <= (SELECT MAX(version) FROM change_log) - ?", (keep,)).rowcount
+        self._commit()
+        return deleted
+
+    # --- Concurrencia optimista ---
+    def get_row_version(self, table, row_id):
+        """row_version actual de un jugador, partido o convocatoria (None si no existe)."""
+        if table not in VERSIONED_TABLES: raise ValueError(f"Tabla sin control de versión: {table}")
+        row = self.conn.execute(f"SELECT row_version FROM {table} WHERE id = ?", (row_id,)).fetchone()
+        return row[0] if row else None
+
+    def _versioned_update(self, table, row_id, expected, assignments, params):
+        """UPDATE de la fila que sube row_version en la misma sentencia y devuelve la nueva versión.
+
+        Con `expected` solo escribe si row_version sigue siendo esa; si no (o si la fila ya no existe)
+        lanza ConcurrentEditError sin haber escrito nada. Al ser un único UPDATE, change_log y los
+        triggers de la fila ven un solo cambio por guardado.
+        """
+        sql = f"UPDATE {table} SET {assignments}, row_version = row_version + 1 WHERE id = ?"
+        if expected is not None: sql += " AND row_version = ?"
+        cursor = self.conn.execute(sql, (*params, row_id, *(() if expected is None else (expected,))))
+        if cursor.rowcount == 0:
+            deleted = self.conn.execute(f"SELECT 1 FROM {table} WHERE id = ?", (row_id,)).fetchone() is None
+            # Fuera de un bloque transaction() libera el bloqueo de escritura de la transacción implícita
+            self._rollback()
+            raise ConcurrentEditError(table, row_id, deleted)
+        return self.get_row_version(table, row_id)
+
+    def get_cache_stats(self):
+        """Aciertos, fallos y tamaño de la caché por tipo de entidad."""
+        return {kind: {**counters, 'size': len(self._entity_cache[kind])} for kind, counters in self._cache_counters.items()}
 
     # --- Métodos para Tácticas ---
     def get_all_formations(self):
@@ -72,19 +324,26 @@ class Database:
     
     def insert_formation(self, name, positions_json):
         self.conn.execute("INSERT INTO formations (name, positions_json) VALUES (?, ?)", (name, positions_json))
-        self.conn.commit()
+        self._commit()
     
     def update_formation(self, f_id, name, positions_json):
         self.conn.execute("UPDATE formations SET name=?, positions_json=? WHERE id=?", (name, positions_json, f_id))
-        self.conn.commit()
+        self._commit()
     
     def delete_formation(self, f_id):
         self.conn.execute("DELETE FROM formations WHERE id=?", (f_id,))
-        self.conn.commit()
+        self._commit()
 
     # --- Métodos para Cuerpo Técnico ---
     def get_all_coaches(self):
-        return self.conn.execute("SELECT id, name, role, photo_path, phone, address, town, province, observations FROM coaches ORDER BY name ASC").fetchall()
+        return self._fill_cache('coaches', self._records(Coach, f"SELECT {columns(Coach)} FROM coaches ORDER BY name ASC"))
+
+    def get_coach_summaries(self):
+        """Solo id, nombre y rol, para las listas."""
+        return self._records(CoachSummary, f"SELECT {columns(CoachSummary)} FROM coaches ORDER BY name ASC")
+
+    def get_coach_by_id(self, coach_id):
+        return self._cached_entity('coaches', Coach, coach_id, f"SELECT {columns(Coach)} FROM coaches WHERE id = ?")
     
     def get_all_coach_names(self):
         """Devuelve una lista solo con los nombres de los entrenadores para los desplegables."""
@@ -93,44 +352,62 @@ class Database:
     def insert_coach(self, name, role, photo_path, phone, address, town, province, observations):
         cursor = self.conn.cursor()
         cursor.execute("INSERT INTO coaches (name, role, photo_path, phone, address, town, province, observations) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (name, role, photo_path, phone, address, town, province, observations))
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
     
     def update_coach(self, coach_id, name, role, photo_path, phone, address, town, province, observations):
         self.conn.execute("UPDATE coaches SET name=?, role=?, photo_path=?, phone=?, address=?, town=?, province=?, observations=? WHERE id=?", (name, role, photo_path, phone, address, town, province, observations, coach_id))
-        self.conn.commit()
+        self._invalidate('coaches', coach_id)
+        self._commit()
     
     def delete_coach(self, coach_id):
         self.conn.execute("DELETE FROM coaches WHERE id = ?", (coach_id,))
-        self.conn.commit()
+        self._invalidate('coaches', coach_id)
+        self._commit()
     
     # --- Métodos para Jugadores ---
     def get_all_players(self): 
-        return self.conn.execute("SELECT id, name, position, number, date_of_birth, nationality, dominant_foot, height_cm, weight_kg, photo_path, observations, shirt_name, phone, email, address, town, city FROM players ORDER BY name ASC").fetchall()
+        return self._fill_cache('players', self._records(Player, f"SELECT {columns(Player)} FROM players ORDER BY name ASC"))
+
+    def get_player_summaries(self):
+        """Solo id, nombre, posición y dorsal, para las listas."""
+        return self._records(PlayerSummary, f"SELECT {columns(PlayerSummary)} FROM players ORDER BY name ASC")
     
+    def get_player_summaries_page(self, after=None, limit=PAGE_SIZE):
+        return self._keyset_page(PlayerSummary, "players", "name", False, after, limit)
+
     def get_player_by_id(self, player_id): 
-        return self.conn.execute("SELECT id, name, position, number, date_of_birth, nationality, dominant_foot, height_cm, weight_kg, photo_path, observations, shirt_name, phone, email, address, town, city FROM players WHERE id = ?", (player_id,)).fetchone()
+        return self._cached_entity('players', Player, player_id, f"SELECT {columns(Player)} FROM players WHERE id = ?")
     
     def insert_player(self, name, pos, num, dob, nat, foot, h, w, photo, obs, s_name, phone, email, address, town, city):
         cursor = self.conn.cursor()
         cursor.execute("INSERT INTO players (name, position, number, date_of_birth, nationality, dominant_foot, height_cm, weight_kg, photo_path, observations, shirt_name, phone, email, address, town, city) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (name, pos, num, dob, nat, foot, h, w, photo, obs, s_name, phone, email, address, town, city))
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
     
-    def update_player(self, pid, name, pos, num, dob, nat, foot, h, w, photo, obs, s_name, phone, email, address, town, city):
-        self.conn.execute("UPDATE players SET name=?, position=?, number=?, date_of_birth=?, nationality=?, dominant_foot=?, height_cm=?, weight_kg=?, photo_path=?, observations=?, shirt_name=?, phone=?, email=?, address=?, town=?, city=? WHERE id=?", (name, pos, num, dob, nat, foot, h, w, photo, obs, s_name, phone, email, address, town, city, pid))
-        self.conn.commit()
+    def update_player(self, pid, name, pos, num, dob, nat, foot, h, w, photo, obs, s_name, phone, email, address, town, city, expected_version=None):
+        """Actualiza la ficha y devuelve su nueva row_version; con `expected_version` falla si otro la ha cambiado."""
+        version = self._versioned_update('players', pid, expected_version,
+                                         "name=?, position=?, number=?, date_of_birth=?, nationality=?, dominant_foot=?, height_cm=?, weight_kg=?, photo_path=?, observations=?, shirt_name=?, phone=?, email=?, address=?, town=?, city=?",
+                                         (name, pos, num, dob, nat, foot, h, w, photo, obs, s_name, phone, email, address, town, city))
+        self._invalidate('players', pid)
+        self._commit()
+        return version
     
     def delete_player(self, player_id):
         self.conn.execute("DELETE FROM players WHERE id = ?", (player_id,))
-        self.conn.commit()
+        self._invalidate('players', player_id)
+        self._commit()
 
     # --- Métodos para Convocatorias ---
     def get_all_match_callups(self):
-        return self.conn.execute("SELECT id, match_date, rival FROM match_callups ORDER BY match_date DESC").fetchall()
+        return self._records(CallupSummary, f"SELECT {columns(CallupSummary)} FROM match_callups ORDER BY match_date DESC")
+
+    def get_match_callups_page(self, after=None, limit=PAGE_SIZE):
+        return self._keyset_page(CallupSummary, "match_callups", "match_date", True, after, limit)
 
     def get_match_callup_details(self, callup_id):
-        return self.conn.execute("SELECT * FROM match_callups WHERE id = ?", (callup_id,)).fetchone()
+        return self._record(Callup, f"SELECT {columns(Callup)} FROM match_callups WHERE id = ?", (callup_id,))
 
     def get_players_for_callup(self, callup_id, status):
         return self.conn.execute("SELECT p.id, p.name, p.position, p.number, cp.pos_x, cp.pos_y FROM players p JOIN callup_players cp ON p.id = cp.player_id WHERE cp.callup_id = ? AND cp.status = ?", (callup_id, status)).fetchall()
@@ -142,82 +419,207 @@ class Database:
         return self.conn.execute("SELECT c.id, c.name, c.role FROM coaches c JOIN callup_coaches cc ON c.id = cc.coach_id WHERE cc.callup_id = ?", (callup_id,)).fetchall()
 
     def save_match_callup(self, details, player_lists, coach_ids):
+        return self.save_match_callup_changes(details, player_lists, coach_ids)['callup_id']
+
+    def save_match_callup_changes(self, details, player_lists, coach_ids):
+        """Guarda la convocatoria escribiendo solo las filas que cambian respecto a lo guardado.
+
+        Devuelve un dict con 'callup_id', 'created', 'details_changed', 'players_upserted',
+        'players_removed', 'coaches_added', 'coaches_removed' y 'row_version'. Si details trae
+        'row_version' y otro usuario ha guardado la convocatoria después, lanza ConcurrentEditError.
+        """
         cursor = self.conn.cursor()
         callup_id = details.get('id')
-        data = (details['match_date'], details['rival'], details['venue'], details['is_home'], details['city'])
-        
-        if callup_id:
-            cursor.execute("UPDATE match_callups SET match_date=?, rival=?, venue=?, is_home=?, city=? WHERE id=?", (*data, callup_id))
-        else:
-            cursor.execute("INSERT INTO match_callups (match_date, rival, venue, is_home, city) VALUES (?, ?, ?, ?, ?)", data)
-            callup_id = cursor.lastrowid
-        
-        cursor.execute("DELETE FROM callup_players WHERE callup_id = ?", (callup_id,))
-        cursor.execute("DELETE FROM callup_coaches WHERE callup_id = ?", (callup_id,))
+        data = (to_iso_date(details['match_date']), details['rival'], details['venue'], details['is_home'], details['city'])
+        changes = {'callup_id': callup_id, 'created': False, 'details_changed': False,
+                   'players_upserted': [], 'players_removed': [], 'coaches_added': [], 'coaches_removed': [], 'row_version': 1}
 
+        # Estado deseado: player_id -> (status, pos_x, pos_y). Los Treeview devuelven los ids como texto.
+        wanted_players = {}
         for status, players in player_lists.items():
             if status == 'convocado':
-                for p_id, x, y in players:
-                    cursor.execute("INSERT INTO callup_players (callup_id, player_id, status, pos_x, pos_y) VALUES (?, ?, ?, ?, ?)", (callup_id, p_id, status, x, y))
+                for p_id, x, y in players: wanted_players[int(p_id)] = (status, int(x), int(y))
             else:
-                for p_id in players:
-                    cursor.execute("INSERT INTO callup_players (callup_id, player_id, status) VALUES (?, ?, ?)", (callup_id, p_id, status))
-        
-        for coach_id in coach_ids:
-            cursor.execute("INSERT INTO callup_coaches (callup_id, coach_id) VALUES (?, ?)", (callup_id, coach_id))
+                for p_id in players: wanted_players[int(p_id)] = (status, None, None)
+        wanted_coaches = {int(c_id) for c_id in coach_ids}
+
+        with self.transaction():
+            if callup_id:
+                stored = cursor.execute("SELECT match_date, rival, venue, is_home, city FROM match_callups WHERE id = ?", (callup_id,)).fetchone()
+                changes['details_changed'] = stored != data
+                # Siempre se escribe la cabecera: es la que lleva row_version y comprueba la edición concurrente
+                changes['row_version'] = self._versioned_update('match_callups', callup_id, details.get('row_version'),
+                                                                "match_date=?, rival=?, venue=?, is_home=?, city=?", data)
+                stored_players = {row[0]: row[1:] for row in cursor.execute("SELECT player_id, status, pos_x, pos_y FROM callup_players WHERE callup_id = ?", (callup_id,))}
+                stored_coaches = {row[0] for row in cursor.execute("SELECT coach_id FROM callup_coaches WHERE callup_id = ?", (callup_id,))}
+            else:
+                cursor.execute("INSERT INTO match_callups (match_date, rival, venue, is_home, city) VALUES (?, ?, ?, ?, ?)", data)
+                callup_id = cursor.lastrowid
+                changes.update(callup_id=callup_id, created=True, details_changed=True)
+                stored_players, stored_coaches = {}, set()
 
-        self.conn.commit()
-        return callup_id
+            changes['players_removed'] = [p_id for p_id in stored_players if p_id not in wanted_players]
+            changes['players_upserted'] = [p_id for p_id, row in wanted_players.items() if stored_players.get(p_id) != row]
+            changes['coaches_removed'] = sorted(stored_coaches - wanted_coaches)
+            changes['coaches_added'] = sorted(wanted_coaches - stored_coaches)
+
+            if changes['players_removed']:
+                cursor.executemany("DELETE FROM callup_players WHERE callup_id = ? AND player_id = ?", [(callup_id, p_id) for p_id in changes['players_removed']])
+            if changes['players_upserted']:
+                cursor.executemany(
+                    "INSERT INTO callup_players (callup_id, player_id, status, pos_x, pos_y) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(callup_id, player_id) DO UPDATE SET status = excluded.status, pos_x = excluded.pos_x, pos_y = excluded.pos_y",
+                    [(callup_id, p_id, *wanted_players[p_id]) for p_id in changes['players_upserted']])
+            if changes['coaches_removed']:
+                cursor.executemany("DELETE FROM callup_coaches WHERE callup_id = ? AND coach_id = ?", [(callup_id, c_id) for c_id in changes['coaches_removed']])
+            if changes['coaches_added']:
+                cursor.executemany("INSERT INTO callup_coaches (callup_id, coach_id) VALUES (?, ?)", [(callup_id, c_id) for c_id in changes['coaches_added']])
+        return changes
+
+    def get_callups_between(self, start, end):
+        """Convocatorias entre dos fechas (ambas incluidas), en orden cronológico."""
+        low, high = day_range(start, end)
+        return self._records(CallupSummary, f"SELECT {columns(CallupSummary)} FROM match_callups WHERE match_date >= ? AND match_date < ? ORDER BY match_date ASC", (low, high))
 
     def delete_match_callup(self, callup_id):
         self.conn.execute("DELETE FROM match_callups WHERE id = ?", (callup_id,))
-        self.conn.commit()
+        self._commit()
     
     # --- Métodos para Partidos y Estadísticas ---
     def get_all_matches(self):
-        return self.conn.execute("SELECT id, match_date, rival, result FROM matches ORDER BY match_date DESC").fetchall()
+        return self._records(MatchSummary, f"SELECT {columns(MatchSummary)} FROM matches ORDER BY match_date DESC")
     
+    def get_matches_page(self, after=None, limit=PAGE_SIZE):
+        return self._keyset_page(MatchSummary, "matches", "match_date", True, after, limit)
+
+    def get_matches_between(self, start, end):
+        """Partidos entre dos fechas (ambas incluidas), en orden cronológico."""
+        low, high = day_range(start, end)
+        return self._records(MatchSummary, f"SELECT {columns(MatchSummary)} FROM matches WHERE match_date >= ? AND match_date < ? ORDER BY match_date ASC", (low, high))
+
+    def get_matches_in_season(self, season):
+        """Partidos de una temporada ('2025/2026', '2025-26' o 2025), en orden cronológico."""
+        low, high = season_range(season)
+        schema = season_archive.season_schema(self, season)
+        return self._records(MatchSummary, f"SELECT {columns(MatchSummary)} FROM {schema}.matches WHERE match_date >= ? AND match_date < ? ORDER BY match_date ASC", (low, high))
+
+    def get_match_history(self):
+        """Todos los partidos, incluidos los de temporadas archivadas."""
+        return self._records(MatchSummary, f"SELECT {columns(MatchSummary)} FROM {self._history('matches')} ORDER BY match_date DESC")
+
     def get_match_details(self, match_id):
-        return self.conn.execute("SELECT * FROM matches WHERE id = ?", (match_id,)).fetchone()
+        match = self._record(Match, f"SELECT {columns(Match)} FROM matches WHERE id = ?", (match_id,))
+        if match is None and self._has_archives():
+            match = self._record(Match, f"SELECT {columns(Match)} FROM history_matches WHERE id = ?", (match_id,))
+        return match
     
     def save_match(self, details):
+        """Crea o actualiza el partido y devuelve su id; con details['row_version'] falla si otro lo ha cambiado."""
         cursor = self.conn.cursor()
         match_id = details.get('id')
-        data = (details['match_date'], details['competition'], details['rival'], details['venue'], details['is_home'], details['result'])
+        data = (to_iso_date(details['match_date']), details['competition'], details['rival'], details['venue'], details['is_home'], details['result'])
         if match_id:
-            cursor.execute("UPDATE matches SET match_date=?, competition=?, rival=?, venue=?, is_home=?, result=? WHERE id=?", (*data, match_id))
+            self._versioned_update('matches', match_id, details.get('row_version'),
+                                   "match_date=?, competition=?, rival=?, venue=?, is_home=?, result=?", data)
         else:
             cursor.execute("INSERT INTO matches (match_date, competition, rival, venue, is_home, result) VALUES (?,?,?,?,?,?)", data)
             match_id = cursor.lastrowid
-        self.conn.commit()
+        self._commit()
         return match_id
     
     def delete_match(self, match_id):
         self.conn.execute("DELETE FROM matches WHERE id = ?", (match_id,))
-        self.conn.commit()
+        self._commit()
     
-    def get_stats_for_match(self, match_id):
-        return self.conn.execute("SELECT p.id, p.name, p.number, COALESCE(s.minutes_played, 0), COALESCE(s.goals, 0), COALESCE(s.assists, 0), COALESCE(s.shots, 0), COALESCE(s.yellow_cards, 0), COALESCE(s.red_cards, 0) FROM players p LEFT JOIN player_match_stats s ON p.id = s.player_id AND s.match_id = ? ORDER BY p.name ASC", (match_id,)).fetchall()
+    def get_stats_for_match(self, match_id, dense=True):
+        """Estadísticas del partido. Con dense=True incluye a toda la plantilla con ceros para quien no tenga fila."""
+        if dense:
+            return self.conn.execute("SELECT p.id, p.name, p.number, COALESCE(s.minutes_played, 0), COALESCE(s.goals, 0), COALESCE(s.assists, 0), COALESCE(s.shots, 0), COALESCE(s.yellow_cards, 0), COALESCE(s.red_cards, 0) FROM players p LEFT JOIN player_match_stats s ON p.id = s.player_id AND s.match_id = ? ORDER BY p.name ASC", (match_id,)).fetchall()
+        return self.conn.execute("SELECT p.id, p.name, p.number, s.minutes_played, s.goals, s.assists, s.shots, s.yellow_cards, s.red_cards FROM player_match_stats s JOIN players p ON p.id = s.player_id WHERE s.match_id = ? ORDER BY p.name ASC", (match_id,)).fetchall()
     
     def save_player_stats_for_match(self, match_id, stats_data):
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM player_match_stats WHERE match_id = ?", (match_id,))
-        for player_stats in stats_data:
-            cursor.execute("INSERT INTO player_match_stats (match_id, player_id, minutes_played, goals, assists, shots, yellow_cards, red_cards) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (match_id, *player_stats))
-        self.conn.commit()
+        """Guarda solo los jugadores con minutos o alguna acción; las filas a cero no se almacenan."""
+        rows = []
+        for player_id, *values in stats_data:
+            values = [int(v or 0) for v in values]
+            if any(values): rows.append((match_id, int(player_id), *values))
+        with self.transaction():
+            self.conn.execute("DELETE FROM player_match_stats WHERE match_id = ?", (match_id,))
+            self.conn.executemany("INSERT INTO player_match_stats (match_id, player_id, minutes_played, goals, assists, shots, yellow_cards, red_cards) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
     
-    def get_squad_stats_report(self):
-        return self.conn.execute("SELECT p.name, p.shirt_name, p.photo_path, COUNT(s.match_id), SUM(s.minutes_played), SUM(s.goals), SUM(s.assists), SUM(s.shots), SUM(s.yellow_cards), SUM(s.red_cards) FROM players p LEFT JOIN player_match_stats s ON p.id = s.player_id GROUP BY p.id HAVING COUNT(s.match_id) > 0 ORDER BY p.name ASC").fetchall()
+    def get_squad_stats_report(self, season=None):
+        """Totales por jugador leídos de player_season_totals: de una temporada o, sin ella, de todas."""
+        season_filter, params = ("WHERE t.season = ?", (season,)) if season else ("", ())
+        return self.conn.execute(f"SELECT p.name, p.shirt_name, p.photo_path, SUM(t.matches_played), SUM(t.minutes_played), SUM(t.goals), SUM(t.assists), SUM(t.shots), SUM(t.yellow_cards), SUM(t.red_cards) FROM player_season_totals t JOIN players p ON p.id = t.player_id {season_filter} GROUP BY t.player_id ORDER BY p.name ASC", params).fetchall()
+
+    def get_stat_leaders(self, stat, season=None, limit=10):
+        """Clasificación de jugadores por una estadística ('goals', 'assists', 'minutes_played'...)."""
+        if stat not in SEASON_TOTAL_STATS: raise ValueError(f"Estadística no válida: {stat}")
+        season_filter, params = ("WHERE t.season = ?", (season,)) if season else ("", ())
+        return self.conn.execute(f"SELECT p.id, p.name, p.number, SUM(t.{stat}) AS total FROM player_season_totals t JOIN players p ON p.id = t.player_id {season_filter} GROUP BY t.player_id HAVING total > 0 ORDER BY total DESC, p.name ASC LIMIT ?", (*params, limit)).fetchall()
+
+    def get_player_season_totals(self, player_id):
+        """Totales de un jugador por temporada, de la más reciente a la más antigua."""
+        return self.conn.execute("SELECT season, matches_played, minutes_played, goals, assists, shots, yellow_cards, red_cards FROM player_season_totals WHERE player_id = ? ORDER BY season DESC", (player_id,)).fetchall()
+
+    def get_stats_seasons(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT season FROM player_season_totals ORDER BY season DESC")]
+
+    def rebuild_season_totals(self):
+        """Recalcula la tabla de totales desde las estadísticas de partido, incluidas las temporadas archivadas."""
+        # Se adjuntan los archivos antes de abrir la transacción; las temporadas cuyo archivo no está
+        # adjunto (falta el fichero o superan MAX_ATTACHED_ARCHIVES) conservan los totales guardados
+        stats, matches = self._history('player_match_stats'), self._history('matches')
+        attached = set(self._attached_archives.values())
+        missing = [season for season in self.get_archived_seasons() if season not in attached]
+        with self.transaction():
+            rebuild_season_totals(self.conn.cursor(), stats, matches, missing)
     
     def get_match_stats_report(self, match_id):
-        return self.conn.execute("SELECT p.name, p.shirt_name, p.photo_path, p.number, s.minutes_played, s.goals, s.assists, s.shots, s.yellow_cards, s.red_cards FROM player_match_stats s JOIN players p ON s.player_id = p.id WHERE s.match_id = ? ORDER BY s.minutes_played DESC, p.name ASC", (match_id,)).fetchall()
+        return self.conn.execute(f"SELECT p.name, p.shirt_name, p.photo_path, p.number, s.minutes_played, s.goals, s.assists, s.shots, s.yellow_cards, s.red_cards FROM {self._history('player_match_stats')} s JOIN players p ON s.player_id = p.id WHERE s.match_id = ? ORDER BY s.minutes_played DESC, p.name ASC", (match_id,)).fetchall()
+
+    # --- Métodos de Archivo de Temporadas ---
+    def _has_archives(self):
+        return season_archive.attach_archives(self) > 0
+
+    def _history(self, table):
+        """Nombre de la tabla para consultas históricas: la vista history_<tabla> si hay temporadas archivadas."""
+        return f"history_{table}" if self._has_archives() else table
+
+    def get_archived_seasons(self):
+        return season_archive.archived_seasons(self)
+
+    def get_archivable_seasons(self):
+        return season_archive.archivable_seasons(self)
+
+    def archive_season(self, season):
+        """Mueve una temporada cerrada a su archivo; devuelve las filas movidas por tabla."""
+        return season_archive.archive_season(self, season)
 
     # --- Métodos para Entrenamientos, Ejercicios, Plantillas y Diseños ---
     def get_all_trainings_for_dropdown(self): 
-        return self.conn.execute("SELECT id, date, mesocycle, session_number FROM trainings ORDER BY date DESC").fetchall()
+        return self._records(TrainingSummary, f"SELECT {columns(TrainingSummary)} FROM trainings ORDER BY date DESC")
 
     def get_all_trainings(self): 
-        return self.conn.execute("SELECT * FROM trainings ORDER BY date DESC").fetchall()
+        return self._records(Training, f"SELECT {columns(Training)} FROM trainings ORDER BY date DESC")
+
+    def get_trainings_page(self, after=None, limit=PAGE_SIZE):
+        return self._keyset_page(Training, "trainings", "date", True, after, limit)
+
+    def get_training_by_id(self, training_id):
+        return self._record(Training, f"SELECT {columns(Training)} FROM trainings WHERE id = ?", (training_id,))
+
+    def get_trainings_between(self, start, end):
+        """Entrenamientos entre dos fechas (ambas incluidas), en orden cronológico."""
+        low, high = day_range(start, end)
+        return self._records(Training, f"SELECT {columns(Training)} FROM trainings WHERE date >= ? AND date < ? ORDER BY date ASC", (low, high))
+
+    def get_trainings_in_season(self, season):
+        """Entrenamientos de una temporada, en orden cronológico."""
+        low, high = season_range(season)
+        schema = season_archive.season_schema(self, season)
+        return self._records(Training, f"SELECT {columns(Training)} FROM {schema}.trainings WHERE date >= ? AND date < ? ORDER BY date ASC", (low, high))
 
     def delete_training(self, training_id):
         """Elimina un entrenamiento y todos sus datos asociados manualmente."""
@@ -227,139 +629,197 @@ class Database:
         cursor.execute("DELETE FROM training_attendance WHERE training_id = ?", (training_id,))
         # Finalmente, borra el entrenamiento
         cursor.execute("DELETE FROM trainings WHERE id = ?", (training_id,))
-        self.conn.commit()
+        self._commit()
+
+    def save_layout(self, name, elements):
+        """Guarda un diseño (lista de elementos del editor) y devuelve su id.
 
-    def save_layout(self, name, layout_data):
-        self.conn.execute("INSERT OR REPLACE INTO field_layouts (name, layout_data) VALUES (?, ?)", (name, layout_data))
-        self.conn.commit()
+        Si ya existe uno con ese nombre se actualiza conservando su id: solo se escriben los
+        elementos que han cambiado y se borran los que sobran.
+        """
+        with self.transaction():
+            cursor = self.conn.cursor()
+            cursor.execute("INSERT INTO field_layouts (name, layout_data) VALUES (?, '') ON CONFLICT(name) DO NOTHING", (name,))
+            layout_id = cursor.execute("SELECT id FROM field_layouts WHERE name = ?", (name,)).fetchone()[0]
+            existing = {e.seq: e for e in self._records(LayoutElement, f"SELECT {columns(LayoutElement)} FROM layout_elements WHERE layout_id = ?", (layout_id,))}
+            rows = [layout_element_from_data(layout_id, seq, data) for seq, data in enumerate(elements)]
+            changed = [row for row in rows if existing.get(row.seq) != row]
+            if changed:
+                cursor.executemany(f"INSERT OR REPLACE INTO layout_elements ({columns(LayoutElement)}) VALUES ({', '.join('?' for _ in LayoutElement._fields)})", changed)
+            cursor.execute("DELETE FROM layout_elements WHERE layout_id = ? AND seq >= ?", (layout_id, len(rows)))
+        return layout_id
 
     def update_layout_name(self, layout_id, new_name):
         self.conn.execute("UPDATE field_layouts SET name = ? WHERE id = ?", (new_name, layout_id))
-        self.conn.commit()
+        self._commit()
 
     def delete_layout(self, layout_id):
         self.conn.execute("DELETE FROM field_layouts WHERE id = ?", (layout_id,))
-        self.conn.commit()
+        self._commit()
 
     def get_all_layouts(self):
         return self.conn.execute("SELECT id, name FROM field_layouts ORDER BY name ASC").fetchall()
 
-    def get_layout_data_by_id(self, layout_id):
-        result = self.conn.execute("SELECT layout_data FROM field_layouts WHERE id = ?", (layout_id,)).fetchone()
-        return result[0] if result else None
+    def get_layout_elements(self, layout_id):
+        """Elementos de un diseño en el formato del editor de campo, en su orden de dibujo."""
+        elements = self._records(LayoutElement, f"SELECT {columns(LayoutElement)} FROM layout_elements WHERE layout_id = ? ORDER BY seq", (layout_id,))
+        return [layout_element_to_data(e) for e in elements]
+
+    def get_layouts_using_player(self, player_id):
+        return self.conn.execute("SELECT DISTINCT l.id, l.name FROM layout_elements e JOIN field_layouts l ON l.id = e.layout_id WHERE e.player_id = ? ORDER BY l.name ASC", (player_id,)).fetchall()
 
     def get_exercises_by_ids(self, exercise_ids):
         if not exercise_ids: return []
         placeholders = ', '.join('?' for _ in exercise_ids)
-        query = f"SELECT * FROM exercises WHERE id IN ({placeholders})"
-        return self.conn.execute(query, exercise_ids).fetchall()
+        query = f"SELECT {columns(Exercise)} FROM exercises WHERE id IN ({placeholders})"
+        return self._records(Exercise, query, exercise_ids)
 
     def get_exercises_by_training(self, training_id):
         if training_id is None:
-            return self.conn.execute("SELECT * FROM exercises ORDER BY name ASC").fetchall()
+            return self._records(Exercise, f"SELECT {columns(Exercise)} FROM exercises ORDER BY name ASC")
         else:
-            return self.conn.execute("SELECT * FROM exercises WHERE training_id = ? ORDER BY name ASC", (training_id,)).fetchall()
+            return self._records(Exercise, f"SELECT {columns(Exercise)} FROM exercises WHERE training_id = ? ORDER BY name ASC", (training_id,))
+
+    def get_exercise_summaries(self):
+        """Solo id, nombre, categoría y duración de todos los ejercicios, para las listas."""
+        return self._records(ExerciseSummary, f"SELECT {columns(ExerciseSummary)} FROM exercises ORDER BY name ASC")
+
+    def get_exercise_summaries_page(self, after=None, limit=PAGE_SIZE, category=None):
+        if category: return self._keyset_page(ExerciseSummary, "exercises", "name", False, after, limit, "category = ?", (category,))
+        return self._keyset_page(ExerciseSummary, "exercises", "name", False, after, limit)
+
+    def search_exercises(self, query, category=None, limit=50, offset=0):
+        """Busca ejercicios por texto (nombre, descripción, objetivos, normas, variantes), ordenados por relevancia.
+
+        Cada palabra se busca como prefijo y sin tener en cuenta tildes: 'tact pos' encuentra 'Táctico de posesión'.
+        El orden por relevancia no tiene una clave por la que continuar: las páginas siguientes se piden con `offset`.
+        """
+        words = re.findall(r"\w+", query or "")
+        if not words:
+            if category:
+                return self._records(ExerciseSummary, f"SELECT {columns(ExerciseSummary)} FROM exercises WHERE category = ? ORDER BY name ASC, id ASC LIMIT ? OFFSET ?", (category, limit, offset))
+            return self._records(ExerciseSummary, f"SELECT {columns(ExerciseSummary)} FROM exercises ORDER BY name ASC, id ASC LIMIT ? OFFSET ?", (limit, offset))
+        category_filter, params = ("AND e.category = ?", (category,)) if category else ("", ())
+        if self._has_exercise_fts():
+            match = " ".join(f'"{w}"*' for w in words)
+            # Pesos bm25 por columna: el nombre y la categoría cuentan más que el texto largo
+            return self._records(ExerciseSummary, f"SELECT {columns(ExerciseSummary, 'e.')} FROM exercises_fts f JOIN exercises e ON e.id = f.rowid WHERE exercises_fts MATCH ? {category_filter} ORDER BY bm25(exercises_fts, 10.0, 2.0, 2.0, 1.0, 1.0, 5.0), e.id LIMIT ? OFFSET ?", (match, *params, limit, offset))
+        # Sin FTS5: LIKE sobre todas las columnas de texto (sin ranking)
+        text = "(COALESCE(e.name, '') || ' ' || COALESCE(e.description, '') || ' ' || COALESCE(e.objectives, '') || ' ' || COALESCE(e.rules, '') || ' ' || COALESCE(e.variants, '') || ' ' || COALESCE(e.category, ''))"
+        conditions = " AND ".join(f"{text} LIKE ?" for _ in words)
+        return self._records(ExerciseSummary, f"SELECT {columns(ExerciseSummary, 'e.')} FROM exercises e WHERE {conditions} {category_filter} ORDER BY e.name ASC, e.id ASC LIMIT ? OFFSET ?", (*[f"%{w}%" for w in words], *params, limit, offset))
+
+    def _ensure_exercise_fts(self):
+        """Crea el índice de texto si la migración 6 se aplicó con un SQLite sin FTS5 y el actual sí lo tiene."""
+        if self._has_exercise_fts() or not fts5_available(self.conn.cursor()): return
+        try:
+            with self.transaction():
+                # Releer dentro de la transacción por si otra instancia acaba de crearlo
+                if self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'exercises_fts'").fetchone() is None:
+                    create_exercises_fts(self.conn.cursor())
+            self._exercise_fts = True
+        except sqlite3.Error as e:
+            print(f"Error al crear el índice de búsqueda de ejercicios: {e}")
+
+    def _has_exercise_fts(self):
+        if self._exercise_fts is None:
+            self._exercise_fts = self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'exercises_fts'").fetchone() is not None
+        return self._exercise_fts
     
     def insert_training(self, date, mesocycle, session, coach, assistant, material):
         cursor = self.conn.cursor()
-        cursor.execute("INSERT INTO trainings (date, mesocycle, session_number, coach, assistant_coach, material) VALUES (?, ?, ?, ?, ?, ?)", (date, mesocycle, session, coach, assistant, material))
-        self.conn.commit()
+        cursor.execute("INSERT INTO trainings (date, mesocycle, session_number, coach, assistant_coach, material) VALUES (?, ?, ?, ?, ?, ?)", (to_iso_date(date), mesocycle, session, coach, assistant, material))
+        self._commit()
         return cursor.lastrowid
     
     def update_training(self, tid, date, mesocycle, session, coach, assistant, material):
-        self.conn.execute("UPDATE trainings SET date = ?, mesocycle = ?, session_number = ?, coach = ?, assistant_coach = ?, material = ? WHERE id = ?", (date, mesocycle, session, coach, assistant, material, tid))
-        self.conn.commit()
+        self.conn.execute("UPDATE trainings SET date = ?, mesocycle = ?, session_number = ?, coach = ?, assistant_coach = ?, material = ? WHERE id = ?", (to_iso_date(date), mesocycle, session, coach, assistant, material, tid))
+        self._commit()
 
     def insert_exercise(self, training_id, name, desc, dur, rep, space, obj, rules, var, img, category):
         cursor = self.conn.cursor()
         cursor.execute("INSERT INTO exercises (training_id, name, description, duration, repetitions, space, objectives, rules, variants, image_path, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (training_id, name, desc, dur, rep, space, obj, rules, var, img, category))
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def update_exercise(self, eid, tid, name, desc, dur, rep, space, obj, rules, var, img, category):
         self.conn.execute("UPDATE exercises SET training_id=?, name=?, description=?, duration=?, repetitions=?, space=?, objectives=?, rules=?, variants=?, image_path=?, category=? WHERE id=?", (tid, name, desc, dur, rep, space, obj, rules, var, img, category, eid))
-        self.conn.commit()
+        self._commit()
 
     def delete_exercise(self, exercise_id):
         self.conn.execute("DELETE FROM exercises WHERE id = ?", (exercise_id,))
-        self.conn.commit()
+        self._commit()
 
     def get_exercise_by_id(self, exercise_id):
-        return self.conn.execute("SELECT * FROM exercises WHERE id = ?", (exercise_id,)).fetchone()
+        return self._record(Exercise, f"SELECT {columns(Exercise)} FROM exercises WHERE id = ?", (exercise_id,))
     
     def get_attendance_for_training(self, training_id): 
-        return self.conn.execute("SELECT p.id, p.name, p.position, ta.status, p.photo_path, p.shirt_name FROM players p JOIN training_attendance ta ON p.id = ta.player_id WHERE ta.training_id = ?", (training_id,)).fetchall()
+        return self._records(AttendanceEntry, "SELECT p.id, p.name, p.position, ta.status, p.photo_path, p.shirt_name FROM players p JOIN training_attendance ta ON p.id = ta.player_id WHERE ta.training_id = ?", (training_id,))
     
     def get_unassigned_players(self, training_id):
-        return self.conn.execute("SELECT * FROM players WHERE id NOT IN (SELECT player_id FROM training_attendance WHERE training_id = ?)", (training_id,)).fetchall()
+        return self._records(PlayerSummary, f"SELECT {columns(PlayerSummary)} FROM players WHERE id NOT IN (SELECT player_id FROM training_attendance WHERE training_id = ?) ORDER BY name ASC", (training_id,))
     
     def set_player_attendance(self, training_id, player_id, status):
         self.conn.execute("INSERT INTO training_attendance (training_id, player_id, status) VALUES (?, ?, ?) ON CONFLICT(training_id, player_id) DO UPDATE SET status = excluded.status", (training_id, player_id, status))
-        self.conn.commit()
+        self._commit()
     
     def remove_player_from_training(self, training_id, player_id):
         self.conn.execute("DELETE FROM training_attendance WHERE training_id = ? AND player_id = ?", (training_id, player_id))
-        self.conn.commit()
+        self._commit()
         
     def save_training_as_template(self, training_id, template_name):
-        cursor = self.conn.cursor()
         try:
-            training_info = cursor.execute("SELECT material FROM trainings WHERE id=?", (training_id,)).fetchone()
-            exercises = cursor.execute("SELECT name, description, duration, repetitions, space, objectives, rules, variants, image_path, category FROM exercises WHERE training_id=?", (training_id,)).fetchall()
-            attendance = cursor.execute("SELECT player_id, status FROM training_attendance WHERE training_id=?", (training_id,)).fetchall()
-            exercises_json = json.dumps(exercises); attendance_json = json.dumps(attendance)
-            material = training_info[0] if training_info else ""
-            cursor.execute("INSERT INTO training_templates (name, exercises_data, attendance_data, material) VALUES (?, ?, ?, ?)", (template_name, exercises_json, attendance_json, material))
-            self.conn.commit()
+            with self.transaction():
+                cursor = self.conn.execute("INSERT INTO training_templates (name, material) SELECT ?, COALESCE((SELECT material FROM trainings WHERE id = ?), '')", (template_name, training_id))
+                template_id = cursor.lastrowid
+                # Copia directa dentro de SQLite: las filas no pasan por Python
+                self.conn.execute(f"INSERT INTO template_exercises (template_id, seq, {TEMPLATE_EXERCISE_COLUMNS}) SELECT ?, id, {TEMPLATE_EXERCISE_COLUMNS} FROM exercises WHERE training_id = ?", (template_id, training_id))
+                self.conn.execute("INSERT INTO template_attendance (template_id, player_id, status) SELECT ?, player_id, status FROM training_attendance WHERE training_id = ?", (template_id, training_id))
             return True
-        except self.conn.IntegrityError: return False
-        except Exception as e: print(f"Error al guardar plantilla: {e}"); self.conn.rollback(); return False
+        except sqlite3.IntegrityError: return False
+        except Exception as e: print(f"Error al guardar plantilla: {e}"); return False
     
     def get_all_templates(self):
         return self.conn.execute("SELECT id, name FROM training_templates ORDER BY name ASC").fetchall()
     
     def delete_template(self, template_id):
         self.conn.execute("DELETE FROM training_templates WHERE id = ?", (template_id,))
-        self.conn.commit()
+        self._commit()
     
     def load_template_to_training(self, template_id, target_training_id):
-        cursor = self.conn.cursor()
+        if not self.conn.execute("SELECT 1 FROM training_templates WHERE id = ?", (template_id,)).fetchone(): return False
         try:
-            template_data = cursor.execute("SELECT exercises_data, attendance_data, material FROM training_templates WHERE id=?", (template_id,)).fetchone()
-            if not template_data: return False
-            exercises_json, attendance_json, material = template_data
-            exercises = json.loads(exercises_json); attendance = json.loads(attendance_json)
-            cursor.execute("DELETE FROM exercises WHERE training_id = ?", (target_training_id,))
-            cursor.execute("DELETE FROM training_attendance WHERE training_id = ?", (target_training_id,))
-            for ex in exercises:
-                cursor.execute("INSERT INTO exercises (training_id, name, description, duration, repetitions, space, objectives, rules, variants, image_path, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (target_training_id, *ex))
-            for player_id, status in attendance:
-                cursor.execute("INSERT INTO training_attendance (training_id, player_id, status) VALUES (?, ?, ?)", (target_training_id, player_id, status))
-            cursor.execute("UPDATE trainings SET material = ? WHERE id = ?", (material, target_training_id))
-            self.conn.commit()
+            with self.transaction():
+                cursor = self.conn.cursor()
+                cursor.execute("DELETE FROM exercises WHERE training_id = ?", (target_training_id,))
+                cursor.execute("DELETE FROM training_attendance WHERE training_id = ?", (target_training_id,))
+                cursor.execute(f"INSERT INTO exercises (training_id, {TEMPLATE_EXERCISE_COLUMNS}) SELECT ?, {TEMPLATE_EXERCISE_COLUMNS} FROM template_exercises WHERE template_id = ? ORDER BY seq", (target_training_id, template_id))
+                # El JOIN descarta a los jugadores que ya no están en la plantilla del club
+                cursor.execute("INSERT INTO training_attendance (training_id, player_id, status) SELECT ?, t.player_id, t.status FROM template_attendance t JOIN players p ON p.id = t.player_id WHERE t.template_id = ?", (target_training_id, template_id))
+                cursor.execute("UPDATE trainings SET material = (SELECT material FROM training_templates WHERE id = ?) WHERE id = ?", (template_id, target_training_id))
             return True
-        except Exception as e: print(f"Error al cargar plantilla: {e}"); self.conn.rollback(); return False
+        except Exception as e: print(f"Error al cargar plantilla: {e}"); return False
 
     # --- Métodos de Historial y Lesiones ---
     def get_career_history_for_player(self, player_id):
         return self.conn.execute("SELECT * FROM career_history WHERE player_id = ? ORDER BY season DESC", (player_id,)).fetchall()
     def insert_career_entry(self, data):
         self.conn.execute("INSERT INTO career_history (player_id, season, team_name, matches_played, goals_scored, assists, yellow_cards, red_cards, saves, goals_conceded) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", tuple(data.values()))
-        self.conn.commit()
+        self._commit()
     def update_career_entry(self, entry_id, data):
         self.conn.execute("UPDATE career_history SET season=?, team_name=?, matches_played=?, goals_scored=?, assists=?, yellow_cards=?, red_cards=?, saves=?, goals_conceded=? WHERE id = ?", (*data.values(), entry_id))
-        self.conn.commit()
+        self._commit()
     def delete_career_entry(self, entry_id):
         self.conn.execute("DELETE FROM career_history WHERE id = ?", (entry_id,))
-        self.conn.commit()
+        self._commit()
     def get_injuries_for_player(self, player_id):
         return self.conn.execute("SELECT * FROM injuries WHERE player_id = ? ORDER BY injury_date DESC", (player_id,)).fetchall()
     def insert_injury(self, data):
-        self.conn.execute("INSERT INTO injuries (player_id, injury_date, injury_type, recovery_period, notes) VALUES (?, ?, ?, ?, ?)", tuple(data.values()))
-        self.conn.commit()
+        self.conn.execute("INSERT INTO injuries (player_id, injury_date, injury_type, recovery_period, notes) VALUES (?, ?, ?, ?, ?)", (data['player_id'], to_iso_date(data['injury_date']), data['injury_type'], data['recovery_period'], data['notes']))
+        self._commit()
     def update_injury(self, injury_id, data):
-        self.conn.execute("UPDATE injuries SET injury_date=?, injury_type=?, recovery_period=?, notes=? WHERE id = ?", (*data.values(), injury_id))
-        self.conn.commit()
+        self.conn.execute("UPDATE injuries SET injury_date=?, injury_type=?, recovery_period=?, notes=? WHERE id = ?", (to_iso_date(data['injury_date']), data['injury_type'], data['recovery_period'], data['notes'], injury_id))
+        self._commit()
     def delete_injury(self, injury_id):
         self.conn.execute("DELETE FROM injuries WHERE id = ?", (injury_id,))
-        self.conn.commit()
\ No newline at end of file
+        self._commit()
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""Conversión de fechas entre el formato de la interfaz y el formato ISO-8601 de la base de datos.
+
+En la base de datos las fechas se guardan como 'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM', de modo que
+el orden alfabético coincide con el cronológico y los índices sirven para consultas por rango.
+La interfaz sigue mostrando y aceptando 'dd/mm/aaaa' y 'dd/mm/aaaa HH:MM'.
+"""
+from datetime import date, datetime, timedelta
+
+ISO_DATE = '%Y-%m-%d'
+ISO_DATETIME = '%Y-%m-%d %H:%M'
+DISPLAY_DATE = '%d/%m/%Y'
+DISPLAY_DATETIME = '%d/%m/%Y %H:%M'
+
+# Formatos aceptados al leer, del más al menos específico. El bool indica si incluye hora.
+_INPUT_FORMATS = [
+    (ISO_DATETIME, True), ('%Y-%m-%d %H:%M:%S', True), ('%Y-%m-%dT%H:%M', True), ('%Y-%m-%dT%H:%M:%S', True),
+    (DISPLAY_DATETIME, True), ('%d-%m-%Y %H:%M', True),
+    (ISO_DATE, False), (DISPLAY_DATE, False), ('%d-%m-%Y', False), ('%d/%m/%y', False),
+]
+
+# Las temporadas empiezan el 1 de julio
+SEASON_START_MONTH = 7
+
+def _parse(value):
+    """Devuelve (datetime, tiene_hora) o (None, False) si el valor no es una fecha reconocible."""
+    if isinstance(value, datetime): return value, True
+    if isinstance(value, date): return datetime(value.year, value.month, value.day), False
+    if not value: return None, False
+    text = str(value).strip()
+    for fmt, has_time in _INPUT_FORMATS:
+        try: return datetime.strptime(text, fmt), has_time
+        except ValueError: continue
+    return None, False
+
+def to_iso_date(value):
+    """Normaliza una fecha a ISO-8601. Los textos no reconocibles se devuelven sin cambios."""
+    dt, has_time = _parse(value)
+    if dt is None: return value
+    return dt.strftime(ISO_DATETIME if has_time else ISO_DATE)
+
+def to_display_date(value):
+    """Convierte una fecha guardada al formato dd/mm/aaaa [HH:MM] que usa la interfaz."""
+    dt, has_time = _parse(value)
+    if dt is None: return value or ""
+    return dt.strftime(DISPLAY_DATETIME if has_time else DISPLAY_DATE)
+
+def day_range(start, end):
+    """Límites [inicio, fin) en ISO para un rango de días inclusivo en ambos extremos."""
+    start_dt, _ = _parse(start)
+    end_dt, _ = _parse(end)
+    if start_dt is None or end_dt is None:
+        raise ValueError(f"Rango de fechas no válido: {start!r} - {end!r}")
+    return start_dt.strftime(ISO_DATE), (end_dt.date() + timedelta(days=1)).strftime(ISO_DATE)
+
+def season_range(season):
+    """Límites [inicio, fin) de una temporada: acepta 2025, '2025', '2025/2026' o '2025-26'."""
+    try:
+        first_year = int(str(season).replace('-', '/').split('/')[0])
+    except ValueError:
+        raise ValueError(f"Temporada no válida: {season!r}")
+    return f"{first_year:04d}-{SEASON_START_MONTH:02d}-01", f"{first_year + 1:04d}-{SEASON_START_MONTH:02d}-01"
+
+def season_for_date(value):
+    """Devuelve la temporada ('2025/2026') a la que pertenece una fecha, o None."""
+    dt, _ = _parse(value)
+    if dt is None: return None
+    first_year = dt.year if dt.month >= SEASON_START_MONTH else dt.year - 1
+    return f"{first_year}/{first_year + 1}"
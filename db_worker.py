@@ -0,0 +1,152 @@
+"""Acceso asíncrono a la base de datos para que la interfaz Tk no se bloquee.
+
+DatabaseWorker abre su propia conexión en un hilo dedicado y atiende las peticiones en orden
+de llegada: las escrituras se aplican exactamente en el orden en que se enviaron y los
+resultados llegan en ese mismo orden. Cada petición devuelve un concurrent.futures.Future
+(cancelable mientras no haya empezado) y sus callbacks se ejecutan en el hilo de Tk
+mediante root.after, así que pueden tocar widgets sin problemas.
+
+submit_read() envía consultas de solo lectura (informes, PDF, exportaciones) a un pequeño grupo
+de hilos con conexiones de solo lectura (ver read_pool): no esperan a la cola de escrituras y
+varias pueden ejecutarse a la vez, cada una sobre una foto consistente de la base de datos.
+
+ImmediateRunner ofrece la misma interfaz ejecutando en el momento sobre un Database
+existente; lo usan las pestañas cuando no se les pasa un worker.
+"""
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from database import Database
+from read_pool import ReadConnectionPool
+
+def _default_errback(error):
+    print(f"Error en la base de datos: {error}")
+
+def _resolve(db, func):
+    """Las peticiones pueden nombrar un método de Database o ser una función que recibe el Database."""
+    if isinstance(func, str): return getattr(db, func)
+    return lambda *args, **kwargs: func(db, *args, **kwargs)
+
+class DatabaseWorker:
+    def __init__(self, root, db_path=None, profile=None, poll_ms=25, read_workers=3):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._ready = threading.Event()
+        self._startup_error = None
+        self._closed = False
+        # Se llama en el hilo de Tk cuando termina alguna escritura, antes de sus callbacks; main.py pone
+        # aquí ChangeWatcher.check_now para que la caché de la interfaz no lea datos ya cambiados
+        self.after_write = None
+        self._thread = threading.Thread(target=self._run, args=(db_path, profile), name="DatabaseWorker", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._startup_error: raise self._startup_error
+        self._read_pool = ReadConnectionPool(self._db_path, profile)
+        self._read_executor = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="DatabaseReader")
+        self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    # --- Hilo de trabajo ---
+    def _run(self, db_path, profile):
+        try:
+            # La conexión sqlite3 pertenece al hilo que la crea: se abre aquí y no en el hilo de Tk
+            db = Database(db_path, profile=profile, profile_queries=False)
+        except Exception as e:
+            self._startup_error = e
+            self._ready.set()
+            return
+        self._db_path = db.db_path
+        self._ready.set()
+        try:
+            while True:
+                item = self._requests.get()
+                if item is None: break
+                future, func, args, kwargs = item
+                if not future.set_running_or_notify_cancel(): continue
+                try:
+                    future.set_result(_resolve(db, func)(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            db.close()
+
+    # --- Hilo de Tk ---
+    def submit(self, func, *args, callback=None, errback=None, **kwargs):
+        """Encola una petición y devuelve su Future.
+
+        `func` es el nombre de un método de Database o una función f(db, *args, **kwargs).
+        `callback(resultado)` o `errback(excepción)` se llaman después en el hilo de Tk;
+        si la petición se cancela no se llama a ninguno.
+        """
+        if self._closed: raise RuntimeError("El acceso a la base de datos en segundo plano está cerrado")
+        future = Future()
+        future.add_done_callback(lambda f: self._results.put((f, callback, errback or _default_errback, True)))
+        self._requests.put((future, func, args, kwargs))
+        return future
+
+    def submit_read(self, func, *args, callback=None, errback=None, **kwargs):
+        """Como submit(), pero en un hilo de lectura: `func` recibe un Database de solo lectura.
+
+        Las consultas de una misma petición ven la base de datos tal y como estaba al empezar.
+        """
+        if self._closed: raise RuntimeError("El acceso a la base de datos en segundo plano está cerrado")
+        future = self._read_executor.submit(self._run_read, func, args, kwargs)
+        future.add_done_callback(lambda f: self._results.put((f, callback, errback or _default_errback, False)))
+        return future
+
+    def _run_read(self, func, args, kwargs):
+        with self._read_pool.snapshot() as db:
+            return _resolve(db, func)(*args, **kwargs)
+
+    def _poll(self):
+        while True:
+            try: future, callback, errback, is_write = self._results.get_nowait()
+            except queue.Empty: break
+            if future.cancelled(): continue
+            if is_write and self.after_write:
+                try: self.after_write()
+                except Exception as e: print(f"Error al aplicar los cambios del hilo de la base de datos: {e}")
+            error = future.exception()
+            try:
+                if error is not None: errback(error)
+                elif callback: callback(future.result())
+            except Exception as e:
+                print(f"Error en callback de base de datos: {e}")
+        if not self._closed:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def close(self, timeout=10):
+        """Termina las peticiones pendientes y cierra la conexión del hilo de trabajo."""
+        if self._closed: return
+        self._closed = True
+        self._requests.put(None)
+        self._thread.join(timeout)
+        self._read_executor.shutdown(wait=True, cancel_futures=True)
+        self._read_pool.close_all()
+        try: self.root.after_cancel(self._poll_id)
+        except Exception: pass
+
+class ImmediateRunner:
+    """Misma interfaz que DatabaseWorker pero ejecutando en el momento en el hilo actual."""
+    def __init__(self, db):
+        self.db = db
+
+    def submit(self, func, *args, callback=None, errback=None, **kwargs):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(_resolve(self.db, func)(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+            (errback or _default_errback)(e)
+            return future
+        if callback: callback(future.result())
+        return future
+
+    def submit_read(self, func, *args, callback=None, errback=None, **kwargs):
+        return self.submit(func, *args, callback=callback, errback=errback, **kwargs)
+
+    def close(self, timeout=None):
+        pass
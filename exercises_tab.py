@@ -1,9 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from PIL import Image, ImageTk
+from thumbnails import photo_thumbnail
 import os
 import shutil
 import sys
+from date_utils import to_display_date
+from virtual_list import PagedTreeview
 
 def resource_path(relative_path):
     try:
@@ -19,6 +21,7 @@ class ExercisesTab:
         self.image_path = None
         self.current_exercise_id = None
         self.exercise_image = None
+        self.search_job = None
         
         if not os.path.exists("data/exercise_images"):
             os.makedirs("data/exercise_images")
@@ -36,6 +39,19 @@ class ExercisesTab:
 
         list_frame = ttk.LabelFrame(main_frame, text="Listado de Ejercicios")
         list_frame.grid(row=0, column=0, sticky="ns", padx=(0, 10))
+
+        # Búsqueda mientras se escribe (texto completo sobre nombre, descripción, objetivos, normas y variantes)
+        search_frame = ttk.Frame(list_frame)
+        search_frame.pack(fill="x", pady=(5, 0))
+        ttk.Label(search_frame, text="Buscar:").pack(side="left")
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        search_entry.pack(side="left", fill="x", expand=True, padx=5)
+        self.search_category = ttk.Combobox(search_frame, state="readonly", width=14, values=["Todas", "Calentamiento", "Físico", "Técnico", "Táctico", "Estrategia", "Vuelta a la Calma"])
+        self.search_category.set("Todas")
+        self.search_category.pack(side="left")
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+        self.search_category.bind("<<ComboboxSelected>>", lambda e: self.load_all_exercises())
         
         cols = ("id", "name")
         self.exercises_tree = ttk.Treeview(list_frame, columns=cols, show="headings", height=25)
@@ -43,6 +59,7 @@ class ExercisesTab:
         self.exercises_tree.heading("name", text="Nombre del Ejercicio"); self.exercises_tree.column("name", width=250)
         self.exercises_tree.pack(fill="y", expand=True, side="top")
         self.exercises_tree.bind("<<TreeviewSelect>>", self.on_exercise_select)
+        self.exercises_pager = PagedTreeview(self.exercises_tree, self.fetch_exercises_page, lambda ex: (ex.id, ex.name))
         
         list_btn_frame = ttk.Frame(list_frame)
         list_btn_frame.pack(fill="x", pady=5)
@@ -218,14 +235,30 @@ class ExercisesTab:
 
     def refresh_trainings_dropdown(self):
         trainings = self.db.get_all_trainings_for_dropdown()
-        self.training_data = {f"{t[1]} (Sesión {t[3]})": t[0] for t in trainings}
+        self.training_data = {f"{to_display_date(t.date)} (Sesión {t.session_number})": t.id for t in trainings}
         self.training_dropdown['values'] = list(self.training_data.keys())
 
     def load_all_exercises(self):
-        for item in self.exercises_tree.get_children(): self.exercises_tree.delete(item)
-        all_exercises = self.db.get_exercises_by_training(None)
-        for ex in all_exercises:
-            self.exercises_tree.insert("", tk.END, values=(ex[0], ex[2]))
+        self.exercises_pager.reload()
+
+    def fetch_exercises_page(self, after, limit):
+        query = self.search_var.get().strip()
+        category = self.search_category.get()
+        category = None if category == "Todas" else category
+        if query:
+            # Orden por relevancia: la siguiente página empieza tras las filas ya mostradas
+            offset = len(self.exercises_tree.get_children()) if after is not None else 0
+            return self.db.search_exercises(query, category, limit=limit, offset=offset)
+        return self.db.get_exercise_summaries_page(after, limit, category=category)
+
+    def schedule_search(self):
+        """Espera a que se deje de teclear un momento antes de buscar."""
+        if self.search_job: self.frame.after_cancel(self.search_job)
+        self.search_job = self.frame.after(150, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        self.load_all_exercises()
 
     def load_exercise_image(self, path):
         if not path:
@@ -235,9 +268,7 @@ class ExercisesTab:
         try:
             full_path = resource_path(path)
             if os.path.exists(full_path):
-                img = Image.open(full_path)
-                img.thumbnail((300, 200), Image.LANCZOS)
-                self.exercise_image = ImageTk.PhotoImage(img)
+                self.exercise_image = photo_thumbnail(full_path, (300, 200))
                 self.image_label.config(image=self.exercise_image, text="")
             else:
                 self.image_label.config(image='', text="Sin Imagen")
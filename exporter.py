@@ -0,0 +1,186 @@
+"""Exportación en streaming de informes y tablas a CSV o JSON Lines.
+
+Las filas se leen del cursor en bloques de FETCH_SIZE y se escriben según llegan, así que la
+memoria no depende del tamaño del historial. Los informes (EXPORTS) usan las mismas tablas que los
+de ReportsTab, incluidas las temporadas archivadas (vistas history_*); además se puede exportar
+cualquier tabla con 'tabla:<nombre>' o cualquier consulta con export_query.
+
+El CSV usa ';' y BOM UTF-8 para que Excel en español lo abra directamente (y importer.py lo relee).
+Se escribe a un archivo temporal que sustituye al destino solo si la exportación termina bien.
+
+Uso desde la línea de comandos:
+    python exporter.py --list
+    python exporter.py squad_stats plantilla.csv --season 2025/2026
+    python exporter.py tabla:players jugadores.jsonl
+"""
+import argparse
+import csv
+import inspect
+import json
+import os
+import sys
+from collections import namedtuple
+
+from date_utils import season_range
+from season_archive import ARCHIVED_TABLES
+
+FETCH_SIZE = 1000
+FORMATS = ('csv', 'jsonl')
+
+ExportResult = namedtuple('ExportResult', 'path rows format')
+
+# --- Informes exportables: cada uno devuelve (sql, parámetros) ---
+def _squad_stats(db, season=None):
+    season_filter, params = ("WHERE t.season = ?", [season]) if season else ("", [])
+    return (f"SELECT p.name AS jugador, p.number AS dorsal, p.position AS posicion, SUM(t.matches_played) AS partidos, "
+            f"SUM(t.minutes_played) AS minutos, SUM(t.goals) AS goles, SUM(t.assists) AS asistencias, SUM(t.shots) AS tiros, "
+            f"SUM(t.yellow_cards) AS amarillas, SUM(t.red_cards) AS rojas "
+            f"FROM player_season_totals t JOIN players p ON p.id = t.player_id {season_filter} GROUP BY t.player_id ORDER BY p.name ASC", params)
+
+def _season_filter(column, season):
+    if not season: return "", []
+    return f"AND {column} >= ? AND {column} < ?", list(season_range(season))
+
+def _match_history(db, season=None):
+    where, params = _season_filter("match_date", season)
+    return (f"SELECT id AS partido_id, match_date AS fecha, competition AS competicion, rival, venue AS campo, is_home AS local, result AS resultado "
+            f"FROM {db._history('matches')} WHERE 1 = 1 {where} ORDER BY match_date ASC, id ASC", params)
+
+def _match_stats(db, season=None, match_id=None):
+    where, params = _season_filter("m.match_date", season)
+    if match_id: where += " AND m.id = ?"; params.append(match_id)
+    return (f"SELECT m.id AS partido_id, m.match_date AS fecha, m.rival, p.id AS jugador_id, p.name AS jugador, p.number AS dorsal, "
+            f"s.minutes_played AS minutos, s.goals AS goles, s.assists AS asistencias, s.shots AS tiros, s.yellow_cards AS amarillas, s.red_cards AS rojas "
+            f"FROM {db._history('player_match_stats')} s JOIN {db._history('matches')} m ON m.id = s.match_id JOIN players p ON p.id = s.player_id "
+            f"WHERE 1 = 1 {where} ORDER BY m.match_date ASC, m.id ASC, s.minutes_played DESC, p.name ASC", params)
+
+def _attendance(db, season=None, training_id=None):
+    where, params = _season_filter("t.date", season)
+    if training_id: where += " AND t.id = ?"; params.append(training_id)
+    return (f"SELECT t.id AS entrenamiento_id, t.date AS fecha, t.session_number AS sesion, p.id AS jugador_id, p.name AS jugador, a.status AS estado "
+            f"FROM {db._history('training_attendance')} a JOIN {db._history('trainings')} t ON t.id = a.training_id JOIN players p ON p.id = a.player_id "
+            f"WHERE 1 = 1 {where} ORDER BY t.date ASC, t.id ASC, p.name ASC", params)
+
+def _career(db, player_id=None):
+    where, params = ("WHERE c.player_id = ?", [player_id]) if player_id else ("", [])
+    return (f"SELECT p.id AS jugador_id, p.name AS jugador, c.season AS temporada, c.team_name AS equipo, c.matches_played AS partidos, "
+            f"c.goals_scored AS goles, c.assists AS asistencias, c.yellow_cards AS amarillas, c.red_cards AS rojas, c.saves AS paradas, c.goals_conceded AS goles_encajados "
+            f"FROM career_history c JOIN players p ON p.id = c.player_id {where} ORDER BY p.name ASC, c.season DESC", params)
+
+EXPORTS = {
+    'squad_stats': ("Estadísticas de plantilla", _squad_stats),
+    'match_history': ("Historial de partidos", _match_history),
+    'match_stats': ("Estadísticas por partido", _match_stats),
+    'attendance': ("Asistencia a entrenamientos", _attendance),
+    'career': ("Trayectoria de jugadores", _career),
+}
+
+TABLE_PREFIX = "tabla:"
+
+def exportable_tables(db):
+    """Tablas de la base de datos principal, sin las internas de SQLite ni las de búsqueda de texto."""
+    rows = db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE 'CREATE VIRTUAL%' ORDER BY name").fetchall()
+    fts = {r[0] for r in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL%'")}
+    return [name for (name,) in rows if not any(name.startswith(f + "_") for f in fts)]
+
+def _table(db, table):
+    if table not in exportable_tables(db): raise ValueError(f"No existe la tabla '{table}'")
+    # Las tablas archivadas se exportan completas, con las filas de todas las temporadas
+    source = db._history(table) if table in {t for t, _ in ARCHIVED_TABLES} else table
+    return f"SELECT * FROM {source}", []
+
+def _resolve(db, name, filters):
+    if name.startswith(TABLE_PREFIX): return _table(db, name[len(TABLE_PREFIX):])
+    if name not in EXPORTS: raise ValueError(f"Exportación desconocida: {name}")
+    return EXPORTS[name][1](db, **{k: v for k, v in filters.items() if v is not None})
+
+# --- Escritura ---
+def _rows(cursor):
+    while True:
+        batch = cursor.fetchmany(FETCH_SIZE)
+        if not batch: return
+        yield from batch
+
+def _write_csv(f, headers, rows):
+    writer = csv.writer(f, delimiter=';')
+    writer.writerow(headers)
+    count = 0
+    for row in rows:
+        writer.writerow(row); count += 1
+    return count
+
+def _write_jsonl(f, headers, rows):
+    count = 0
+    for row in rows:
+        f.write(json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=str)); f.write("\n"); count += 1
+    return count
+
+def format_for_path(path):
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext == 'json': ext = 'jsonl'
+    if ext not in FORMATS: raise ValueError(f"Formato no soportado: .{ext} (use .csv o .jsonl)")
+    return ext
+
+def export_query(db, sql, params, path, fmt=None):
+    """Ejecuta la consulta y escribe sus filas en `path` sin cargarlas todas en memoria."""
+    fmt = fmt or format_for_path(path)
+    cursor = db.conn.execute(sql, params)
+    headers = [d[0] for d in cursor.description]
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, 'w', newline='', encoding='utf-8-sig' if fmt == 'csv' else 'utf-8') as f:
+            count = (_write_csv if fmt == 'csv' else _write_jsonl)(f, headers, _rows(cursor))
+        os.replace(tmp_path, path)
+    except BaseException:
+        cursor.close()
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+    return ExportResult(path, count, fmt)
+
+def export(db, name, path, fmt=None, **filters):
+    """Exporta un informe de EXPORTS o una tabla ('tabla:<nombre>'); filtros: season, match_id, training_id, player_id."""
+    sql, params = _resolve(db, name, filters)
+    return export_query(db, sql, params, path, fmt)
+
+# --- Línea de comandos ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta informes y tablas de la base de datos a CSV o JSON Lines.")
+    parser.add_argument("name", nargs="?", help="informe (ver --list) o tabla:<nombre>")
+    parser.add_argument("output", nargs="?", help="archivo de salida (.csv o .jsonl)")
+    parser.add_argument("--db", help="ruta de la base de datos (por defecto data/barbate_cf.db)")
+    parser.add_argument("--format", choices=FORMATS, help="formato; por defecto según la extensión")
+    parser.add_argument("--season", help="temporada, p. ej. 2025/2026")
+    parser.add_argument("--match-id", type=int)
+    parser.add_argument("--training-id", type=int)
+    parser.add_argument("--player-id", type=int)
+    parser.add_argument("--list", action="store_true", help="muestra los informes y tablas disponibles")
+    args = parser.parse_intermixed_args(argv)
+
+    from database import resource_path
+    from read_pool import ReadConnectionPool
+    db_path = args.db or resource_path("data/barbate_cf.db")
+    if not os.path.exists(db_path): parser.error(f"no existe la base de datos {db_path}")
+    # Conexión de solo lectura: se puede exportar con la aplicación abierta
+    pool = ReadConnectionPool(db_path)
+    try:
+        with pool.snapshot() as db:
+            if args.list:
+                for key, (label, _) in EXPORTS.items(): print(f"{key:<16} {label}")
+                for table in exportable_tables(db): print(f"{TABLE_PREFIX}{table}")
+                return 0
+            if not args.name or not args.output: parser.error("indique el informe y el archivo de salida")
+            filters = {'season': args.season, 'match_id': args.match_id, 'training_id': args.training_id, 'player_id': args.player_id}
+            allowed = inspect.signature(EXPORTS[args.name][1]).parameters if args.name in EXPORTS else ()
+            unused = [k for k, v in filters.items() if v is not None and k not in allowed]
+            if unused: parser.error(f"'{args.name}' no admite el filtro {', '.join(unused)}")
+            result = export(db, args.name, args.output, args.format, **filters)
+            print(f"{result.rows} filas exportadas a {result.path}")
+    except (ValueError, OSError) as e:
+        print(f"Error al exportar: {e}", file=sys.stderr)
+        return 1
+    finally:
+        pool.close_all()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, colorchooser, filedialog
 from PIL import Image, ImageTk, ImageDraw, ImageFont
+from thumbnails import load_thumbnail
 import os
 import sys
-import json
 
 def resource_path(relative_path):
     try:
@@ -59,8 +59,8 @@ class LayoutManagerWindow(tk.Toplevel):
     def load_selected(self):
         layout_id, _ = self.get_selected_id_and_name()
         if layout_id:
-            json_data = self.db.get_layout_data_by_id(layout_id)
-            if json_data: self.load_callback(json.loads(json_data)); self.destroy()
+            elements = self.db.get_layout_elements(layout_id)
+            if elements: self.load_callback(elements); self.destroy()
     def rename_selected(self):
         layout_id, old_name = self.get_selected_id_and_name()
         if layout_id:
@@ -115,7 +115,7 @@ class FieldEditorTab:
         size = (25, 50); combined_size = (size[0] + 25, size[1]); combined_img = Image.new('RGBA', combined_size, (0, 0, 0, 0))
         path = resource_path("player_red_base.png") if team == 'own' else resource_path("player_yellow_base.png")
         try:
-            player_img_only = Image.open(path).convert("RGBA").resize(size, Image.LANCZOS)
+            player_img_only = load_thumbnail(path, size).convert("RGBA").resize(size, Image.LANCZOS)
         except FileNotFoundError:
             color = "#C0392B" if team == 'own' else "#F1C40F"
             player_img_only = Image.new('RGBA', size); draw = ImageDraw.Draw(player_img_only)
@@ -227,11 +227,11 @@ class FieldEditorTab:
         element['data']['rotation'] = new_rotation; self.icon_references[element['id']] = new_icon_tk
     
     def select_player_dialog(self, x, y, team):
-        players = self.db.get_all_players()
+        players = self.db.get_player_summaries()
         if not players: messagebox.showwarning("No hay jugadores", "No hay jugadores en la BD."); return
         win=tk.Toplevel(self.frame); win.title("Seleccionar Jugador"); win.geometry("300x400"); win.grab_set()
         lb = tk.Listbox(win); lb.pack(fill="both", expand=True, padx=10, pady=10)
-        for p in players: lb.insert(tk.END, f"{p[3] or '?'} - {p[1]}")
+        for p in players: lb.insert(tk.END, f"{p.number or '?'} - {p.name}")
         def on_select():
             if lb.curselection(): self.add_player(x, y, players[lb.curselection()[0]], team); win.destroy()
         ttk.Button(win, text="Seleccionar", command=on_select).pack(pady=10)
@@ -301,7 +301,7 @@ class FieldEditorTab:
         
         layout_to_save = [el['data'] for el in self.elements]
         try:
-            self.db.save_layout(name, json.dumps(layout_to_save))
+            self.db.save_layout(name, layout_to_save)
             messagebox.showinfo("Éxito", f"Diseño '{name}' guardado.")
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo guardar: {e}")
@@ -334,11 +334,13 @@ class FieldEditorTab:
                 rc = data['rel_coords']; coords = ((rc[0]*field_w)+offset_x, (rc[1]*field_h)+offset_y, (rc[2]*field_w)+offset_x, (rc[3]*field_h)+offset_y)
                 arrow_id = self.canvas.create_line(coords, **options); self.elements.append({"id": arrow_id, "data": data})
     
-    def create_image_from_layout_data(self, layout_data):
+    def create_image_from_layout_data(self, layout_data, db=None):
+        """Dibuja el diseño en una imagen PIL. `db` permite usarlo desde un hilo de lectura en segundo plano."""
+        db = db or self.db
         w, h = 800, 600; image = Image.new('RGB', (w, h), color='#2ECC71'); draw = ImageDraw.Draw(image)
         offset_x, offset_y, field_w, field_h = self.get_field_geometry(w, h)
         self.draw_field_on_image(draw, w, h)
-        for data in layout_data: self.draw_element_on_image_from_data(draw, image, data, (offset_x, offset_y, field_w, field_h))
+        for data in layout_data: self.draw_element_on_image_from_data(draw, image, data, (offset_x, offset_y, field_w, field_h), db)
         return image
     
     def draw_field_on_image(self, draw, width, height):
@@ -352,7 +354,7 @@ class FieldEditorTab:
         draw.rectangle((x1, y1 + field_h/2 - area_h/2, x1 + area_w, y1 + field_h/2 + area_h/2), outline="white", width=3)
         draw.rectangle((x2 - area_w, y1 + field_h/2 - area_h/2, x2, y1 + field_h/2 + area_h/2), outline="white", width=3)
 
-    def draw_element_on_image_from_data(self, draw, image, data, field_geom):
+    def draw_element_on_image_from_data(self, draw, image, data, field_geom, db=None):
         offset_x, offset_y, field_w, field_h = field_geom
         el_type, rotation, options = data.get('type'), data.get('rotation', 0), data.get('options', {})
         if 'rel_x' in data and 'rel_y' in data:
@@ -363,7 +365,7 @@ class FieldEditorTab:
             return
         pil_image = None
         if el_type == "player":
-            if p_data := self.db.get_player_by_id(data.get('player_id')): pil_image = self._create_player_icon_pil(str(p_data[3] or "?"), data.get('team'))
+            if p_data := (db or self.db).get_player_by_id(data.get('player_id')): pil_image = self._create_player_icon_pil(str(p_data.number or "?"), data.get('team'))
         elif el_type in ["cono", "ball", "porteria"]: pil_image = self.images[f'{el_type}_pil']
         elif el_type == "text":
             try: font = ImageFont.truetype(resource_path("arialbd.ttf"), 16)
@@ -0,0 +1,289 @@
+"""Importación masiva desde CSV o XLSX de jugadores, estadísticas de partido e historial deportivo.
+
+El archivo se lee fila a fila (sin cargarlo entero en memoria). Las cabeceras se reconocen por
+nombre en español o inglés, sin importar mayúsculas, tildes ni espacios ('Fecha de nacimiento',
+'fecha_nacimiento', 'date_of_birth'). Cada fila se valida y convierte; las válidas se escriben en
+bloques de CHUNK_SIZE con executemany, una transacción por bloque. Si un bloque falla en la base
+de datos se repite fila a fila para señalar exactamente cuáles fallan. El resultado incluye los
+errores por número de línea.
+
+La lectura de XLSX necesita openpyxl; CSV no tiene dependencias.
+"""
+import csv
+import itertools
+import os
+import sqlite3
+import time
+import unicodedata
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+from date_utils import to_iso_date, to_display_date
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+CHUNK_SIZE = 500
+
+RowError = namedtuple('RowError', 'line message')
+ImportResult = namedtuple('ImportResult', 'target imported skipped errors duration')
+
+def _normalize(header):
+    text = unicodedata.normalize('NFKD', str(header or '')).encode('ascii', 'ignore').decode('ascii')
+    return '_'.join(text.lower().replace('.', ' ').split())
+
+# --- Lectura en streaming ---
+def iter_csv_rows(path):
+    """Devuelve (número de línea, dict) por fila; detecta ';' o ',' como separador."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.read(4096); f.seek(0)
+        try: dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+        except csv.Error: dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        headers = [_normalize(h) for h in next(reader, [])]
+        for row in reader:
+            if any(cell.strip() for cell in row):
+                yield reader.line_num, dict(zip(headers, row))
+
+def iter_xlsx_rows(path):
+    if openpyxl is None:
+        raise RuntimeError("Para importar archivos XLSX hay que instalar openpyxl (pip install openpyxl)")
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [_normalize(h) for h in next(rows, ())]
+        for line, row in enumerate(rows, start=2):
+            if any(cell not in (None, '') for cell in row):
+                yield line, dict(zip(headers, row))
+    finally:
+        workbook.close()
+
+def iter_rows(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xlsm'): return iter_xlsx_rows(path)
+    if ext in ('.csv', '.txt'): return iter_csv_rows(path)
+    raise ValueError(f"Formato no soportado: {ext} (use CSV o XLSX)")
+
+# --- Conversión de valores ---
+def _text(value):
+    if value is None: return None
+    text = str(value).strip()
+    return text or None
+
+def _int(value):
+    text = _text(value)
+    if text is None: return None
+    try: number = float(text.replace(',', '.'))
+    except ValueError: raise ValueError(f"'{text}' no es un número")
+    if number != int(number) or number < 0: raise ValueError(f"'{text}' no es un entero positivo")
+    return int(number)
+
+@lru_cache(maxsize=4096)
+def _date(value):
+    if _text(value) is None: return None
+    # to_iso_date prueba varios formatos con strptime: la caché evita repetirlo con fechas que se repiten
+    try: return date.fromisoformat(str(to_iso_date(value))[:10]).isoformat()
+    except ValueError: raise ValueError(f"'{value}' no es una fecha válida")
+
+def _birth_date(value):
+    # players.date_of_birth no pasó a ISO (ver migración 3): se guarda como dd/mm/aaaa, igual que PlayersTab
+    return to_display_date(_date(value)) if _text(value) is not None else None
+
+# Columnas de cada destino: (columna, conversión, obligatoria, nombres aceptados en la cabecera)
+PLAYER_FIELDS = [
+    ('name', _text, True, ('nombre', 'name', 'jugador', 'nombre_completo')),
+    ('position', _text, True, ('posicion', 'position', 'demarcacion')),
+    ('number', _int, False, ('dorsal', 'numero', 'number')),
+    ('date_of_birth', _birth_date, False, ('fecha_de_nacimiento', 'fecha_nacimiento', 'nacimiento', 'date_of_birth')),
+    ('nationality', _text, False, ('nacionalidad', 'nationality')),
+    ('dominant_foot', _text, False, ('pie_dominante', 'pie', 'dominant_foot')),
+    ('height_cm', _int, False, ('altura', 'altura_cm', 'height_cm')),
+    ('weight_kg', _int, False, ('peso', 'peso_kg', 'weight_kg')),
+    ('shirt_name', _text, False, ('nombre_camiseta', 'camiseta', 'shirt_name')),
+    ('phone', _text, False, ('telefono', 'phone')),
+    ('email', _text, False, ('email', 'correo', 'correo_electronico')),
+    ('address', _text, False, ('direccion', 'domicilio', 'address')),
+    ('town', _text, False, ('localidad', 'pueblo', 'town')),
+    ('city', _text, False, ('ciudad', 'provincia', 'city')),
+    ('observations', _text, False, ('observaciones', 'notas', 'observations')),
+]
+MATCH_STAT_FIELDS = [
+    ('minutes_played', _int, False, ('minutos', 'min', 'minutes_played', 'minutos_jugados')),
+    ('goals', _int, False, ('goles', 'g', 'goals')),
+    ('assists', _int, False, ('asistencias', 'a', 'assists')),
+    ('shots', _int, False, ('tiros', 'disparos', 't', 'shots')),
+    ('yellow_cards', _int, False, ('amarillas', 'tarjetas_amarillas', 'ta', 'yellow_cards')),
+    ('red_cards', _int, False, ('rojas', 'tarjetas_rojas', 'tr', 'red_cards')),
+]
+CAREER_FIELDS = [
+    ('season', _text, True, ('temporada', 'season')),
+    ('team_name', _text, True, ('equipo', 'club', 'team_name')),
+    ('matches_played', _int, False, ('partidos', 'partidos_jugados', 'pj', 'matches_played')),
+    ('goals_scored', _int, False, ('goles', 'goals_scored')),
+    ('assists', _int, False, ('asistencias', 'assists')),
+    ('yellow_cards', _int, False, ('amarillas', 'tarjetas_amarillas', 'yellow_cards')),
+    ('red_cards', _int, False, ('rojas', 'tarjetas_rojas', 'red_cards')),
+    ('saves', _int, False, ('paradas', 'saves')),
+    ('goals_conceded', _int, False, ('goles_encajados', 'encajados', 'goals_conceded')),
+]
+
+def _convert(row, fields):
+    values = []
+    for column, convert, required, aliases in fields:
+        raw = next((row[a] for a in aliases if a in row and _text(row[a]) is not None), None)
+        try: value = convert(raw)
+        except ValueError as e: raise ValueError(f"{aliases[0]}: {e}")
+        if required and value is None: raise ValueError(f"falta el campo obligatorio '{aliases[0]}'")
+        values.append(value)
+    return values
+
+class _PlayerLookup:
+    """Resuelve el jugador de una fila por id, nombre (o nombre de camiseta) o dorsal."""
+    def __init__(self, db):
+        rows = db.conn.execute("SELECT id, name, shirt_name, number FROM players").fetchall()
+        self.ids = {r[0] for r in rows}
+        self.names = {}
+        for pid, name, shirt, number in rows:
+            for key in (name, shirt):
+                if key: self.names.setdefault(_normalize(key), pid)
+        self.numbers = {}
+        for pid, _, _, number in rows:
+            if number is not None: self.numbers.setdefault(number, []).append(pid)
+
+    def resolve(self, row):
+        player_id = _int(row.get('jugador_id') or row.get('player_id'))
+        if player_id is not None:
+            if player_id not in self.ids: raise ValueError(f"no existe el jugador con id {player_id}")
+            return player_id
+        name = _text(row.get('jugador') or row.get('nombre') or row.get('player'))
+        if name:
+            if _normalize(name) not in self.names: raise ValueError(f"jugador desconocido '{name}'")
+            return self.names[_normalize(name)]
+        number = _int(row.get('dorsal'))
+        if number is not None:
+            matches = self.numbers.get(number, [])
+            if len(matches) != 1: raise ValueError(f"el dorsal {number} no identifica a un único jugador")
+            return matches[0]
+        raise ValueError("falta la columna del jugador (jugador, jugador_id o dorsal)")
+
+class _MatchLookup:
+    """Resuelve el partido de una fila por id o por fecha (y rival si hay varios ese día)."""
+    def __init__(self, db):
+        rows = db.conn.execute("SELECT id, substr(match_date, 1, 10), rival FROM matches").fetchall()
+        self.ids = {r[0] for r in rows}
+        self.by_date = {}
+        for mid, day, rival in rows: self.by_date.setdefault(day, []).append((mid, _normalize(rival)))
+
+    def resolve(self, row):
+        match_id = _int(row.get('partido_id') or row.get('match_id'))
+        if match_id is not None:
+            if match_id not in self.ids: raise ValueError(f"no existe el partido con id {match_id}")
+            return match_id
+        day = _date(row.get('fecha') or row.get('fecha_partido') or row.get('match_date'))
+        if day is None: raise ValueError("falta la columna del partido (partido_id o fecha)")
+        candidates = self.by_date.get(day, [])
+        rival = _normalize(row.get('rival'))
+        if rival: candidates = [c for c in candidates if c[1] == rival]
+        if len(candidates) != 1: raise ValueError(f"no se encuentra un único partido el {day}" + (f" contra {row.get('rival')}" if rival else ""))
+        return candidates[0][0]
+
+# --- Destinos ---
+# Cada destino recibe la base de datos y las cabeceras (normalizadas) del archivo
+def _player_target(db, headers):
+    existing = {_normalize(r[0]) for r in db.conn.execute("SELECT name FROM players")}
+    columns = [f[0] for f in PLAYER_FIELDS]
+    sql = f"INSERT INTO players ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    def convert(row):
+        values = _convert(row, PLAYER_FIELDS)
+        key = _normalize(values[0])
+        if key in existing: raise ValueError(f"ya existe un jugador llamado '{values[0]}'")
+        existing.add(key)
+        return values
+    return sql, convert
+
+def _match_stats_target(db, headers):
+    players, matches = _PlayerLookup(db), _MatchLookup(db)
+    columns = [f[0] for f in MATCH_STAT_FIELDS]
+    # Re-importar un partido sobrescribe en la fila del jugador solo las columnas que trae el archivo:
+    # un CSV con goles y minutos no pone a cero las asistencias ya guardadas. Los triggers mantienen player_season_totals
+    in_file = [f[0] for f in MATCH_STAT_FIELDS if any(a in headers for a in f[3])]
+    if not in_file: raise ValueError("El archivo no tiene ninguna columna de estadísticas (minutos, goles, asistencias...)")
+    sql = (f"INSERT INTO player_match_stats (match_id, player_id, {', '.join(columns)}) VALUES (?, ?, {', '.join('?' for _ in columns)}) "
+           f"ON CONFLICT(match_id, player_id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in in_file)}")
+    def convert(row):
+        values = [v or 0 for v in _convert(row, MATCH_STAT_FIELDS)]
+        # Igual que save_player_stats_for_match: las filas a cero no se guardan
+        if not any(values): return None
+        return [matches.resolve(row), players.resolve(row), *values]
+    return sql, convert
+
+def _career_target(db, headers):
+    players = _PlayerLookup(db)
+    columns = [f[0] for f in CAREER_FIELDS]
+    sql = f"INSERT INTO career_history (player_id, {', '.join(columns)}) VALUES (?, {', '.join('?' for _ in columns)})"
+    def convert(row):
+        values = _convert(row, CAREER_FIELDS)
+        return [players.resolve(row), *values[:2], *[v or 0 for v in values[2:]]]
+    return sql, convert
+
+TARGETS = {
+    'players': ("Jugadores", _player_target),
+    'match_stats': ("Estadísticas de partido", _match_stats_target),
+    'career': ("Historial deportivo", _career_target),
+}
+
+def _write_chunk(db, sql, chunk, errors):
+    """Escribe un bloque en una transacción; si falla, lo repite fila a fila. Devuelve las filas escritas."""
+    try:
+        with db.transaction():
+            db.conn.executemany(sql, [values for _, values in chunk])
+        return len(chunk)
+    except sqlite3.Error:
+        written = 0
+        for line, values in chunk:
+            try:
+                with db.transaction():
+                    db.conn.execute(sql, values)
+                written += 1
+            except sqlite3.Error as e:
+                errors.append(RowError(line, f"error de base de datos: {e}"))
+        return written
+
+def import_file(db, path, target, chunk_size=CHUNK_SIZE, max_errors=1000):
+    """Importa `path` (CSV o XLSX) en el destino indicado ('players', 'match_stats' o 'career')."""
+    if target not in TARGETS: raise ValueError(f"Destino de importación desconocido: {target}")
+    start = time.perf_counter()
+    rows = iter_rows(path)
+    first = next(rows, None)
+    if first is None: return ImportResult(target, 0, 0, [], time.perf_counter() - start)
+    sql, convert = TARGETS[target][1](db, set(first[1]))
+    imported, skipped, errors, chunk = 0, 0, [], []
+    for line, row in itertools.chain([first], rows):
+        try:
+            values = convert(row)
+        except ValueError as e:
+            if len(errors) < max_errors: errors.append(RowError(line, str(e)))
+            skipped += 1
+            continue
+        if values is None:
+            skipped += 1
+            continue
+        chunk.append((line, values))
+        if len(chunk) >= chunk_size:
+            imported += _write_chunk(db, sql, chunk, errors); chunk = []
+    if chunk: imported += _write_chunk(db, sql, chunk, errors)
+    if target == 'players': db.clear_entity_cache()
+    return ImportResult(target, imported, skipped, errors, time.perf_counter() - start)
+
+def format_result(result, max_lines=15):
+    """Resumen de la importación para mostrar al usuario."""
+    lines = [f"{TARGETS[result.target][0]}: {result.imported} filas importadas en {result.duration:.1f} s"]
+    if result.skipped: lines.append(f"{result.skipped} filas omitidas (vacías o con errores)")
+    if result.errors:
+        lines.append("")
+        lines += [f"Línea {e.line}: {e.message}" for e in result.errors[:max_lines]]
+        if len(result.errors) > max_lines: lines.append(f"... y {len(result.errors) - max_lines} errores más")
+    return "\n".join(lines)
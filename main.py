@@ -1,6 +1,10 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from database import Database
+from db_worker import DatabaseWorker
+from backup import BackupScheduler
+from maintenance import run_scheduled_maintenance
+from change_watcher import ChangeWatcher
 from players_tab import PlayersTab
 from coaches_tab import CoachesTab
 from trainings_tab import TrainingsTab
@@ -29,21 +33,28 @@ class BarbateCFApp:
 
         self.create_custom_title_bar()
         self.db = Database()
+        # Las consultas y guardados pesados van a un hilo con su propia conexión
+        self.db_worker = DatabaseWorker(self.root, self.db.db_path, self.db.profile)
+        # Copias de seguridad periódicas en data/backups sin detener la aplicación
+        self.backup_scheduler = BackupScheduler(self.root, self.db.db_path)
+        self.backup_scheduler.start()
+        # Mantenimiento semanal (ANALYZE, vaciado incremental, comprobaciones) en el hilo de la base de datos
+        self.db_worker.submit(run_scheduled_maintenance)
         container = ttk.Frame(self.root)
         container.pack(fill='both', expand=True)
         self.notebook = ttk.Notebook(container)
         self.notebook.pack(fill='both', expand=True, padx=10, pady=(0, 10))
         
         # --- Pestañas ---
-        self.players_tab = PlayersTab(self.notebook, self.db)
+        self.players_tab = PlayersTab(self.notebook, self.db, self.db_worker)
         self.notebook.add(self.players_tab.frame, text='Jugadores')
         self.coaches_tab = CoachesTab(self.notebook, self.db)
         self.notebook.add(self.coaches_tab.frame, text='Cuerpo Técnico')
         self.trainings_tab = TrainingsTab(self.notebook, self.db)
         self.notebook.add(self.trainings_tab.frame, text='Entrenamientos')
-        self.callups_tab = CallupsTab(self.notebook, self.db)
+        self.callups_tab = CallupsTab(self.notebook, self.db, self.db_worker)
         self.notebook.add(self.callups_tab.frame, text='Convocatorias')
-        self.matches_tab = MatchesTab(self.notebook, self.db)
+        self.matches_tab = MatchesTab(self.notebook, self.db, self.db_worker)
         self.notebook.add(self.matches_tab.frame, text='Partidos y Estadísticas')
         self.planning_tab = PlanningTab(self.notebook, self.db)
         self.notebook.add(self.planning_tab.frame, text='Planificación')
@@ -51,11 +62,22 @@ class BarbateCFApp:
         self.notebook.add(self.exercises_tab.frame, text='Ejercicios')
         self.field_editor_tab = FieldEditorTab(self.notebook, self.db)
         self.notebook.add(self.field_editor_tab.frame, text='Editor de Campo')
-        self.reports_tab = ReportsTab(self.notebook, self.db, self.field_editor_tab)
+        self.reports_tab = ReportsTab(self.notebook, self.db, self.field_editor_tab, self.db_worker)
         self.notebook.add(self.reports_tab.frame, text='Reportes')
         self.help_tab = HelpTab(self.notebook)
         self.notebook.add(self.help_tab.frame, text='Ayuda')
         
+        # Recarga las listas cuando otra instancia (o el hilo de la base de datos) guarda cambios
+        self.change_watcher = ChangeWatcher(self.root, self.db)
+        self.change_watcher.subscribe({'players'}, self.players_tab.load_players)
+        self.change_watcher.subscribe({'coaches'}, self.coaches_tab.load_coaches)
+        self.change_watcher.subscribe({'trainings'}, self.trainings_tab.load_trainings)
+        self.change_watcher.subscribe({'match_callups'}, self.callups_tab.load_callups_dropdown)
+        self.change_watcher.subscribe({'matches'}, self.matches_tab.load_all_matches)
+        self.change_watcher.subscribe({'exercises'}, self.exercises_tab.load_all_exercises)
+        self.change_watcher.start()
+        self.db_worker.after_write = self.change_watcher.check_now
+
         # --- NUEVA LÍNEA --- Asocia el evento de cambio de pestaña a una función
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
@@ -108,6 +130,10 @@ class BarbateCFApp:
     
     def confirm_close(self):
         if messagebox.askyesno("Confirmar Salida", "¿Estás seguro de que quieres cerrar la aplicación?"):
+            self.change_watcher.stop()
+            self.backup_scheduler.stop()
+            self.db_worker.close()
+            self.db.close()
             self.root.destroy()
 
     def minimize_app(self):
@@ -0,0 +1,119 @@
+"""Mantenimiento de la base de datos: estadísticas del planificador, vaciado incremental y comprobaciones.
+
+Los ciclos de borrar y volver a insertar (convocatorias, estadísticas, plantillas) dejan páginas
+libres dentro del archivo y el planificador de consultas no tiene estadísticas. run_maintenance:
+
+- pasa el archivo a auto_vacuum=INCREMENTAL solo si se pide (convert_auto_vacuum): requiere un
+  VACUUM completo que reescribe todo el archivo, así que lo lanza el usuario desde Informes y
+  nunca el mantenimiento programado del arranque,
+- purga change_log dejando las últimas CHANGE_LOG_KEEP entradas,
+- ejecuta ANALYZE si nunca se ha hecho y PRAGMA optimize en las siguientes,
+- libera páginas con incremental_vacuum en tramos acotados,
+- ejecuta quick_check y foreign_key_check,
+- guarda un resumen en maintenance_log con tamaños y páginas libres antes y después.
+
+Debe ejecutarse en la conexión de escritura sin transacción abierta (p. ej. a través de DatabaseWorker).
+"""
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+MAINTENANCE_INTERVAL_DAYS = 7
+VACUUM_PAGES_PER_STEP = 500
+VACUUM_MAX_STEPS = 20
+CHANGE_LOG_KEEP = 100000
+
+MaintenanceReport = namedtuple('MaintenanceReport', 'ran_at duration_ms size_before size_after free_pages_before free_pages_after quick_check fk_violations actions')
+
+def _pragma(conn, name):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+def _file_size(db_path):
+    # En modo WAL parte de los datos puede estar aún en el archivo -wal
+    return sum(os.path.getsize(p) for p in (db_path, db_path + "-wal") if os.path.exists(p))
+
+def incremental_vacuum(conn, pages_per_step=VACUUM_PAGES_PER_STEP, max_steps=VACUUM_MAX_STEPS):
+    """Libera páginas libres en tramos cortos para no bloquear a los escritores; devuelve las liberadas."""
+    freed = 0
+    for _ in range(max_steps):
+        before = _pragma(conn, "freelist_count")
+        if before == 0: break
+        # Con execute() sqlite3 solo avanza un paso del PRAGMA (una página); executescript lo completa
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages_per_step)});")
+        freed += before - _pragma(conn, "freelist_count")
+    return freed
+
+def run_maintenance(db, analyze=True, vacuum=True, checks=True, convert_auto_vacuum=False):
+    """Ejecuta el mantenimiento sobre un Database y devuelve un MaintenanceReport."""
+    conn = db.conn
+    if db._tx_depth or conn.in_transaction:
+        raise RuntimeError("No se puede hacer el mantenimiento con una transacción abierta")
+    start = time.perf_counter()
+    ran_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    size_before, free_before = _file_size(db.db_path), _pragma(conn, "freelist_count")
+    actions = []
+
+    pruned = db.prune_change_log(CHANGE_LOG_KEEP)
+    if pruned: actions.append(f"change_log: {pruned} entradas antiguas purgadas")
+
+    incremental = _pragma(conn, "auto_vacuum") == 2
+    if vacuum and not incremental and convert_auto_vacuum:
+        # El cambio de modo solo tiene efecto tras un VACUUM completo; se hace una única vez
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        actions.append("VACUUM completo (auto_vacuum=INCREMENTAL)")
+    elif vacuum and not incremental:
+        # Sin auto_vacuum=INCREMENTAL, incremental_vacuum no libera nada
+        actions.append("vaciado pendiente: falta convertir a auto_vacuum=INCREMENTAL desde Informes")
+    elif vacuum:
+        freed = incremental_vacuum(conn)
+        actions.append(f"incremental_vacuum: {freed} páginas liberadas")
+
+    if analyze:
+        has_stats = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone() is not None
+        # analysis_limit acota también el primer ANALYZE: muestrea cada índice en lugar de leerlo entero
+        conn.execute("PRAGMA analysis_limit = 400")
+        if has_stats:
+            conn.execute("PRAGMA optimize").fetchall()
+            actions.append("PRAGMA optimize")
+        else:
+            conn.execute("ANALYZE")
+            actions.append("ANALYZE")
+        conn.commit()
+
+    quick_check, fk_violations = "no ejecutado", 0
+    if checks:
+        problems = [row[0] for row in conn.execute("PRAGMA quick_check").fetchall()]
+        quick_check = "ok" if problems == ["ok"] else "; ".join(problems[:20])
+        fk_violations = len(conn.execute("PRAGMA foreign_key_check").fetchall())
+
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    report = MaintenanceReport(ran_at, int((time.perf_counter() - start) * 1000), size_before, _file_size(db.db_path),
+                               free_before, _pragma(conn, "freelist_count"), quick_check, fk_violations, ", ".join(actions))
+    conn.execute(f"INSERT INTO maintenance_log ({', '.join(MaintenanceReport._fields)}) VALUES ({', '.join('?' for _ in MaintenanceReport._fields)})", report)
+    conn.commit()
+    return report
+
+def last_maintenance(db):
+    row = db.conn.execute(f"SELECT {', '.join(MaintenanceReport._fields)} FROM maintenance_log ORDER BY id DESC LIMIT 1").fetchone()
+    return MaintenanceReport._make(row) if row else None
+
+def run_scheduled_maintenance(db, interval_days=MAINTENANCE_INTERVAL_DAYS):
+    """Ejecuta run_maintenance si han pasado `interval_days` desde la última; si no, devuelve None.
+
+    Al arrancar solo se hace el trabajo acotado (incremental_vacuum, optimize, comprobaciones), nunca el VACUUM completo.
+    """
+    last = last_maintenance(db)
+    if last and datetime.strptime(last.ran_at, "%Y-%m-%d %H:%M:%S") > datetime.now() - timedelta(days=interval_days):
+        return None
+    return run_maintenance(db)
+
+def format_report(report):
+    """Resumen legible del mantenimiento para mostrar al usuario."""
+    return (f"Fecha: {report.ran_at} ({report.duration_ms} ms)\n"
+            f"Tamaño: {report.size_before / 1024:.0f} KiB -> {report.size_after / 1024:.0f} KiB\n"
+            f"Páginas libres: {report.free_pages_before} -> {report.free_pages_after}\n"
+            f"Comprobación de integridad: {report.quick_check}\n"
+            f"Claves foráneas rotas: {report.fk_violations}\n"
+            f"Acciones: {report.actions or 'ninguna'}")
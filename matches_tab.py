@@ -1,11 +1,17 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+from date_utils import to_display_date
+from db_worker import ImmediateRunner
+from database import ConcurrentEditError
+from virtual_list import PagedTreeview
 
 class MatchesTab:
-    def __init__(self, notebook, db):
+    def __init__(self, notebook, db, worker=None):
         self.db = db
+        self.worker = worker or ImmediateRunner(db)
         self.frame = ttk.Frame(notebook)
         self.current_match_id = None
+        self.current_match_version = None
         self.form_widgets = {}
         self.stats_tree = None
         self.entry_popup = None
@@ -30,6 +36,7 @@ class MatchesTab:
         self.matches_tree.heading("result", text="Resultado"); self.matches_tree.column("result", width=70, anchor='center')
         self.matches_tree.pack(fill="y", expand=True, side="top")
         self.matches_tree.bind("<<TreeviewSelect>>", self.on_match_select)
+        self.matches_pager = PagedTreeview(self.matches_tree, self.db.get_matches_page, lambda m: m._replace(match_date=to_display_date(m.match_date)), row_iid=lambda m: m.id)
 
         list_btn_frame = ttk.Frame(list_frame)
         list_btn_frame.pack(fill="x", pady=5)
@@ -102,9 +109,7 @@ class MatchesTab:
         self.entry_popup = None
 
     def load_all_matches(self):
-        for item in self.matches_tree.get_children(): self.matches_tree.delete(item)
-        for match in self.db.get_all_matches():
-            self.matches_tree.insert("", "end", values=match, iid=match[0])
+        self.matches_pager.reload()
 
     def on_match_select(self, event=None):
         selected_items = self.matches_tree.selection()
@@ -118,9 +123,10 @@ class MatchesTab:
         self.clear_form()
         details = self.db.get_match_details(self.current_match_id)
         if not details: return
+        self.current_match_version = self.db.get_row_version('matches', self.current_match_id)
         
         _, date, comp, rival, venue, is_home, result = details
-        self.form_widgets['match_date'].insert(0, date or "")
+        self.form_widgets['match_date'].insert(0, to_display_date(date))
         self.form_widgets['competition'].insert(0, comp or "")
         self.form_widgets['rival'].insert(0, rival or "")
         self.form_widgets['venue'].insert(0, venue or "")
@@ -131,7 +137,13 @@ class MatchesTab:
     
     def load_stats(self):
         for item in self.stats_tree.get_children(): self.stats_tree.delete(item)
-        stats = self.db.get_stats_for_match(self.current_match_id)
+        match_id = self.current_match_id
+        self.worker.submit('get_stats_for_match', match_id, callback=lambda stats: self.show_stats(match_id, stats))
+
+    def show_stats(self, match_id, stats):
+        # Si mientras tanto se ha seleccionado otro partido, el resultado ya no sirve
+        if match_id != self.current_match_id: return
+        for item in self.stats_tree.get_children(): self.stats_tree.delete(item)
         for row in stats:
             self.stats_tree.insert("", "end", values=row, iid=row[0])
 
@@ -147,8 +159,17 @@ class MatchesTab:
             'venue': self.form_widgets['venue'].get(),
             'is_home': self.is_home_var.get(),
             'result': self.form_widgets['result'].get(),
+            'row_version': self.current_match_version if self.current_match_id else None,
         }
-        new_id = self.db.save_match(details)
+        try:
+            new_id = self.db.save_match(details)
+        except ConcurrentEditError as e:
+            if e.deleted:
+                messagebox.showerror("Partido Eliminado", "Otro usuario ha eliminado este partido. No se han guardado los cambios.")
+                self.load_all_matches(); return
+            messagebox.showwarning("Partido Modificado", "Otro usuario ha modificado este partido mientras lo editabas.\nSe ha recargado la versión guardada; vuelve a aplicar tus cambios.")
+            self.load_match_details(); return
+        self.current_match_version = self.db.get_row_version('matches', new_id)
         if not self.current_match_id:
             self.current_match_id = new_id
             self.load_stats() # Cargar la lista de jugadores para el nuevo partido
@@ -164,8 +185,15 @@ class MatchesTab:
             values = self.stats_tree.item(item_id)['values']
             # player_id y las 6 estadísticas (mins, goals, assists, shots, yc, rc)
             stats_to_save.append(values[0:1] + values[3:9]) 
-        self.db.save_player_stats_for_match(self.current_match_id, stats_to_save)
-        messagebox.showinfo("Éxito", "Estadísticas guardadas correctamente.")
+        self.worker.submit('save_player_stats_for_match', self.current_match_id, stats_to_save,
+                           callback=lambda saved: messagebox.showinfo("Éxito", "Estadísticas guardadas correctamente."),
+                           errback=self.on_stats_save_error)
+
+    def on_stats_save_error(self, error):
+        if isinstance(error, ValueError):
+            messagebox.showerror("Dato no válido", "Las estadísticas deben ser números enteros.")
+        else:
+            messagebox.showerror("Error", f"No se pudieron guardar las estadísticas.\n{error}")
 
     def delete_match(self):
         selected_items = self.matches_tree.selection()
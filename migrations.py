@@ -0,0 +1,505 @@
+"""Migraciones versionadas del esquema de la base de datos.
+
+Cada migración tiene un número correlativo que se guarda en PRAGMA user_version
+al aplicarla. Al arrancar solo se ejecutan las migraciones pendientes, cada una
+en su propia transacción; si la base de datos ya está al día no se ejecuta DDL.
+Las migraciones nunca se modifican una vez publicadas: los cambios de esquema se
+añaden siempre como una migración nueva al final de MIGRATIONS.
+"""
+import json
+import os
+import re
+import sqlite3
+from date_utils import to_iso_date
+from season_archive import ARCHIVE_FOLDER_NAME
+from records import LayoutElement, layout_element_from_data, columns
+
+def _m001_base_schema(cursor):
+    """Esquema base. Usa IF NOT EXISTS porque las bases de datos anteriores a las migraciones ya tienen tablas."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS players (
+            id INTEGER PRIMARY KEY, name TEXT NOT NULL, position TEXT NOT NULL, number INTEGER,
+            date_of_birth TEXT, nationality TEXT, dominant_foot TEXT, height_cm INTEGER,
+            weight_kg INTEGER, photo_path TEXT, observations TEXT, shirt_name TEXT,
+            phone TEXT, email TEXT, address TEXT, town TEXT, city TEXT
+        )''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS coaches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            role TEXT,
+            photo_path TEXT,
+            phone TEXT,
+            address TEXT,
+            town TEXT,
+            province TEXT,
+            observations TEXT
+        )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS career_history (id INTEGER PRIMARY KEY, player_id INTEGER NOT NULL, season TEXT, team_name TEXT, matches_played INTEGER DEFAULT 0, goals_scored INTEGER DEFAULT 0, assists INTEGER DEFAULT 0, yellow_cards INTEGER DEFAULT 0, red_cards INTEGER DEFAULT 0, saves INTEGER DEFAULT 0, goals_conceded INTEGER DEFAULT 0, FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS injuries (id INTEGER PRIMARY KEY, player_id INTEGER NOT NULL, injury_date TEXT, injury_type TEXT, recovery_period TEXT, notes TEXT, FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS trainings (id INTEGER PRIMARY KEY, date TEXT NOT NULL, mesocycle TEXT, session_number INTEGER, coach TEXT, assistant_coach TEXT, material TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS exercises (id INTEGER PRIMARY KEY, training_id INTEGER, name TEXT, description TEXT, duration INTEGER, repetitions TEXT, space TEXT, objectives TEXT, rules TEXT, variants TEXT, image_path TEXT, category TEXT, FOREIGN KEY (training_id) REFERENCES trainings (id) ON DELETE CASCADE)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS training_attendance (training_id INTEGER NOT NULL, player_id INTEGER NOT NULL, status TEXT NOT NULL, PRIMARY KEY (training_id, player_id), FOREIGN KEY (training_id) REFERENCES trainings (id) ON DELETE CASCADE, FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS field_layouts (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, layout_data TEXT NOT NULL)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS match_callups (id INTEGER PRIMARY KEY AUTOINCREMENT, match_date TEXT, rival TEXT, venue TEXT, is_home BOOLEAN, city TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS callup_players (callup_id INTEGER NOT NULL, player_id INTEGER NOT NULL, status TEXT NOT NULL, pos_x INTEGER, pos_y INTEGER, PRIMARY KEY (callup_id, player_id), FOREIGN KEY (callup_id) REFERENCES match_callups (id) ON DELETE CASCADE, FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS training_templates (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, exercises_data TEXT, attendance_data TEXT, material TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS matches (id INTEGER PRIMARY KEY AUTOINCREMENT, match_date TEXT, competition TEXT, rival TEXT, venue TEXT, is_home BOOLEAN, result TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS player_match_stats (match_id INTEGER NOT NULL, player_id INTEGER NOT NULL, minutes_played INTEGER DEFAULT 0, goals INTEGER DEFAULT 0, assists INTEGER DEFAULT 0, shots INTEGER DEFAULT 0, yellow_cards INTEGER DEFAULT 0, red_cards INTEGER DEFAULT 0, PRIMARY KEY (match_id, player_id), FOREIGN KEY (match_id) REFERENCES matches (id) ON DELETE CASCADE, FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS callup_coaches (callup_id INTEGER NOT NULL, coach_id INTEGER NOT NULL, PRIMARY KEY (callup_id, coach_id), FOREIGN KEY (callup_id) REFERENCES match_callups (id) ON DELETE CASCADE, FOREIGN KEY (coach_id) REFERENCES coaches (id) ON DELETE CASCADE)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS formations (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, positions_json TEXT)''')
+
+    # Bases de datos antiguas crearon 'coaches' sin los campos de contacto
+    coach_columns = [desc[1] for desc in cursor.execute("PRAGMA table_info(coaches)").fetchall()]
+    new_coach_cols = {'phone': 'TEXT', 'address': 'TEXT', 'town': 'TEXT', 'province': 'TEXT', 'observations': 'TEXT'}
+    for col, col_type in new_coach_cols.items():
+        if col not in coach_columns:
+            cursor.execute(f"ALTER TABLE coaches ADD COLUMN {col} {col_type}")
+
+def _m002_join_indexes(cursor):
+    """Índices sobre las columnas hijas de cada JOIN y clave foránea."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_player_match_stats_player ON player_match_stats (player_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_training_attendance_player ON training_attendance (player_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_callup_players_callup_status ON callup_players (callup_id, status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_exercises_training ON exercises (training_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_career_history_player ON career_history (player_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_injuries_player ON injuries (player_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_callup_coaches_coach ON callup_coaches (coach_id)")
+
+def _m003_iso_dates(cursor):
+    """Normaliza las fechas a ISO-8601 e indexa las columnas de fecha para consultas por rango."""
+    date_columns = [("trainings", "date"), ("matches", "match_date"), ("match_callups", "match_date"), ("injuries", "injury_date")]
+    for table, column in date_columns:
+        rows = cursor.execute(f"SELECT id, {column} FROM {table}").fetchall()
+        changed = [(to_iso_date(value), row_id) for row_id, value in rows if to_iso_date(value) != value]
+        cursor.executemany(f"UPDATE {table} SET {column} = ? WHERE id = ?", changed)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_trainings_date ON trainings (date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_date ON matches (match_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_callups_date ON match_callups (match_date)")
+    # El índice compuesto cubre también las búsquedas solo por jugador
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_injuries_player_date ON injuries (player_id, injury_date)")
+    cursor.execute("DROP INDEX IF EXISTS idx_injuries_player")
+
+def _m004_sparse_match_stats(cursor):
+    """Elimina las filas de estadísticas sin minutos ni acciones: ahora solo se guardan las que aportan datos."""
+    cursor.execute("""
+        DELETE FROM player_match_stats
+        WHERE COALESCE(minutes_played, 0) = 0 AND COALESCE(goals, 0) = 0 AND COALESCE(assists, 0) = 0
+          AND COALESCE(shots, 0) = 0 AND COALESCE(yellow_cards, 0) = 0 AND COALESCE(red_cards, 0) = 0""")
+
+def _season_sql(date_expr):
+    """Expresión SQL con la temporada ('2025/2026') de una fecha ISO; las temporadas empiezan en julio."""
+    return (f"CASE WHEN {date_expr} IS NULL OR strftime('%Y', {date_expr}) IS NULL THEN '' "
+            f"WHEN CAST(strftime('%m', {date_expr}) AS INTEGER) >= 7 "
+            f"THEN strftime('%Y', {date_expr}) || '/' || (CAST(strftime('%Y', {date_expr}) AS INTEGER) + 1) "
+            f"ELSE (CAST(strftime('%Y', {date_expr}) AS INTEGER) - 1) || '/' || strftime('%Y', {date_expr}) END")
+
+SEASON_TOTALS_SELECT = f"""
+    SELECT s.player_id, {_season_sql('m.match_date')} AS season, COUNT(*), SUM(s.minutes_played > 0),
+           SUM(s.minutes_played), SUM(s.goals), SUM(s.assists), SUM(s.shots), SUM(s.yellow_cards), SUM(s.red_cards)
+    FROM {{stats}} s JOIN {{matches}} m ON m.id = s.match_id"""
+
+def _m005_player_season_totals(cursor):
+    """Tabla de totales por jugador y temporada mantenida por triggers sobre player_match_stats."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS player_season_totals (
+            player_id INTEGER NOT NULL, season TEXT NOT NULL,
+            stat_rows INTEGER NOT NULL DEFAULT 0, matches_played INTEGER NOT NULL DEFAULT 0,
+            minutes_played INTEGER NOT NULL DEFAULT 0, goals INTEGER NOT NULL DEFAULT 0, assists INTEGER NOT NULL DEFAULT 0,
+            shots INTEGER NOT NULL DEFAULT 0, yellow_cards INTEGER NOT NULL DEFAULT 0, red_cards INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (player_id, season),
+            FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE
+        )""")
+    new_season = _season_sql("(SELECT match_date FROM matches WHERE id = NEW.match_id)")
+    old_season = _season_sql("(SELECT match_date FROM matches WHERE id = OLD.match_id)")
+    add_new = f"""
+        INSERT INTO player_season_totals (player_id, season, stat_rows, matches_played, minutes_played, goals, assists, shots, yellow_cards, red_cards)
+        VALUES (NEW.player_id, {new_season}, 1, COALESCE(NEW.minutes_played, 0) > 0, COALESCE(NEW.minutes_played, 0), COALESCE(NEW.goals, 0),
+                COALESCE(NEW.assists, 0), COALESCE(NEW.shots, 0), COALESCE(NEW.yellow_cards, 0), COALESCE(NEW.red_cards, 0))
+        ON CONFLICT(player_id, season) DO UPDATE SET
+            stat_rows = stat_rows + 1, matches_played = matches_played + excluded.matches_played,
+            minutes_played = minutes_played + excluded.minutes_played, goals = goals + excluded.goals,
+            assists = assists + excluded.assists, shots = shots + excluded.shots,
+            yellow_cards = yellow_cards + excluded.yellow_cards, red_cards = red_cards + excluded.red_cards;"""
+    remove_old = f"""
+        UPDATE player_season_totals SET
+            stat_rows = stat_rows - 1, matches_played = matches_played - (COALESCE(OLD.minutes_played, 0) > 0),
+            minutes_played = minutes_played - COALESCE(OLD.minutes_played, 0), goals = goals - COALESCE(OLD.goals, 0),
+            assists = assists - COALESCE(OLD.assists, 0), shots = shots - COALESCE(OLD.shots, 0),
+            yellow_cards = yellow_cards - COALESCE(OLD.yellow_cards, 0), red_cards = red_cards - COALESCE(OLD.red_cards, 0)
+        WHERE player_id = OLD.player_id AND season = {old_season};
+        DELETE FROM player_season_totals WHERE player_id = OLD.player_id AND season = {old_season} AND stat_rows <= 0;"""
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_pms_totals_insert AFTER INSERT ON player_match_stats BEGIN {add_new} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_pms_totals_delete AFTER DELETE ON player_match_stats BEGIN {remove_old} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_pms_totals_update AFTER UPDATE ON player_match_stats BEGIN {remove_old} {add_new} END")
+    # El borrado en cascada ocurre cuando el partido ya no existe y no se podría saber su temporada:
+    # se borran antes sus estadísticas para que los triggers de arriba las descuenten
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS trg_matches_totals_delete BEFORE DELETE ON matches BEGIN DELETE FROM player_match_stats WHERE match_id = OLD.id; END")
+    # Si un partido cambia de temporada se recalculan las dos temporadas afectadas
+    old_match_season, new_match_season = _season_sql("OLD.match_date"), _season_sql("NEW.match_date")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_matches_totals_reseason AFTER UPDATE OF match_date ON matches
+        WHEN ({old_match_season}) IS NOT ({new_match_season})
+        BEGIN
+            DELETE FROM player_season_totals WHERE season IN ({old_match_season}, {new_match_season});
+            INSERT INTO player_season_totals (player_id, season, stat_rows, matches_played, minutes_played, goals, assists, shots, yellow_cards, red_cards)
+            {SEASON_TOTALS_SELECT.format(stats="player_match_stats", matches="matches")}
+            WHERE {_season_sql('m.match_date')} IN ({old_match_season}, {new_match_season})
+            GROUP BY s.player_id, season;
+        END""")
+    rebuild_season_totals(cursor)
+
+def rebuild_season_totals(cursor, stats="player_match_stats", matches="matches", keep_seasons=()):
+    """Recalcula player_season_totals desde las estadísticas de partido (repara cualquier desviación).
+
+    `stats` y `matches` pueden ser las vistas history_* para incluir las temporadas archivadas; las
+    temporadas de `keep_seasons` (archivadas pero sin su archivo adjunto) conservan sus totales.
+    """
+    keep = list(keep_seasons)
+    placeholders = ", ".join("?" for _ in keep)
+    cursor.execute("DELETE FROM player_season_totals" + (f" WHERE season NOT IN ({placeholders})" if keep else ""), keep)
+    cursor.execute(f"""
+        INSERT INTO player_season_totals (player_id, season, stat_rows, matches_played, minutes_played, goals, assists, shots, yellow_cards, red_cards)
+        {SEASON_TOTALS_SELECT.format(stats=stats, matches=matches)}
+        {f"WHERE {_season_sql('m.match_date')} NOT IN ({placeholders})" if keep else ""}
+        GROUP BY s.player_id, season""", keep)
+
+def fts5_available(cursor):
+    """Comprueba si la versión de SQLite incluye el módulo FTS5."""
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        cursor.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except Exception:
+        return False
+
+def _m006_exercises_fts(cursor):
+    if not fts5_available(cursor):
+        # Sin FTS5 la búsqueda usa LIKE (ver Database.search_exercises); el índice se crea al abrir
+        # la base de datos con un SQLite que sí lo incluya (Database._ensure_exercise_fts)
+        print("Aviso: SQLite sin FTS5, la búsqueda de ejercicios no usará índice de texto")
+        return
+    create_exercises_fts(cursor)
+
+def create_exercises_fts(cursor):
+    """Índice FTS5 sobre la biblioteca de ejercicios, sincronizado con triggers."""
+    # remove_diacritics 2: 'tactico' encuentra 'Táctico'; contenido externo para no duplicar el texto
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS exercises_fts USING fts5(
+            name, description, objectives, rules, variants, category,
+            content='exercises', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )""")
+    fts_columns = "name, description, objectives, rules, variants, category"
+    new_values = "NEW.name, NEW.description, NEW.objectives, NEW.rules, NEW.variants, NEW.category"
+    old_values = "OLD.name, OLD.description, OLD.objectives, OLD.rules, OLD.variants, OLD.category"
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_exercises_fts_insert AFTER INSERT ON exercises BEGIN INSERT INTO exercises_fts (rowid, {fts_columns}) VALUES (NEW.id, {new_values}); END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_exercises_fts_delete AFTER DELETE ON exercises BEGIN INSERT INTO exercises_fts (exercises_fts, rowid, {fts_columns}) VALUES ('delete', OLD.id, {old_values}); END")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_exercises_fts_update AFTER UPDATE OF {fts_columns} ON exercises BEGIN
+            INSERT INTO exercises_fts (exercises_fts, rowid, {fts_columns}) VALUES ('delete', OLD.id, {old_values});
+            INSERT INTO exercises_fts (rowid, {fts_columns}) VALUES (NEW.id, {new_values});
+        END""")
+    cursor.execute("INSERT INTO exercises_fts (exercises_fts) VALUES ('rebuild')")
+
+def _m007_maintenance_log(cursor):
+    # Historial del mantenimiento (ver maintenance.py): también sirve para saber cuándo toca el siguiente
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ran_at TEXT NOT NULL,
+            duration_ms INTEGER NOT NULL,
+            size_before INTEGER NOT NULL,
+            size_after INTEGER NOT NULL,
+            free_pages_before INTEGER NOT NULL,
+            free_pages_after INTEGER NOT NULL,
+            quick_check TEXT NOT NULL,
+            fk_violations INTEGER NOT NULL,
+            actions TEXT
+        )""")
+
+def _m008_list_order_indexes(cursor):
+    # Las listas paginadas ordenan por nombre; el id va implícito en el índice como desempate
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_players_name ON players (name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_exercises_name ON exercises (name)")
+
+def _m009_layout_elements(cursor):
+    # Un elemento por fila en lugar del JSON de field_layouts.layout_data, que queda sin uso
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS layout_elements (
+            layout_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            rel_x REAL, rel_y REAL, rel_x2 REAL, rel_y2 REAL,
+            rotation INTEGER,
+            player_id INTEGER,
+            team TEXT,
+            text TEXT,
+            options TEXT,
+            extra TEXT,
+            PRIMARY KEY (layout_id, seq),
+            FOREIGN KEY (layout_id) REFERENCES field_layouts (id) ON DELETE CASCADE,
+            FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE SET NULL
+        )""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_layout_elements_player ON layout_elements (player_id)")
+    player_ids = {row[0] for row in cursor.execute("SELECT id FROM players").fetchall()}
+    insert = f"INSERT INTO layout_elements ({columns(LayoutElement)}) VALUES ({', '.join('?' for _ in LayoutElement._fields)})"
+    for layout_id, layout_json in cursor.execute("SELECT id, layout_data FROM field_layouts").fetchall():
+        try:
+            elements = json.loads(layout_json) if layout_json else []
+        except ValueError as e:
+            print(f"Aviso: el diseño {layout_id} tiene datos no válidos y no se ha migrado ({e})")
+            continue
+        rows = []
+        for seq, data in enumerate(elements):
+            if not isinstance(data, dict) or not data.get('type'): continue
+            # Jugadores ya borrados: el elemento se conserva sin jugador, igual que antes no se dibujaba
+            player_id = data.get('player_id')
+            if isinstance(player_id, str) and player_id.isdigit(): player_id = int(player_id)
+            data = {**data, 'player_id': player_id if player_id in player_ids else None}
+            rows.append(layout_element_from_data(layout_id, seq, data))
+        cursor.executemany(insert, rows)
+        cursor.execute("UPDATE field_layouts SET layout_data = '' WHERE id = ?", (layout_id,))
+
+TEMPLATE_EXERCISE_COLUMNS = "name, description, duration, repetitions, space, objectives, rules, variants, image_path, category"
+
+def _m010_relational_templates(cursor):
+    # Las plantillas pasan de JSON a tablas propias para instanciarlas con INSERT ... SELECT
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS template_exercises (
+            template_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            name TEXT, description TEXT, duration INTEGER, repetitions TEXT, space TEXT,
+            objectives TEXT, rules TEXT, variants TEXT, image_path TEXT, category TEXT,
+            PRIMARY KEY (template_id, seq),
+            FOREIGN KEY (template_id) REFERENCES training_templates (id) ON DELETE CASCADE
+        )""")
+    # Si se borra un jugador desaparece de las plantillas, así que aplicar una nunca falla por la clave foránea
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS template_attendance (
+            template_id INTEGER NOT NULL,
+            player_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            PRIMARY KEY (template_id, player_id),
+            FOREIGN KEY (template_id) REFERENCES training_templates (id) ON DELETE CASCADE,
+            FOREIGN KEY (player_id) REFERENCES players (id) ON DELETE CASCADE
+        )""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_template_attendance_player ON template_attendance (player_id)")
+    player_ids = {row[0] for row in cursor.execute("SELECT id FROM players").fetchall()}
+    for template_id, exercises_json, attendance_json in cursor.execute("SELECT id, exercises_data, attendance_data FROM training_templates").fetchall():
+        try:
+            exercises = json.loads(exercises_json) if exercises_json else []
+            attendance = json.loads(attendance_json) if attendance_json else []
+        except ValueError as e:
+            print(f"Aviso: la plantilla {template_id} tiene datos no válidos y no se ha migrado ({e})")
+            continue
+        cursor.executemany(f"INSERT INTO template_exercises (template_id, seq, {TEMPLATE_EXERCISE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           [(template_id, seq, *ex) for seq, ex in enumerate(exercises)])
+        cursor.executemany("INSERT OR IGNORE INTO template_attendance (template_id, player_id, status) VALUES (?, ?, ?)",
+                           [(template_id, player_id, status) for player_id, status in attendance if player_id in player_ids])
+        cursor.execute("UPDATE training_templates SET exercises_data = NULL, attendance_data = NULL WHERE id = ?", (template_id,))
+
+def _m011_season_archives(cursor):
+    # Temporadas movidas a su propio archivo (ver season_archive.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS season_archives (
+            season TEXT PRIMARY KEY,
+            file_name TEXT NOT NULL,
+            archived_at TEXT NOT NULL,
+            trainings INTEGER NOT NULL DEFAULT 0,
+            matches INTEGER NOT NULL DEFAULT 0,
+            callups INTEGER NOT NULL DEFAULT 0
+        )""")
+
+# Tablas cuyos cambios se anotan en change_log (ver Database.changes_since)
+CHANGE_LOG_TABLES = ("players", "coaches", "trainings", "exercises", "training_attendance", "matches",
+                     "player_match_stats", "match_callups", "callup_players", "field_layouts")
+
+def create_change_log_triggers(cursor, table):
+    for op, event, ref in (("I", "INSERT", "NEW"), ("U", "UPDATE", "NEW"), ("D", "DELETE", "OLD")):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_log_{event.lower()} AFTER {event} ON {table} BEGIN
+                INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {ref}.rowid, '{op}');
+            END""")
+
+def _m012_change_log(cursor):
+    # Una fila por cambio; version (AUTOINCREMENT) nunca se reutiliza aunque se purguen las antiguas
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL
+        )""")
+    for table in CHANGE_LOG_TABLES: create_change_log_triggers(cursor, table)
+    # Los elementos de un diseño cuentan como cambio del diseño
+    for event, ref in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_layout_elements_log_{event.lower()} AFTER {event} ON layout_elements BEGIN
+                INSERT INTO change_log (table_name, row_id, op) VALUES ('field_layouts', {ref}.layout_id, 'U');
+            END""")
+
+# Tablas con control de concurrencia optimista (ver Database._versioned_update)
+VERSIONED_TABLES = ("players", "matches", "match_callups")
+
+def _m013_row_versions(cursor):
+    # Cada guardado sube row_version; quien guarda con una versión antigua sabe que otro la ha cambiado
+    for table in VERSIONED_TABLES:
+        existing = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+        if "row_version" not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1")
+
+def _m014_reseason_delta(cursor):
+    # Al cambiar un partido de temporada solo se mueven sus propias estadísticas de una temporada a
+    # la otra; el trigger de la migración 5 recalculaba las dos temporadas enteras desde main, lo que
+    # era lento y borraba los totales de las temporadas ya archivadas
+    old_season, new_season = _season_sql("OLD.match_date"), _season_sql("NEW.match_date")
+    stat_columns = ("minutes_played", "goals", "assists", "shots", "yellow_cards", "red_cards")
+    def match_row(expr):
+        return f"(SELECT {expr} FROM player_match_stats s WHERE s.match_id = NEW.id AND s.player_id = player_season_totals.player_id)"
+    subtract = ", ".join(["stat_rows = stat_rows - 1",
+                          f"matches_played = matches_played - {match_row('COALESCE(s.minutes_played, 0) > 0')}"]
+                         + [f"{c} = {c} - {match_row(f'COALESCE(s.{c}, 0)')}" for c in stat_columns])
+    match_players = "player_id IN (SELECT player_id FROM player_match_stats WHERE match_id = NEW.id)"
+    cursor.execute("DROP TRIGGER IF EXISTS trg_matches_totals_reseason")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_matches_totals_reseason AFTER UPDATE OF match_date ON matches
+        WHEN ({old_season}) IS NOT ({new_season})
+        BEGIN
+            UPDATE player_season_totals SET {subtract}
+            WHERE season = {old_season} AND {match_players};
+            DELETE FROM player_season_totals WHERE season = {old_season} AND {match_players} AND stat_rows <= 0;
+            INSERT INTO player_season_totals (player_id, season, stat_rows, matches_played, minutes_played, goals, assists, shots, yellow_cards, red_cards)
+            SELECT s.player_id, {new_season}, 1, COALESCE(s.minutes_played, 0) > 0, {", ".join(f"COALESCE(s.{c}, 0)" for c in stat_columns)}
+            FROM player_match_stats s WHERE s.match_id = NEW.id
+            ON CONFLICT(player_id, season) DO UPDATE SET
+                stat_rows = stat_rows + 1, matches_played = matches_played + excluded.matches_played,
+                minutes_played = minutes_played + excluded.minutes_played, goals = goals + excluded.goals,
+                assists = assists + excluded.assists, shots = shots + excluded.shots,
+                yellow_cards = yellow_cards + excluded.yellow_cards, red_cards = red_cards + excluded.red_cards;
+        END""")
+
+# Tablas archivables con id propio (ver season_archive.ARCHIVED_TABLES)
+AUTOINCREMENT_TABLES = ("trainings", "exercises", "matches", "match_callups")
+
+def _archived_max_ids(cursor, tables):
+    """Mayor id de cada tabla en los archivos de temporada (data/archivo), que no están adjuntos aquí."""
+    main_path = next((row[2] for row in cursor.execute("PRAGMA database_list") if row[1] == "main"), "")
+    max_ids = dict.fromkeys(tables, 0)
+    if not main_path: return max_ids
+    for (file_name,) in cursor.execute("SELECT file_name FROM season_archives").fetchall():
+        path = os.path.join(os.path.dirname(main_path), ARCHIVE_FOLDER_NAME, file_name)
+        if not os.path.exists(path):
+            print(f"Aviso: no se encuentra el archivo de temporada {path}")
+            continue
+        archive = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            existing = {row[0] for row in archive.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for table in tables:
+                if table in existing:
+                    max_ids[table] = max(max_ids[table], archive.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0])
+        finally:
+            archive.close()
+    return max_ids
+
+def _rebuild_with_autoincrement(cursor, table):
+    """Rehace la tabla con 'id INTEGER PRIMARY KEY AUTOINCREMENT' conservando filas, índices y triggers."""
+    table_sql = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    new_sql, replaced = re.subn(r"\bid INTEGER PRIMARY KEY\b(?!\s+AUTOINCREMENT)", "id INTEGER PRIMARY KEY AUTOINCREMENT", table_sql, count=1, flags=re.I)
+    if not replaced: return
+    new_sql = re.sub(rf"^CREATE TABLE\s+\"?{table}\"?", f"CREATE TABLE {table}_autoinc", new_sql, count=1, flags=re.I)
+    # DROP TABLE borra también sus índices y triggers (change_log, totales, FTS): se vuelven a crear igual
+    dependents = cursor.execute("SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+                                (table,)).fetchall()
+    cols = ", ".join(row[1] for row in cursor.execute(f"PRAGMA table_info({table})"))
+    cursor.execute(new_sql)
+    cursor.execute(f"INSERT INTO {table}_autoinc ({cols}) SELECT {cols} FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_autoinc RENAME TO {table}")
+    for (sql,) in dependents: cursor.execute(sql)
+
+def _m015_autoincrement_ids(cursor):
+    # Sin AUTOINCREMENT SQLite reutiliza el id más alto tras archivar una temporada, y las vistas
+    # history_* acabarían con dos entrenamientos o partidos con el mismo id. Las migraciones se
+    # ejecutan con foreign_keys desactivado (ver apply_migrations): el DROP TABLE no borra en cascada
+    # Solo cuentan las violaciones que aparezcan con la reconstrucción: las filas huérfanas que ya
+    # hubiera (p. ej. una lesión de un jugador borrado) no deben impedir abrir la base de datos
+    broken_before = set(cursor.execute("PRAGMA foreign_key_check").fetchall())
+    cursor.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        for table in AUTOINCREMENT_TABLES: _rebuild_with_autoincrement(cursor, table)
+    finally:
+        cursor.execute("PRAGMA legacy_alter_table = OFF")
+    new_violations = set(cursor.execute("PRAGMA foreign_key_check").fetchall()) - broken_before
+    if new_violations:
+        raise sqlite3.IntegrityError(f"Claves foráneas rotas tras reconstruir las tablas: {sorted(new_violations)[:5]}")
+    # El siguiente id debe quedar por encima de los ya usados en la principal y en los archivos
+    archived = _archived_max_ids(cursor, AUTOINCREMENT_TABLES)
+    for table in AUTOINCREMENT_TABLES:
+        in_main = cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+        sequence = cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()[0]
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, max(in_main, sequence, archived[table])))
+
+# Lista ordenada de (versión, descripción, función). Añadir siempre al final.
+MIGRATIONS = [
+    (1, "Esquema base", _m001_base_schema),
+    (2, "Índices de claves foráneas", _m002_join_indexes),
+    (3, "Fechas en ISO-8601", _m003_iso_dates),
+    (4, "Estadísticas de partido dispersas", _m004_sparse_match_stats),
+    (5, "Totales por jugador y temporada", _m005_player_season_totals),
+    (6, "Búsqueda de texto en ejercicios", _m006_exercises_fts),
+    (7, "Registro de mantenimiento", _m007_maintenance_log),
+    (8, "Índices para listas paginadas", _m008_list_order_indexes),
+    (9, "Elementos de diseños de campo en tabla propia", _m009_layout_elements),
+    (10, "Plantillas de entrenamiento relacionales", _m010_relational_templates),
+    (11, "Archivo de temporadas", _m011_season_archives),
+    (12, "Registro de cambios", _m012_change_log),
+    (13, "Versiones de fila para edición concurrente", _m013_row_versions),
+    (14, "Totales de temporada por diferencia al mover un partido", _m014_reseason_delta),
+    (15, "Ids sin reutilizar en las tablas archivables", _m015_autoincrement_ids),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(conn):
+    """Aplica las migraciones pendientes y devuelve la versión final del esquema."""
+    current = get_schema_version(conn)
+    if current >= SCHEMA_VERSION:
+        # Camino rápido: el fichero ya está al día, no se ejecuta ningún DDL
+        return current
+
+    # Con foreign_keys activo, reconstruir una tabla padre (DROP TABLE) borraría en cascada sus hijas;
+    # el PRAGMA no tiene efecto dentro de una transacción, por eso se cambia aquí y no en la migración
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        current = _apply_pending(conn, current)
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+    return current
+
+def _apply_pending(conn, current):
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        cursor = conn.cursor()
+        # IMMEDIATE: si otra instancia está migrando a la vez, esperamos a que termine
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Releer dentro de la transacción por si otra instancia ya la aplicó
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            migrate(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise RuntimeError(f"Error al aplicar la migración {version} ({description}): {e}") from e
+        current = version
+    return get_schema_version(conn)
@@ -1,7 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
+from thumbnails import photo_thumbnail
 import os
+from date_utils import to_display_date
 
 class PlanningTab:
     def __init__(self, notebook, db):
@@ -73,7 +74,7 @@ class PlanningTab:
         current_selection_id = self.current_training_id
         
         trainings = self.db.get_all_trainings_for_dropdown()
-        self.trainings_map = {f"{t[1]} - Sesión {t[3]}": t[0] for t in trainings}
+        self.trainings_map = {f"{to_display_date(t.date)} - Sesión {t.session_number}": t.id for t in trainings}
         self.trainings_dropdown['values'] = list(self.trainings_map.keys())
         
         # Intentar restaurar la selección anterior si todavía existe
@@ -108,28 +109,30 @@ class PlanningTab:
         
         available_players = self.db.get_unassigned_players(self.current_training_id)
         for player in available_players:
-            self.available_tree.insert("", "end", values=player[:3], iid=player[0])
+            self.available_tree.insert("", "end", values=player[:3], iid=player.id)
 
         attendance_list = self.db.get_attendance_for_training(self.current_training_id)
         for player in attendance_list:
-            self.attendance_tree.insert("", "end", values=player[:3], iid=player[0], tags=(player[3],))
+            self.attendance_tree.insert("", "end", values=player[:3], iid=player.id, tags=(player.status,))
 
     def add_to_attendance(self):
         selected_items = self.available_tree.selection()
         if not selected_items: return
         
-        for item_id in selected_items:
-            player_id = int(item_id)
-            self.db.set_player_attendance(self.current_training_id, player_id, 'presente')
+        with self.db.transaction():
+            for item_id in selected_items:
+                player_id = int(item_id)
+                self.db.set_player_attendance(self.current_training_id, player_id, 'presente')
         self.refresh_player_lists()
 
     def remove_from_attendance(self):
         selected_items = self.attendance_tree.selection()
         if not selected_items: return
 
-        for item_id in selected_items:
-            player_id = int(item_id)
-            self.db.remove_player_from_training(self.current_training_id, player_id)
+        with self.db.transaction():
+            for item_id in selected_items:
+                player_id = int(item_id)
+                self.db.remove_player_from_training(self.current_training_id, player_id)
         self.refresh_player_lists()
 
     def set_status(self, status):
@@ -138,9 +141,10 @@ class PlanningTab:
             messagebox.showwarning("Sin selección", "Selecciona un jugador de la convocatoria para cambiar su estado.")
             return
 
-        for item_id in selected_items:
-            player_id = int(item_id)
-            self.db.set_player_attendance(self.current_training_id, player_id, status)
+        with self.db.transaction():
+            for item_id in selected_items:
+                player_id = int(item_id)
+                self.db.set_player_attendance(self.current_training_id, player_id, status)
         self.refresh_player_lists()
 
     def show_player_image(self, tree):
@@ -154,8 +158,8 @@ class PlanningTab:
         player_data = self.db.get_player_by_id(player_id)
         if not player_data: return
         
-        photo_path = player_data[9]
-        player_name = player_data[1]
+        photo_path = player_data.photo_path
+        player_name = player_data.name
 
         self.image_popup = tk.Toplevel(self.frame)
         self.image_popup.title(player_name)
@@ -164,9 +168,7 @@ class PlanningTab:
 
         if photo_path and os.path.exists(photo_path):
             try:
-                img = Image.open(photo_path)
-                img.thumbnail((150, 150))
-                self.popup_photo = ImageTk.PhotoImage(img)
+                self.popup_photo = photo_thumbnail(photo_path, (150, 150))
                 lbl = tk.Label(self.image_popup, image=self.popup_photo)
                 lbl.pack()
             except Exception as e:
@@ -1,9 +1,13 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from PIL import Image, ImageTk
 import os
 import shutil
 import sys
+from date_utils import to_display_date
+from virtual_list import PagedTreeview
+from thumbnails import photo_thumbnail
+from importer import TARGETS, import_file, format_result
+from database import ConcurrentEditError
 
 def resource_path(relative_path):
     try:
@@ -13,12 +17,14 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 class PlayersTab:
-    def __init__(self, notebook, db):
+    def __init__(self, notebook, db, worker=None):
         self.db = db
+        self.worker = worker
         self.frame = ttk.Frame(notebook)
         self.photo_path = None
         self.photo_image = None
         self.current_player_id = None
+        self.current_player_version = None
         self.form_widgets = []
         
         if not os.path.exists("data/player_photos"):
@@ -40,11 +46,14 @@ class PlayersTab:
         self.players_tree.heading("number", text="Nº"); self.players_tree.column("number", width=40)
         self.players_tree.pack(fill="y", expand=True)
         self.players_tree.bind("<<TreeviewSelect>>", self.on_player_select)
+        self.players_pager = PagedTreeview(self.players_tree, self.db.get_player_summaries_page, lambda p: p, row_iid=lambda p: str(p.id))
         
         list_btn_frame = ttk.Frame(list_frame)
         list_btn_frame.pack(fill="x", pady=5)
         ttk.Button(list_btn_frame, text="Nuevo Jugador", command=self.prepare_new_player).pack(side="left", expand=True)
         ttk.Button(list_btn_frame, text="Eliminar Jugador", command=self.delete_player).pack(side="left", expand=True)
+        self.import_btn = ttk.Button(list_btn_frame, text="Importar...", command=self.import_data)
+        self.import_btn.pack(side="left", expand=True)
 
         details_notebook = ttk.Notebook(self.frame)
         details_notebook.pack(side="right", fill="both", expand=True, pady=10)
@@ -136,6 +145,8 @@ class PlayersTab:
         if not self.players_tree.selection(): return
         self.current_player_id = self.players_tree.item(self.players_tree.selection()[0])['values'][0]
         player_data = self.db.get_player_by_id(self.current_player_id)
+        # Versión con la que se abre la ficha: al guardar se comprueba que nadie la haya cambiado
+        self.current_player_version = self.db.get_row_version('players', self.current_player_id)
         
         if player_data:
             self.set_form_state('normal')
@@ -178,13 +189,23 @@ class PlayersTab:
         )
 
         if self.current_player_id: 
-            self.db.update_player(self.current_player_id, *player_data)
+            try:
+                self.current_player_version = self.db.update_player(self.current_player_id, *player_data, expected_version=self.current_player_version)
+            except ConcurrentEditError as e:
+                if e.deleted:
+                    messagebox.showerror("Jugador Eliminado", "Otro usuario ha eliminado este jugador. No se han guardado los cambios.")
+                    self.prepare_new_player(); self.load_players(); return
+                messagebox.showwarning("Ficha Modificada", "Otro usuario ha modificado esta ficha mientras la editabas.\nSe ha recargado la versión guardada; vuelve a aplicar tus cambios.")
+                self.on_player_select(); return
             messagebox.showinfo("Éxito", "Jugador actualizado.")
         else: 
             self.current_player_id = self.db.insert_player(*player_data)
             messagebox.showinfo("Éxito", "Nuevo jugador creado.")
         
         self.load_players()
+        # La lista vuelve a la primera página: se cargan las necesarias para dejar seleccionado al jugador guardado
+        if self.players_pager.ensure_loaded(str(self.current_player_id)):
+            self.players_tree.selection_set(str(self.current_player_id)); self.players_tree.see(str(self.current_player_id))
         self.set_form_state('disabled')
         self.edit_player_btn.config(state='normal'); self.mode_label.config(text=f"Modo: Viendo a {name}")
 
@@ -207,8 +228,7 @@ class PlayersTab:
         try:
             full_path = resource_path(path)
             if os.path.exists(full_path):
-                img = Image.open(full_path); img.thumbnail((150, 150), Image.LANCZOS)
-                self.photo_image = ImageTk.PhotoImage(img)
+                self.photo_image = photo_thumbnail(full_path, (150, 150))
                 self.photo_label.config(image=self.photo_image, text="")
             else:
                 self.photo_label.config(image='', text="Sin Foto"); self.photo_image = None
@@ -242,8 +262,7 @@ class PlayersTab:
         ttk.Button(btn_frame, text="Eliminar Lesión", command=self.delete_injury_entry).pack(side="left")
 
     def load_players(self):
-        for item in self.players_tree.get_children(): self.players_tree.delete(item)
-        for p in self.db.get_all_players(): self.players_tree.insert("", tk.END, values=p[:4])
+        self.players_pager.reload()
 
     def enable_editing(self):
         if not self.current_player_id: messagebox.showwarning("Sin selección", "No hay un jugador seleccionado."); return
@@ -257,8 +276,28 @@ class PlayersTab:
             self.db.delete_player(self.current_player_id); self.prepare_new_player(); self.load_players()
             messagebox.showinfo("Eliminado", "Jugador eliminado.")
 
+    def import_data(self):
+        path = filedialog.askopenfilename(title="Importar datos", filetypes=[("CSV o Excel", "*.csv *.xlsx"), ("CSV", "*.csv"), ("Excel", "*.xlsx")])
+        if path: ImportWindow(self.frame, path, self._run_import)
+
+    def _run_import(self, path, target):
+        self.import_btn.config(state='disabled')
+        def done(result):
+            self.import_btn.config(state='normal')
+            self.load_players()
+            if self.current_player_id: self.load_career_history()
+            show = messagebox.showwarning if result.errors else messagebox.showinfo
+            show("Importación", format_result(result))
+        def failed(error):
+            self.import_btn.config(state='normal')
+            messagebox.showerror("Error", f"No se pudo importar el archivo:\n{error}")
+        if self.worker: self.worker.submit(import_file, path, target, callback=done, errback=failed)
+        else:
+            try: done(import_file(self.db, path, target))
+            except Exception as e: failed(e)
+
     def prepare_new_player(self):
-        self.current_player_id = None; self.set_form_state('normal'); self.clear_form_fields()
+        self.current_player_id = None; self.current_player_version = None; self.set_form_state('normal'); self.clear_form_fields()
         self.mode_label.config(text="Modo: Creando Nuevo Jugador"); self.edit_player_btn.config(state='disabled')
         if self.players_tree.selection(): self.players_tree.selection_remove(self.players_tree.selection())
 
@@ -295,7 +334,7 @@ class PlayersTab:
     def load_injuries(self):
         for item in self.injuries_tree.get_children(): self.injuries_tree.delete(item)
         if self.current_player_id:
-            for injury in self.db.get_injuries_for_player(self.current_player_id): self.injuries_tree.insert("", tk.END, values=injury)
+            for injury in self.db.get_injuries_for_player(self.current_player_id): self.injuries_tree.insert("", tk.END, values=(*injury[:2], to_display_date(injury[2]), *injury[3:]))
 
     def add_injury_entry(self):
         if not self.current_player_id: messagebox.showwarning("Sin Jugador", "Debes seleccionar o crear un jugador primero."); return
@@ -313,6 +352,20 @@ class PlayersTab:
         if messagebox.askyesno("Confirmar", "¿Eliminar esta lesión del historial?"): self.db.delete_injury(injury_id); self.load_injuries()
 
 # --- CLASES DE VENTANAS EMERGENTES RESTAURADAS ---
+class ImportWindow(tk.Toplevel):
+    def __init__(self, parent, path, callback):
+        super().__init__(parent); self.path=path; self.callback=callback
+        self.title("Importar Datos"); self.geometry("380x220"); self.transient(parent); self.grab_set()
+        frame=ttk.Frame(self,padding=10); frame.pack(fill="both",expand=True)
+        ttk.Label(frame, text=f"Archivo: {os.path.basename(path)}").pack(anchor="w", pady=(0, 10))
+        ttk.Label(frame, text="Importar como:").pack(anchor="w")
+        self.target = tk.StringVar(value='players')
+        for key, (label, _) in TARGETS.items(): ttk.Radiobutton(frame, text=label, variable=self.target, value=key).pack(anchor="w", padx=10)
+        ttk.Button(frame, text="Importar", command=self.start).pack(pady=10)
+    def start(self):
+        target = self.target.get(); self.destroy()
+        self.callback(self.path, target)
+
 class CareerWindow(tk.Toplevel):
     def __init__(self, parent, db, player_id, refresh_callback, data=None):
         super().__init__(parent); self.db=db; self.player_id=player_id; self.refresh_callback=refresh_callback; self.entry_id=data[0] if data else None
@@ -344,7 +397,7 @@ class InjuryWindow(tk.Toplevel):
         ttk.Label(frame, text="Tipo de Lesión:").grid(row=1, column=0, sticky="w", pady=2); self.type=ttk.Entry(frame); self.type.grid(row=1, column=1, sticky="ew")
         ttk.Label(frame, text="Periodo de Recuperación:").grid(row=2, column=0, sticky="w", pady=2); self.recovery=ttk.Entry(frame); self.recovery.grid(row=2, column=1, sticky="ew")
         ttk.Label(frame, text="Notas Adicionales:").grid(row=3, column=0, sticky="w", pady=2); self.notes=tk.Text(frame, height=5); self.notes.grid(row=4, column=0, columnspan=2, sticky="ew")
-        if data: self.date.insert(0, data[2]); self.type.insert(0, data[3]); self.recovery.insert(0, data[4]); self.notes.insert("1.0", data[5])
+        if data: self.date.insert(0, to_display_date(data[2])); self.type.insert(0, data[3]); self.recovery.insert(0, data[4]); self.notes.insert("1.0", data[5])
         ttk.Button(frame, text="Guardar", command=self.save).grid(row=5, column=0, columnspan=2, pady=10)
     def save(self):
         data = {'player_id': self.player_id, 'injury_date': self.date.get(), 'injury_type': self.type.get(), 'recovery_period': self.recovery.get(), 'notes': self.notes.get("1.0", tk.END).strip()}
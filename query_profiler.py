@@ -0,0 +1,201 @@
+"""Perfilador opcional de consultas SQL para la capa Database.
+
+Se activa con la variable de entorno BARBATE_PROFILE_SQL=1 (o Database(profile_queries=True)).
+Envuelve la conexión sqlite3, mide cada sentencia (ejecución y lectura de resultados), agrupa
+los tiempos por plantilla de sentencia y, para las que superan el umbral, guarda el
+EXPLAIN QUERY PLAN de la ejecución más lenta. El informe se escribe al cerrar la base de datos.
+Cuando está desactivado Database usa la conexión sqlite3 directamente, sin ningún coste.
+"""
+import os
+import re
+import time
+from datetime import datetime
+
+PROFILE_ENV_VAR = "BARBATE_PROFILE_SQL"
+THRESHOLD_ENV_VAR = "BARBATE_SLOW_QUERY_MS"
+REPORT_ENV_VAR = "BARBATE_PROFILE_REPORT"
+DEFAULT_SLOW_THRESHOLD_MS = 20.0
+DEFAULT_REPORT_PATH = "data/query_profile.txt"
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+def profiling_enabled():
+    return os.environ.get(PROFILE_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "si", "sí")
+
+def statement_template(sql):
+    """Normaliza una sentencia para agrupar ejecuciones: espacios colapsados y listas IN (?, ?, ...) unificadas."""
+    return _IN_LIST.sub("IN (?, ...)", _WHITESPACE.sub(" ", sql).strip())
+
+def _percentile(sorted_values, pct):
+    if not sorted_values: return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class _StatementStats:
+    __slots__ = ("samples", "slowest", "slowest_params")
+
+    def __init__(self):
+        self.samples = []
+        self.slowest = 0.0
+        self.slowest_params = None
+
+class QueryProfiler:
+    """Acumula los tiempos por plantilla de sentencia y genera el informe."""
+    def __init__(self, slow_threshold_ms=None, report_path=None):
+        if slow_threshold_ms is None:
+            slow_threshold_ms = float(os.environ.get(THRESHOLD_ENV_VAR, DEFAULT_SLOW_THRESHOLD_MS))
+        self.slow_threshold_ms = slow_threshold_ms
+        self.report_path = report_path or os.environ.get(REPORT_ENV_VAR, DEFAULT_REPORT_PATH)
+        self.stats = {}
+        self.started = datetime.now()
+
+    def record(self, sql, params, elapsed, sample_index=None):
+        """Añade una ejecución (o el tiempo de lectura de una ya registrada) y devuelve su índice."""
+        entry = self.stats.get(sql)
+        if entry is None:
+            entry = self.stats[sql] = _StatementStats()
+        if sample_index is None:
+            entry.samples.append(elapsed)
+            sample_index = len(entry.samples) - 1
+        else:
+            entry.samples[sample_index] += elapsed
+        total = entry.samples[sample_index]
+        if total > entry.slowest:
+            entry.slowest, entry.slowest_params = total, params
+        return sample_index
+
+    def wrap(self, conn):
+        return ProfiledConnection(conn, self)
+
+    def _explain(self, conn, sql, params):
+        head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        if head not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE"):
+            return None
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params if params is not None else ()).fetchall()
+            return [row[-1] for row in rows]
+        except Exception as e:
+            return [f"(no disponible: {e})"]
+
+    def build_report(self, conn):
+        """Devuelve el informe en texto, ordenado por tiempo total."""
+        grouped = {}
+        for sql, entry in self.stats.items():
+            group = grouped.setdefault(statement_template(sql), [])
+            group.append((sql, entry))
+
+        rows = []
+        for template, entries in grouped.items():
+            samples = sorted(s for _, e in entries for s in e.samples)
+            sql, slowest = max(entries, key=lambda item: item[1].slowest)
+            rows.append((sum(samples), template, samples, sql, slowest))
+        rows.sort(key=lambda r: r[0], reverse=True)
+
+        lines = [
+            "Informe de consultas SQL - Barbate CF",
+            f"Sesión: {self.started:%Y-%m-%d %H:%M:%S} - {datetime.now():%Y-%m-%d %H:%M:%S}",
+            f"Umbral de consulta lenta: {self.slow_threshold_ms:g} ms",
+            f"Sentencias distintas: {len(rows)}   Ejecuciones: {sum(len(r[2]) for r in rows)}",
+            "",
+            f"{'total ms':>10} {'n':>6} {'media':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  sentencia",
+        ]
+        slow = []
+        for total, template, samples, sql, slowest in rows:
+            ms = [s * 1000 for s in samples]
+            lines.append(f"{total * 1000:10.2f} {len(ms):6d} {sum(ms) / len(ms):8.2f} {_percentile(ms, 50):8.2f} "
+                         f"{_percentile(ms, 95):8.2f} {_percentile(ms, 99):8.2f} {ms[-1]:8.2f}  {template}")
+            if slowest.slowest * 1000 >= self.slow_threshold_ms:
+                slow.append((template, sql, slowest))
+
+        lines += ["", f"Consultas por encima del umbral ({len(slow)}):"]
+        for template, sql, entry in slow:
+            lines += ["", f"- {template}", f"  máx {entry.slowest * 1000:.2f} ms, parámetros: {entry.slowest_params!r}"]
+            for step in self._explain(conn, sql, entry.slowest_params) or ["(sin plan: no es una consulta de datos)"]:
+                lines.append(f"    {step}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, conn):
+        """Escribe el informe en report_path y devuelve la ruta."""
+        folder = os.path.dirname(os.path.abspath(self.report_path))
+        if not os.path.exists(folder): os.makedirs(folder)
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            f.write(self.build_report(conn))
+        return self.report_path
+
+class ProfiledCursor:
+    """Cursor que mide execute/executemany y la lectura posterior de resultados."""
+    def __init__(self, cursor, profiler):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._current = None
+
+    def _timed(self, method, sql, params):
+        start = time.perf_counter()
+        try:
+            method(sql, params) if params is not None else method(sql)
+        finally:
+            index = self._profiler.record(sql, params, time.perf_counter() - start)
+            self._current = (sql, params, index)
+        return self
+
+    def execute(self, sql, params=None):
+        return self._timed(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        # Los parámetros de executemany pueden ser un generador: no se guardan para EXPLAIN
+        start = time.perf_counter()
+        try:
+            self._cursor.executemany(sql, seq_of_params)
+        finally:
+            index = self._profiler.record(sql, None, time.perf_counter() - start)
+            self._current = (sql, None, index)
+        return self
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._current:
+                sql, params, index = self._current
+                self._profiler.record(sql, params, time.perf_counter() - start, index)
+
+    def fetchone(self): return self._fetch(self._cursor.fetchone)
+    def fetchall(self): return self._fetch(self._cursor.fetchall)
+    def fetchmany(self, size=None): return self._fetch(self._cursor.fetchmany, *(() if size is None else (size,)))
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None: return
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class ProfiledConnection:
+    """Envoltorio de sqlite3.Connection que pasa todas las sentencias por el perfilador."""
+    def __init__(self, conn, profiler):
+        self._conn = conn
+        self.profiler = profiler
+
+    @property
+    def raw(self):
+        return self._conn
+
+    def cursor(self, *args):
+        return ProfiledCursor(self._conn.cursor(*args), self.profiler)
+
+    def execute(self, sql, params=None):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        if name in ("_conn", "profiler"): object.__setattr__(self, name, value)
+        else: setattr(self._conn, name, value)
@@ -0,0 +1,92 @@
+"""Conexiones de solo lectura por hilo para consultas en segundo plano.
+
+Una conexión sqlite3 no se puede compartir entre hilos, así que ReadConnectionPool abre una
+por hilo (URI mode=ro y PRAGMA query_only) y la reutiliza en las siguientes peticiones de ese
+hilo. En modo WAL cada snapshot() ve una foto consistente de la base de datos mientras la
+conexión de la interfaz sigue escribiendo, de modo que informes y exportaciones pueden
+generarse en paralelo con la edición.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+from database import Database, DEFAULT_CONNECTION_PROFILE
+from migrations import get_schema_version
+
+class ReadOnlyDatabase(Database):
+    """Database sobre una conexión de solo lectura: sirven todos los métodos de consulta, las escrituras fallan."""
+    def __init__(self, conn, db_path, profile):
+        self.db_path = db_path
+        self.profile = profile
+        self._init_state(conn)
+        self.schema_version = get_schema_version(conn)
+        self._load_change_state()
+
+    def close(self):
+        self.conn.close()
+
+class ReadConnectionPool:
+    def __init__(self, db_path, profile=None):
+        self.db_path = os.path.abspath(db_path)
+        self.profile = {**DEFAULT_CONNECTION_PROFILE, **(profile or {})}
+        self._local = threading.local()
+        self._readers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        uri = f"file:{pathname2url(self.db_path)}?mode=ro"
+        # Cada conexión la usa solo su hilo; check_same_thread=False permite cerrarlas todas desde close_all()
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        p = self.profile
+        conn.execute(f"PRAGMA busy_timeout = {int(p['busy_timeout'])}")
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA cache_size = {int(p['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(p['mmap_size'])}")
+        conn.execute(f"PRAGMA temp_store = {p['temp_store']}")
+        return conn
+
+    def reader(self):
+        """Devuelve el ReadOnlyDatabase del hilo actual, abriéndolo la primera vez."""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            with self._lock:
+                if self._closed: raise RuntimeError("El pool de conexiones de lectura está cerrado")
+                db = ReadOnlyDatabase(self._connect(), self.db_path, self.profile)
+                self._readers.append(db)
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def snapshot(self):
+        """Ejecuta el bloque dentro de una transacción de lectura: todas sus consultas ven el mismo estado."""
+        db = self.reader()
+        # La caché de entidades no debe sobrevivir de una petición a otra: la interfaz puede haber escrito
+        db.clear_entity_cache()
+        # ATTACH no se permite dentro de una transacción: las temporadas archivadas se adjuntan antes
+        db._has_archives()
+        db.conn.execute("BEGIN")
+        try:
+            yield db
+        finally:
+            db.conn.rollback()
+
+    def release(self):
+        """Cierra la conexión del hilo actual (para hilos que terminan y no vuelven a consultar)."""
+        db = getattr(self._local, 'db', None)
+        if db is None: return
+        self._local.db = None
+        with self._lock:
+            self._readers.remove(db)
+        db.close()
+
+    def close_all(self):
+        """Cierra todas las conexiones; llamar cuando ningún hilo las esté usando."""
+        with self._lock:
+            self._closed = True
+            readers, self._readers = self._readers, []
+        for db in readers:
+            try: db.close()
+            except Exception as e: print(f"Error al cerrar conexión de lectura: {e}")
@@ -0,0 +1,64 @@
+"""Tipos de registro que devuelve Database en lugar de tuplas sin nombre.
+
+Son namedtuple: ocupan lo mismo que una tupla (__slots__ vacío, sin __dict__ por fila), se
+pueden pasar directamente como 'values' de un Treeview y siguen admitiendo acceso por posición
+y desempaquetado, pero permiten leer los campos por nombre (player.photo_path, match.is_home).
+Las consultas construyen su lista de columnas a partir de los campos del registro con columns(),
+de modo que el SELECT y el registro no pueden desincronizarse.
+"""
+import json
+from collections import namedtuple
+
+Player = namedtuple('Player', 'id name position number date_of_birth nationality dominant_foot height_cm weight_kg photo_path observations shirt_name phone email address town city')
+PlayerSummary = namedtuple('PlayerSummary', 'id name position number')
+
+Coach = namedtuple('Coach', 'id name role photo_path phone address town province observations')
+CoachSummary = namedtuple('CoachSummary', 'id name role')
+
+Training = namedtuple('Training', 'id date mesocycle session_number coach assistant_coach material')
+TrainingSummary = namedtuple('TrainingSummary', 'id date mesocycle session_number')
+
+Exercise = namedtuple('Exercise', 'id training_id name description duration repetitions space objectives rules variants image_path category')
+ExerciseSummary = namedtuple('ExerciseSummary', 'id name category duration')
+
+Match = namedtuple('Match', 'id match_date competition rival venue is_home result')
+MatchSummary = namedtuple('MatchSummary', 'id match_date rival result')
+
+Callup = namedtuple('Callup', 'id match_date rival venue is_home city')
+CallupSummary = namedtuple('CallupSummary', 'id match_date rival')
+
+LayoutElement = namedtuple('LayoutElement', 'layout_id seq type rel_x rel_y rel_x2 rel_y2 rotation player_id team text options extra')
+
+AttendanceEntry = namedtuple('AttendanceEntry', 'id name position status photo_path shirt_name')
+
+ChangeEntry = namedtuple('ChangeEntry', 'version table_name row_id op')
+
+def columns(record, prefix=""):
+    """Lista de columnas SQL para un tipo de registro, opcionalmente con alias de tabla ('p.')."""
+    return ", ".join(prefix + field for field in record._fields)
+
+_LAYOUT_ELEMENT_KEYS = {'type', 'rel_x', 'rel_y', 'rel_coords', 'rotation', 'player_id', 'team', 'text', 'options'}
+
+def layout_element_from_data(layout_id, seq, data):
+    """Convierte un elemento del editor de campo (dict) en una fila de layout_elements.
+
+    Las flechas guardan su inicio en rel_x/rel_y y su final en rel_x2/rel_y2; las claves que no tienen
+    columna propia (p. ej. coordenadas absolutas de diseños antiguos) van en 'extra' como JSON.
+    """
+    rel_x, rel_y, rel_x2, rel_y2 = data.get('rel_x'), data.get('rel_y'), None, None
+    if data.get('rel_coords'): rel_x, rel_y, rel_x2, rel_y2 = data['rel_coords']
+    extra = {k: v for k, v in data.items() if k not in _LAYOUT_ELEMENT_KEYS}
+    options = data.get('options')
+    return LayoutElement(layout_id, seq, data.get('type'), rel_x, rel_y, rel_x2, rel_y2, data.get('rotation'), data.get('player_id'),
+                         data.get('team'), data.get('text'), json.dumps(options) if options is not None else None, json.dumps(extra) if extra else None)
+
+def layout_element_to_data(element):
+    """Operación inversa de layout_element_from_data: el dict que usan el editor y los informes."""
+    data = {'type': element.type}
+    if element.rel_x2 is not None: data['rel_coords'] = [element.rel_x, element.rel_y, element.rel_x2, element.rel_y2]
+    elif element.rel_x is not None: data['rel_x'], data['rel_y'] = element.rel_x, element.rel_y
+    for key in ('rotation', 'player_id', 'team', 'text'):
+        if getattr(element, key) is not None: data[key] = getattr(element, key)
+    if element.options is not None: data['options'] = json.loads(element.options)
+    if element.extra: data.update(json.loads(element.extra))
+    return data
@@ -8,10 +8,13 @@ from reportlab.lib.enums import TA_LEFT, TA_CENTER
 from reportlab.lib import colors
 import os
 import sys
-import json
 from io import BytesIO
 from PIL import Image as PILImage, ImageTk
 import subprocess
+from date_utils import to_display_date
+from db_worker import ImmediateRunner
+from maintenance import run_maintenance, format_report
+from exporter import EXPORTS, TABLE_PREFIX, export, exportable_tables
 
 try:
     import fitz  # PyMuPDF
@@ -105,21 +108,22 @@ class ReportCustomizationDialog(tk.Toplevel):
 
     def populate_lists(self):
         self.exercises = self.db.get_exercises_by_training(self.training_id)
-        for ex in self.exercises: self.exercise_list.insert(tk.END, f"{ex[2]}")
+        for ex in self.exercises: self.exercise_list.insert(tk.END, f"{ex.name}")
         self.exercise_list.selection_set(0, tk.END)
         self.layouts = self.db.get_all_layouts()
         for lid, name in self.layouts: self.layout_list.insert(tk.END, name)
 
     def on_generate(self):
         selected_ex_indices = self.exercise_list.curselection(); selected_ly_indices = self.layout_list.curselection()
-        selected_exercise_ids = [self.exercises[i][0] for i in selected_ex_indices]
+        selected_exercise_ids = [self.exercises[i].id for i in selected_ex_indices]
         selected_layout_ids = [self.layouts[i][0] for i in selected_ly_indices]
         self.callback(self.training_id, selected_exercise_ids, selected_layout_ids)
         self.destroy()
 
 class ReportsTab:
-    def __init__(self, notebook, db, field_editor):
+    def __init__(self, notebook, db, field_editor, worker=None):
         self.db = db; self.field_editor = field_editor; self.frame = ttk.Frame(notebook)
+        self.worker = worker or ImmediateRunner(db)
         self.current_report_data = []; self.current_report_headers = []; self.current_report_title = ""
         self.setup_ui()
     
@@ -137,6 +141,7 @@ class ReportsTab:
         
         self.preview_button = ttk.Button(stats_frame, text="Vista Previa y Exportar Tabla", state="disabled", command=self.open_preview)
         self.preview_button.pack(fill="x", padx=10, pady=(10, 4), ipady=2)
+        ttk.Button(stats_frame, text="Exportar Datos (CSV / JSONL)", command=self.select_export).pack(fill="x", padx=10, pady=4, ipady=2)
 
         training_report_frame = ttk.LabelFrame(controls_frame, text="Reporte de Entrenamiento")
         training_report_frame.pack(fill="x", pady=20)
@@ -148,6 +153,12 @@ class ReportsTab:
         
         ttk.Button(training_report_frame, text="Abrir Carpeta de Reportes", command=self.open_reports_folder).pack(fill="x", padx=10, pady=(0,10), ipady=2)
 
+        maintenance_frame = ttk.LabelFrame(controls_frame, text="Base de Datos")
+        maintenance_frame.pack(fill="x", pady=5)
+        self.maintenance_button = ttk.Button(maintenance_frame, text="Mantenimiento y Comprobación", command=self.run_maintenance)
+        self.maintenance_button.pack(fill="x", padx=10, pady=10, ipady=2)
+        ttk.Button(maintenance_frame, text="Archivar Temporada Cerrada", command=self.select_season_to_archive).pack(fill="x", padx=10, pady=(0, 10), ipady=2)
+
         data_frame = ttk.Frame(main_paned_window)
         main_paned_window.add(data_frame, weight=4)
         self.tree = ttk.Treeview(data_frame, show="headings")
@@ -197,32 +208,78 @@ class ReportsTab:
 
     def show_squad_stats(self):
         headers = [("name", "Jugador", 180), ("pj", "PJ", 50), ("mins", "Min", 50), ("g", "G", 50), ("a", "A", 50), ("t", "T", 50), ("ta", "TA", 50), ("tr", "TR", 50)]
-        data = self.db.get_squad_stats_report(); processed_data = [(row[0], row[3], row[4], row[5], row[6], row[7], row[8], row[9]) for row in data]
-        self._setup_treeview(headers, processed_data, "Reporte Global de Estadísticas de Plantilla")
+        def show(data):
+            processed_data = [(row[0], row[3], row[4], row[5], row[6], row[7], row[8], row[9]) for row in data]
+            self._setup_treeview(headers, processed_data, "Reporte Global de Estadísticas de Plantilla")
+        self.worker.submit('get_squad_stats_report', callback=show, errback=self._show_query_error)
 
     def show_matches_history(self):
         headers = [("date", "Fecha", 120), ("rival", "Rival", 200), ("result", "Resultado", 100)]
-        data = self.db.get_all_matches(); processed_data = [(row[1], row[2], row[3]) for row in data]
-        self._setup_treeview(headers, processed_data, "Historial de Partidos")
+        def show(data):
+            processed_data = [(to_display_date(m.match_date), m.rival, m.result) for m in data]
+            self._setup_treeview(headers, processed_data, "Historial de Partidos")
+        self.worker.submit('get_match_history', callback=show, errback=self._show_query_error)
 
     def select_match_for_stats(self):
-        matches = self.db.get_all_matches(); items_for_dialog = [(m[0], f"{m[1]} vs {m[2]} ({m[3]})") for m in matches]
+        matches = self.db.get_match_history(); items_for_dialog = [(m.id, f"{to_display_date(m.match_date)} vs {m.rival} ({m.result})") for m in matches]
         SelectionDialog(self.frame, "Partido", items_for_dialog, self._load_match_stats)
 
     def _load_match_stats(self, match_id):
         headers = [("name", "Jugador", 180), ("num", "Nº", 50), ("mins", "Min", 50), ("g", "G", 50), ("a", "A", 50), ("t", "T", 50), ("ta", "TA", 50), ("tr", "TR", 50)]
-        data = self.db.get_match_stats_report(match_id); processed_data = [(row[0], row[3], row[4], row[5], row[6], row[7], row[8], row[9]) for row in data]
-        match_details = self.db.get_match_details(match_id); title = f"Estadísticas del Partido: vs {match_details[3]} ({match_details[1]})"
-        self._setup_treeview(headers, processed_data, title)
+        def show(result):
+            data, match_details = result
+            processed_data = [(row[0], row[3], row[4], row[5], row[6], row[7], row[8], row[9]) for row in data]
+            title = f"Estadísticas del Partido: vs {match_details.rival} ({to_display_date(match_details.match_date)})"
+            self._setup_treeview(headers, processed_data, title)
+        self.worker.submit(lambda db: (db.get_match_stats_report(match_id), db.get_match_details(match_id)), callback=show, errback=self._show_query_error)
+
+    def run_maintenance(self):
+        self.maintenance_button.config(state="disabled")
+        def done(report):
+            self.maintenance_button.config(state="normal")
+            messagebox.showinfo("Mantenimiento", format_report(report))
+        def failed(error):
+            self.maintenance_button.config(state="normal")
+            messagebox.showerror("Error", f"No se pudo completar el mantenimiento:\n{error}")
+        # Acción explícita del usuario: aquí sí se hace la conversión con VACUUM completo si hace falta
+        self.worker.submit(run_maintenance, convert_auto_vacuum=True, callback=done, errback=failed)
+
+    def select_season_to_archive(self):
+        seasons = self.db.get_archivable_seasons()
+        if not seasons: messagebox.showinfo("Archivar Temporada", "No hay temporadas cerradas con datos pendientes de archivar."); return
+        SelectionDialog(self.frame, "Año de Temporada", [(s, s) for s in seasons], self.archive_season)
+
+    def archive_season(self, season):
+        if not messagebox.askyesno("Archivar Temporada", f"Los entrenamientos, partidos y convocatorias de la temporada {season} se moverán a un archivo aparte.\nSeguirán apareciendo en los reportes históricos.\n\n¿Continuar?"): return
+        def done(moved):
+            messagebox.showinfo("Archivar Temporada", f"Temporada {season} archivada: {moved['trainings']} entrenamientos, {moved['matches']} partidos y {moved['match_callups']} convocatorias.")
+        self.worker.submit('archive_season', season, callback=done, errback=lambda e: messagebox.showerror("Error", f"No se pudo archivar la temporada:\n{e}"))
+
+    def select_export(self):
+        items = [(key, label) for key, (label, _) in EXPORTS.items()] + [(TABLE_PREFIX + t, f"Tabla: {t}") for t in exportable_tables(self.db)]
+        SelectionDialog(self.frame, "Informe", items, self.export_data)
+
+    def export_data(self, name):
+        if not os.path.exists("reportes"): os.makedirs("reportes")
+        default_name = name.replace(TABLE_PREFIX, "tabla_")
+        file_path = filedialog.asksaveasfilename(initialdir="reportes", initialfile=f"{default_name}.csv", defaultextension=".csv", filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")])
+        if not file_path: return
+        def done(result):
+            messagebox.showinfo("Exportación", f"{result.rows} filas exportadas a:\n{result.path}")
+        # En un hilo de lectura: la exportación no bloquea la interfaz ni las escrituras
+        self.worker.submit_read(export, name, file_path, callback=done, errback=lambda e: messagebox.showerror("Error", f"No se pudo exportar:\n{e}"))
+
+    def _show_query_error(self, error):
+        messagebox.showerror("Error", f"No se pudo cargar el reporte:\n{error}")
 
     def select_player_for_career(self):
-        players = self.db.get_all_players(); items_for_dialog = [(p[0], p[1]) for p in players]
+        players = self.db.get_player_summaries(); items_for_dialog = [(p.id, p.name) for p in players]
         SelectionDialog(self.frame, "Jugador", items_for_dialog, self._load_player_career)
 
     def _load_player_career(self, player_id):
         headers = [("season", "Temporada", 100), ("team", "Equipo", 180), ("pj", "PJ", 50), ("g", "G", 50), ("a", "A", 50), ("ta", "TA", 50), ("tr", "TR", 50)]
         data = self.db.get_career_history_for_player(player_id); processed_data = [(row[2], row[3], row[4], row[5], row[6], row[7], row[8]) for row in data]
-        player_details = self.db.get_player_by_id(player_id); title = f"Trayectoria de {player_details[1]}"
+        player_details = self.db.get_player_by_id(player_id); title = f"Trayectoria de {player_details.name}"
         self._setup_treeview(headers, processed_data, title)
 
     def _create_stats_pdf_in_memory(self):
@@ -261,8 +318,8 @@ class ReportsTab:
         except Exception as e: messagebox.showerror("Error de Previsualización", f"No se pudo generar la vista previa:\n{e}")
 
     def load_trainings_dropdown(self):
-        trainings = self.db.get_all_trainings()
-        self.training_map = {f"{t[1]} - Sesión {t[3]}": t[0] for t in trainings}
+        trainings = self.db.get_all_trainings_for_dropdown()
+        self.training_map = {f"{to_display_date(t.date)} - Sesión {t.session_number}": t.id for t in trainings}
         self.training_dropdown['values'] = list(self.training_map.keys())
         if self.training_dropdown['values']: self.training_dropdown.current(0)
 
@@ -278,20 +335,24 @@ class ReportsTab:
         file_path = filedialog.asksaveasfilename(initialdir="reportes", defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")], title="Guardar Reporte de Entrenamiento")
         if not file_path: return
         
-        try:
-            self.build_training_pdf(training_id, exercise_ids, layout_ids, file_path)
-            messagebox.showinfo("Éxito", f"Reporte generado en:\n{file_path}")
-        except PermissionError:
+        # El PDF se construye en un hilo de lectura para no congelar la interfaz mientras se sigue editando
+        self.worker.submit_read(lambda db: self.build_training_pdf(training_id, exercise_ids, layout_ids, file_path, db),
+                                callback=lambda result: messagebox.showinfo("Éxito", f"Reporte generado en:\n{file_path}"),
+                                errback=lambda error: self._show_pdf_error(error, file_path))
+
+    def _show_pdf_error(self, error, file_path):
+        if isinstance(error, PermissionError):
             messagebox.showerror(
                 "Permiso Denegado",
                 f"No se pudo guardar el archivo en:\n{file_path}\n\n"
                 "Causa más probable: El archivo PDF ya está abierto en otra aplicación.\n\n"
                 "Por favor, cierre el visor de PDF e intente generar el reporte de nuevo."
             )
-        except Exception as e:
-            messagebox.showerror("Error Inesperado", f"Ocurrió un error al generar el reporte:\n\n{e}")
+        else:
+            messagebox.showerror("Error Inesperado", f"Ocurrió un error al generar el reporte:\n\n{error}")
 
-    def build_training_pdf(self, training_id, exercise_ids, layout_ids, file_path):
+    def build_training_pdf(self, training_id, exercise_ids, layout_ids, file_path, db=None):
+        db = db or self.db
         doc = SimpleDocTemplate(file_path, pagesize=A4, topMargin=35*mm, leftMargin=15*mm, rightMargin=15*mm, bottomMargin=15*mm)
         styles = getSampleStyleSheet()
         styles.add(ParagraphStyle(name='ReportTitle', parent=styles['h1'], alignment=TA_CENTER, fontSize=18, spaceAfter=2))
@@ -300,27 +361,25 @@ class ReportsTab:
         styles.add(ParagraphStyle(name='ReportBodyText', parent=styles['Normal'], fontSize=9, leading=11))
         
         elements = []
-        training_details = next((t for t in self.db.get_all_trainings() if t[0] == training_id), None)
+        training_details = db.get_training_by_id(training_id)
         if not training_details: return
 
         info_data = [
-            [Paragraph('<b>Fecha:</b>', styles['ReportBodyText']), Paragraph(training_details[1], styles['ReportBodyText']), Paragraph('<b>Mesociclo:</b>', styles['ReportBodyText']), Paragraph(training_details[2], styles['ReportBodyText'])],
-            [Paragraph('<b>Nº de sesión:</b>', styles['ReportBodyText']), Paragraph(str(training_details[3]), styles['ReportBodyText']), '', ''],
-            [Paragraph('<b>Entrenador:</b>', styles['ReportBodyText']), Paragraph(training_details[4], styles['ReportBodyText']), Paragraph('<b>2º Entrenador, PF:</b>', styles['ReportBodyText']), Paragraph(training_details[5], styles['ReportBodyText'])]
+            [Paragraph('<b>Fecha:</b>', styles['ReportBodyText']), Paragraph(to_display_date(training_details.date), styles['ReportBodyText']), Paragraph('<b>Mesociclo:</b>', styles['ReportBodyText']), Paragraph(training_details.mesocycle, styles['ReportBodyText'])],
+            [Paragraph('<b>Nº de sesión:</b>', styles['ReportBodyText']), Paragraph(str(training_details.session_number), styles['ReportBodyText']), '', ''],
+            [Paragraph('<b>Entrenador:</b>', styles['ReportBodyText']), Paragraph(training_details.coach, styles['ReportBodyText']), Paragraph('<b>2º Entrenador, PF:</b>', styles['ReportBodyText']), Paragraph(training_details.assistant_coach, styles['ReportBodyText'])]
         ]
         info_table = Table(info_data, colWidths=[35*mm, 60*mm, 40*mm, 45*mm]); info_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP')]))
         elements.append(info_table); elements.append(Spacer(1, 8*mm))
         
         elements.append(Paragraph("CONVOCATORIA", styles['SectionHeader']))
-        attendance = self.db.get_attendance_for_training(training_id)
+        attendance = db.get_attendance_for_training(training_id)
         if attendance:
             player_groups = {"PORTEROS": [], "DEFENSAS": [], "MEDIOS": [], "EXTREMOS": [], "DELANTEROS": []}
             pos_map = {"Portero": "PORTEROS", "Defensa": "DEFENSAS", "Mediocentro": "MEDIOS"}
             for p_data in attendance:
-                shirt_name = p_data[5]
-                full_name = p_data[1]
-                name_to_display = shirt_name if shirt_name else full_name
-                player_pos = p_data[2]
+                name_to_display = p_data.shirt_name if p_data.shirt_name else p_data.name
+                player_pos = p_data.position
                 assigned_group = pos_map.get(player_pos, "DELANTEROS")
                 player_groups[assigned_group].append(name_to_display)
             
@@ -335,16 +394,15 @@ class ReportsTab:
             player_table.setStyle(TableStyle([('BACKGROUND', (0,0), (-1,0), colors.lightgrey), ('ALIGN', (0,0), (-1,-1), 'CENTER'), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'), ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'), ('FONTSIZE', (0,0), (-1,-1), 8), ('GRID', (0,0), (-1,-1), 1, colors.black)]))
             elements.append(player_table); elements.append(Spacer(1, 8*mm))
         
-        if training_details[6]:
-            elements.append(Paragraph("MATERIAL", styles['SectionHeader'])); elements.append(Paragraph(training_details[6].replace('\n', '<br/>'), styles['ReportBodyText'])); elements.append(Spacer(1, 8*mm))
+        if training_details.material:
+            elements.append(Paragraph("MATERIAL", styles['SectionHeader'])); elements.append(Paragraph(training_details.material.replace('\n', '<br/>'), styles['ReportBodyText'])); elements.append(Spacer(1, 8*mm))
         
         if layout_ids:
             elements.append(Paragraph("DISEÑOS TÁCTICOS", styles['SectionHeader']))
             for lid in layout_ids:
-                layout_json = self.db.get_layout_data_by_id(lid)
-                if layout_json:
-                    layout_data = json.loads(layout_json)
-                    field_image = self.field_editor.create_image_from_layout_data(layout_data)
+                layout_data = db.get_layout_elements(lid)
+                if layout_data:
+                    field_image = self.field_editor.create_image_from_layout_data(layout_data, db)
                     buffer = BytesIO()
                     field_image.save(buffer, format="PNG")
                     buffer.seek(0)
@@ -352,11 +410,11 @@ class ReportsTab:
                     elements.append(Spacer(1, 5*mm))
             elements.append(PageBreak())
             
-        selected_exercises = self.db.get_exercises_by_ids(exercise_ids)
+        selected_exercises = db.get_exercises_by_ids(exercise_ids)
         if selected_exercises:
             exercise_groups = {}
             for ex in selected_exercises:
-                category = ex[11] or "Ejercicios Generales"
+                category = ex.category or "Ejercicios Generales"
                 if category not in exercise_groups: exercise_groups[category] = []
                 exercise_groups[category].append(ex)
                 
@@ -380,7 +438,7 @@ class ReportsTab:
                 logo_path = resource_path("club_logo.png")
                 if os.path.exists(logo_path): canvas.drawImage(logo_path, 15*mm, A4[1] - 30*mm, width=25*mm, height=25*mm, preserveAspectRatio=True, mask='auto')
             except Exception as e: print(f"Error al dibujar logo: {e}")
-            p_title = Paragraph("BARBATE C. F.", styles['ReportTitle']); p_subtitle = Paragraph(training_details[2] or "Entrenamiento", styles['ReportSubTitle'])
+            p_title = Paragraph("BARBATE C. F.", styles['ReportTitle']); p_subtitle = Paragraph(training_details.mesocycle or "Entrenamiento", styles['ReportSubTitle'])
             p_title.wrapOn(canvas, doc.width - 40*mm, doc.topMargin); p_title.drawOn(canvas, doc.leftMargin + 30*mm, A4[1] - 20*mm)
             p_subtitle.wrapOn(canvas, doc.width - 40*mm, doc.topMargin); p_subtitle.drawOn(canvas, doc.leftMargin + 30*mm, A4[1] - 27*mm)
             canvas.restoreState()
@@ -388,7 +446,8 @@ class ReportsTab:
         doc.build(elements, onFirstPage=header_footer, onLaterPages=header_footer)
         
     def format_exercise_for_pdf(self, ex_data, styles):
-        (eid, tid, name, desc, dur, rep, space, obj, rules, var, img_path, category) = ex_data
+        name, dur, rep, space, img_path = ex_data.name, ex_data.duration, ex_data.repetitions, ex_data.space, ex_data.image_path
+        desc, obj, rules, var = ex_data.description, ex_data.objectives, ex_data.rules, ex_data.variants
         
         desc = desc.replace('\n', '<br/>') if desc else ''
         obj = obj.replace('\n', '<br/>') if obj else ''
@@ -0,0 +1,154 @@
+"""Archivo de temporadas cerradas en bases de datos aparte.
+
+archive_season mueve los entrenamientos (con sus ejercicios y asistencia), los partidos (con sus
+estadísticas) y las convocatorias de una temporada cerrada a data/archivo/temporada_AAAA-AAAA.db,
+de modo que la base de datos principal solo crece con la temporada en curso. Jugadores,
+entrenadores, ejercicios de biblioteca y los totales de player_season_totals se quedan en la
+principal, así que los informes de plantilla y de trayectoria siguen viendo todas las temporadas.
+
+Cuando una consulta histórica lo necesita, attach_archives adjunta (ATTACH) los archivos a la
+conexión y crea vistas temporales history_<tabla> que unen (UNION ALL) la tabla principal con la
+de cada temporada archivada.
+"""
+import os
+from datetime import datetime
+
+from date_utils import season_range, season_for_date
+
+ARCHIVE_FOLDER_NAME = "archivo"
+# SQLite admite 10 bases adjuntas por defecto: se deja margen para otros usos
+MAX_ATTACHED_ARCHIVES = 8
+
+# Tablas archivadas y la condición que selecciona las filas de la temporada (:low, :high)
+_TRAININGS = "SELECT id FROM main.trainings WHERE date >= :low AND date < :high"
+_MATCHES = "SELECT id FROM main.matches WHERE match_date >= :low AND match_date < :high"
+_CALLUPS = "SELECT id FROM main.match_callups WHERE match_date >= :low AND match_date < :high"
+ARCHIVED_TABLES = [
+    ("trainings", "date >= :low AND date < :high"),
+    ("exercises", f"training_id IN ({_TRAININGS})"),
+    ("training_attendance", f"training_id IN ({_TRAININGS})"),
+    ("matches", "match_date >= :low AND match_date < :high"),
+    ("player_match_stats", f"match_id IN ({_MATCHES})"),
+    ("match_callups", "match_date >= :low AND match_date < :high"),
+    ("callup_players", f"callup_id IN ({_CALLUPS})"),
+    ("callup_coaches", f"callup_id IN ({_CALLUPS})"),
+]
+
+def _first_year(season):
+    return int(season_range(season)[0][:4])
+
+def season_label(season):
+    year = _first_year(season)
+    return f"{year}/{year + 1}"
+
+def schema_name(season):
+    return f"arch_{_first_year(season)}"
+
+def archive_path(db, season):
+    year = _first_year(season)
+    return os.path.join(os.path.dirname(os.path.abspath(db.db_path)), ARCHIVE_FOLDER_NAME, f"temporada_{year}-{year + 1}.db")
+
+def archived_seasons(db):
+    return [row[0] for row in db.conn.execute("SELECT season FROM season_archives ORDER BY season DESC")]
+
+def archivable_seasons(db):
+    """Temporadas anteriores a la actual que todavía tienen datos en la base de datos principal."""
+    current = season_range(season_for_date(datetime.now()))[0]
+    rows = db.conn.execute("SELECT date FROM trainings WHERE date < :c UNION SELECT match_date FROM matches WHERE match_date < :c "
+                           "UNION SELECT match_date FROM match_callups WHERE match_date < :c", {"c": current}).fetchall()
+    return sorted({season_for_date(row[0]) for row in rows if season_for_date(row[0])}, reverse=True)
+
+def _attach(db, season, path):
+    schema = schema_name(season)
+    if schema in db._attached_archives: return schema
+    if db.conn.in_transaction:
+        raise RuntimeError("No se puede adjuntar el archivo de temporada con una transacción abierta")
+    db.conn.execute("ATTACH DATABASE ? AS " + schema, (path,))
+    db._attached_archives[schema] = season
+    return schema
+
+def _create_archive_tables(db, schema):
+    """Crea en el archivo las tablas con las mismas columnas y clave primaria, sin claves foráneas."""
+    for table, _ in ARCHIVED_TABLES:
+        info = db.conn.execute(f"PRAGMA main.table_info({table})").fetchall()
+        cols = ", ".join(f"{name} {col_type}" for _, name, col_type, _, _, _ in info)
+        pk = [name for _, name, _, _, _, pk_index in sorted(info, key=lambda c: c[5]) if pk_index]
+        db.conn.execute(f"CREATE TABLE IF NOT EXISTS {schema}.{table} ({cols}" + (f", PRIMARY KEY ({', '.join(pk)})" if pk else "") + ")")
+
+def attach_archives(db):
+    """Adjunta las temporadas archivadas más recientes y (re)crea las vistas history_<tabla>; devuelve cuántas hay."""
+    seasons = archived_seasons(db)[:MAX_ATTACHED_ARCHIVES]
+    if not seasons: return 0
+    wanted = {schema_name(s) for s in seasons}
+    if wanted <= set(db._attached_archives) and db._history_views: return len(seasons)
+    for season in seasons:
+        if schema_name(season) in db._attached_archives: continue
+        path = archive_path(db, season)
+        if not os.path.exists(path): print(f"Aviso: no se encuentra el archivo de la temporada {season}: {path}")
+        # ATTACH no se admite en una transacción: Database los adjunta todos al abrirse, y dentro de
+        # una transacción solo se usan los que ya lo están
+        elif not db.conn.in_transaction: _attach(db, season, path)
+    schemas = [s for s in db._attached_archives if s in wanted]
+    # Las conexiones de lectura (read_pool) tienen query_only: las vistas TEMP solo tocan el esquema temporal
+    query_only = db.conn.execute("PRAGMA query_only").fetchone()[0]
+    if query_only: db.conn.execute("PRAGMA query_only = OFF")
+    for table, _ in ARCHIVED_TABLES:
+        cols = ", ".join(row[1] for row in db.conn.execute(f"PRAGMA main.table_info({table})"))
+        union = " UNION ALL ".join([f"SELECT {cols} FROM main.{table}"] + [f"SELECT {cols} FROM {s}.{table}" for s in schemas])
+        db.conn.execute(f"DROP VIEW IF EXISTS temp.history_{table}")
+        db.conn.execute(f"CREATE TEMP VIEW history_{table} AS {union}")
+    if query_only: db.conn.execute("PRAGMA query_only = ON")
+    db._history_views = True
+    return len(seasons)
+
+def season_schema(db, season):
+    """Esquema donde están los datos de una temporada: 'main' o el archivo adjunto."""
+    label = season_label(season)
+    if label not in archived_seasons(db): return "main"
+    schema = schema_name(label)
+    # Dentro de una transacción solo vale un archivo ya adjunto (Database los adjunta al abrirse)
+    if schema in db._attached_archives: return schema
+    return _attach(db, label, archive_path(db, label))
+
+def archive_season(db, season):
+    """Mueve una temporada cerrada a su archivo y devuelve cuántas filas se han movido por tabla."""
+    label = season_label(season)
+    low, high = season_range(label)
+    if high > season_range(season_for_date(datetime.now()))[0]:
+        raise ValueError(f"La temporada {label} no está cerrada")
+    if db._tx_depth or db.conn.in_transaction:
+        raise RuntimeError("No se puede archivar con una transacción abierta")
+    path = archive_path(db, label)
+    if not os.path.exists(os.path.dirname(path)): os.makedirs(os.path.dirname(path))
+    schema = _attach(db, label, path)
+    params = {"low": low, "high": high}
+    moved = {}
+    # En WAL una transacción que escribe en varias bases adjuntas no es atómica en conjunto: cada
+    # fase escribe en un solo fichero. Primero se copia al archivo y se confirma; si algo falla
+    # después, las filas siguen en la principal y basta con volver a archivar (INSERT OR REPLACE)
+    with db.transaction():
+        _create_archive_tables(db, schema)
+        for table, condition in ARCHIVED_TABLES:
+            cols = ", ".join(row[1] for row in db.conn.execute(f"PRAGMA main.table_info({table})"))
+            moved[table] = db.conn.execute(f"INSERT OR REPLACE INTO {schema}.{table} ({cols}) SELECT {cols} FROM main.{table} WHERE {condition}", params).rowcount
+    for table, condition in ARCHIVED_TABLES:
+        cols = ", ".join(row[1] for row in db.conn.execute(f"PRAGMA main.table_info({table})"))
+        missing = db.conn.execute(f"SELECT COUNT(*) FROM (SELECT {cols} FROM main.{table} WHERE {condition} EXCEPT SELECT {cols} FROM {schema}.{table})", params).fetchone()[0]
+        if missing:
+            raise RuntimeError(f"El archivo de la temporada {label} no tiene {missing} filas de {table}; no se borra nada de la base de datos principal")
+    # Segunda fase, solo en la principal: borrar lo ya archivado y registrar el archivo
+    with db.transaction():
+        # Los triggers restan las estadísticas borradas de player_season_totals; los totales de la temporada se conservan
+        totals = db.conn.execute("SELECT * FROM player_season_totals WHERE season = ?", (label,)).fetchall()
+        for table, condition in reversed(ARCHIVED_TABLES):
+            db.conn.execute(f"DELETE FROM main.{table} WHERE {condition}", params)
+        db.conn.execute("DELETE FROM player_season_totals WHERE season = ?", (label,))
+        if totals:
+            db.conn.executemany(f"INSERT INTO player_season_totals VALUES ({', '.join('?' for _ in totals[0])})", totals)
+        db.conn.execute("INSERT OR REPLACE INTO season_archives (season, file_name, archived_at, trainings, matches, callups) VALUES (?, ?, ?, ?, ?, ?)",
+                        (label, os.path.basename(path), datetime.now().strftime("%Y-%m-%d %H:%M:%S"), moved["trainings"], moved["matches"], moved["match_callups"]))
+    db._history_views = False
+    db.clear_entity_cache()
+    # Las vistas history_* se rehacen ya, fuera de transacción, con la temporada recién archivada
+    attach_archives(db)
+    return moved
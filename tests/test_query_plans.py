@@ -0,0 +1,107 @@
+"""Comprueba con EXPLAIN QUERY PLAN que las consultas de calendario, temporada y relaciones usan índices.
+
+Cada prueba ejecuta el método real de Database y analiza las sentencias que llegan a SQLite
+(set_trace_callback), así que la prueba sigue la consulta aunque cambie su texto.
+"""
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+# Tablas grandes que nunca deben recorrerse enteras en estas consultas
+LARGE_TABLES = ("matches", "player_match_stats", "trainings", "training_attendance", "exercises",
+                "callup_players", "career_history", "injuries")
+
+
+@pytest.fixture
+def db():
+    database = Database(":memory:")
+    yield database
+    database.conn.close()
+
+
+def query_plans(db, call):
+    """Ejecuta `call()` y devuelve [(sql, [detalle del plan, ...])] de cada SELECT ejecutado."""
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        db.conn.set_trace_callback(None)
+    selects = [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+    return [(sql, [row[3] for row in db.conn.execute(f"EXPLAIN QUERY PLAN {sql}")]) for sql in selects]
+
+
+def scanned_tables(sql, plan):
+    """Tablas que el plan recorre enteras (SCAN), resolviendo los alias de la consulta."""
+    aliases = {alias: table for table, alias in re.findall(r"(?:FROM|JOIN)\s+(?:\w+\.)?(\w+)\s+(?:AS\s+)?(\w+)", sql, re.I)}
+    scanned = [re.match(r"SCAN (\w+)", detail) for detail in plan]
+    return {aliases.get(m.group(1), m.group(1)) for m in scanned if m}
+
+
+def assert_uses_index(db, call, index):
+    plans = query_plans(db, call)
+    assert plans, "no se ha ejecutado ninguna consulta"
+    details = [detail for _, plan in plans for detail in plan]
+    used = {m.group(1) for m in (re.search(r"USING (?:COVERING )?INDEX (\w+)", d) for d in details) if m}
+    assert index in used, details
+    for sql, plan in plans:
+        assert not scanned_tables(sql, plan) & set(LARGE_TABLES), plan
+
+
+# --- Calendario y temporada ---
+def test_matches_between_uses_date_index(db):
+    assert_uses_index(db, lambda: db.get_matches_between("2025-09-01", "2025-09-30"), "idx_matches_date")
+
+
+def test_matches_in_season_uses_date_index(db):
+    assert_uses_index(db, lambda: db.get_matches_in_season("2025/2026"), "idx_matches_date")
+
+
+def test_trainings_between_uses_date_index(db):
+    assert_uses_index(db, lambda: db.get_trainings_between("2025-09-01", "2025-09-30"), "idx_trainings_date")
+
+
+def test_trainings_in_season_uses_date_index(db):
+    assert_uses_index(db, lambda: db.get_trainings_in_season("2025/2026"), "idx_trainings_date")
+
+
+# --- Relaciones ---
+def test_stats_for_match_uses_primary_key(db):
+    assert_uses_index(db, lambda: db.get_stats_for_match(1), "sqlite_autoindex_player_match_stats_1")
+
+
+def test_match_stats_report_uses_primary_key(db):
+    assert_uses_index(db, lambda: db.get_match_stats_report(1), "sqlite_autoindex_player_match_stats_1")
+
+
+def test_players_for_callup_uses_status_index(db):
+    assert_uses_index(db, lambda: db.get_players_for_callup(1, "Convocado"), "idx_callup_players_callup_status")
+
+
+def test_career_history_uses_player_index(db):
+    assert_uses_index(db, lambda: db.get_career_history_for_player(1), "idx_career_history_player")
+
+
+def test_injuries_use_player_date_index(db):
+    assert_uses_index(db, lambda: db.get_injuries_for_player(1), "idx_injuries_player_date")
+
+
+def test_exercises_by_training_uses_training_index(db):
+    assert_uses_index(db, lambda: db.get_exercises_by_training(1), "idx_exercises_training")
+
+
+# Al borrar un jugador o entrenador SQLite busca sus filas hijas por la clave foránea (ON DELETE
+# CASCADE); EXPLAIN QUERY PLAN no muestra esa búsqueda, así que se comprueba la consulta equivalente
+@pytest.mark.parametrize("table, column, index", [
+    ("player_match_stats", "player_id", "idx_player_match_stats_player"),
+    ("training_attendance", "player_id", "idx_training_attendance_player"),
+    ("callup_coaches", "coach_id", "idx_callup_coaches_coach"),
+])
+def test_foreign_key_child_lookup_uses_index(db, table, column, index):
+    assert_uses_index(db, lambda: db.conn.execute(f"SELECT rowid FROM {table} WHERE {column} = ?", (1,)).fetchall(), index)
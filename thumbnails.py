@@ -0,0 +1,84 @@
+"""Miniaturas de fotos e imágenes con caché en disco y en memoria.
+
+Cada imagen se reduce una sola vez a tamaños fijos (THUMBNAIL_SIZES) y se guarda en
+data/thumbnails con una clave que incluye ruta, fecha de modificación y tamaño del original: si
+se sustituye la foto, la clave cambia y la miniatura antigua se borra. Los JPEG se decodifican en
+modo draft, que ya reduce la imagen a 1/2, 1/4 u 1/8 al leerla. Encima hay un LRU acotado de
+PhotoImage, así que volver a seleccionar un jugador no decodifica nada.
+
+photo_thumbnail() crea objetos de Tk y solo debe llamarse desde el hilo de la interfaz.
+"""
+import glob
+import hashlib
+import os
+from collections import OrderedDict
+
+from PIL import Image, ImageTk
+
+THUMBNAIL_SIZES = (50, 150, 300)
+THUMBNAIL_DIR = os.path.join("data", "thumbnails")
+MEMORY_CACHE_ITEMS = 128
+
+_photo_cache = OrderedDict()
+
+def _keys(path):
+    """(clave de la ruta, clave de la versión del archivo) para nombrar las miniaturas."""
+    stat = os.stat(path)
+    path_key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    version_key = hashlib.sha1(f"{stat.st_mtime_ns}:{stat.st_size}".encode('ascii')).hexdigest()[:8]
+    return path_key, version_key
+
+def _bucket(box):
+    longest = max(box)
+    return next((size for size in THUMBNAIL_SIZES if size >= longest), THUMBNAIL_SIZES[-1])
+
+def _create(path, bucket, base):
+    """Genera la miniatura y la guarda como base.png (con transparencia) o base.jpg."""
+    with Image.open(path) as img:
+        # Solo JPEG: decodifica directamente a la escala más pequeña que sigue siendo >= bucket
+        if img.format == 'JPEG': img.draft('RGB', (bucket, bucket))
+        img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        img.thumbnail((bucket, bucket), Image.LANCZOS)
+    if not os.path.exists(THUMBNAIL_DIR): os.makedirs(THUMBNAIL_DIR)
+    fmt, ext = ('PNG', 'png') if img.mode == 'RGBA' else ('JPEG', 'jpg')
+    target = f"{base}.{ext}"
+    tmp_path = target + ".tmp"
+    img.save(tmp_path, format=fmt, quality=90)
+    os.replace(tmp_path, target)
+    return img
+
+def load_thumbnail(path, box):
+    """Imagen PIL que cabe en `box` (ancho, alto), leída de la caché en disco o generada la primera vez."""
+    bucket = _bucket(box)
+    path_key, version_key = _keys(path)
+    prefix = os.path.join(THUMBNAIL_DIR, f"{path_key}_")
+    img = None
+    for ext in ('jpg', 'png'):
+        cached = f"{prefix}{version_key}_{bucket}.{ext}"
+        if os.path.exists(cached):
+            try:
+                with Image.open(cached) as f: img = f.copy()
+                break
+            except OSError as e:
+                print(f"Aviso: miniatura dañada, se vuelve a generar ({e})")
+    if img is None:
+        # Miniaturas de versiones anteriores del mismo archivo
+        for old in glob.glob(glob.escape(prefix) + "*"):
+            if not os.path.basename(old).startswith(f"{path_key}_{version_key}_"):
+                try: os.remove(old)
+                except OSError: pass
+        img = _create(path, bucket, f"{prefix}{version_key}_{bucket}")
+    if img.width > box[0] or img.height > box[1]: img.thumbnail(box, Image.LANCZOS)
+    return img
+
+def photo_thumbnail(path, box):
+    """PhotoImage de la miniatura, reutilizando las últimas MEMORY_CACHE_ITEMS creadas."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, tuple(box))
+    if key in _photo_cache:
+        _photo_cache.move_to_end(key)
+        return _photo_cache[key]
+    photo = ImageTk.PhotoImage(load_thumbnail(path, box))
+    _photo_cache[key] = photo
+    if len(_photo_cache) > MEMORY_CACHE_ITEMS: _photo_cache.popitem(last=False)
+    return photo
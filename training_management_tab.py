@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
-from PIL import Image, ImageTk
+from thumbnails import photo_thumbnail
+from date_utils import to_display_date
 import os
 import shutil
 import sys
@@ -65,7 +66,7 @@ class TrainingManagementTab:
         for item in self.trainings_tree.get_children(): self.trainings_tree.delete(item)
         for training in self.db.get_all_trainings():
             iid = training[0]
-            self.trainings_tree.insert("", tk.END, values=(iid, training[1], training[2], training[3]), iid=iid)
+            self.trainings_tree.insert("", tk.END, values=(iid, to_display_date(training[1]), training[2], training[3]), iid=iid)
             if iid == selected_id:
                 self.trainings_tree.selection_set(iid)
 
@@ -121,7 +122,7 @@ class TrainingDetailsFrame(ttk.Frame):
         training = self.db.get_training_by_id(training_id)
         if training:
             tid, date, meso, sess, coach, assist, mat = training
-            self.labels["Fecha"].config(text=date); self.labels["Mesociclo"].config(text=meso); self.labels["Nº Sesión"].config(text=str(sess))
+            self.labels["Fecha"].config(text=to_display_date(date)); self.labels["Mesociclo"].config(text=meso); self.labels["Nº Sesión"].config(text=str(sess))
             self.labels["Entrenador"].config(text=coach); self.labels["Asistente"].config(text=assist)
             self.material_text.config(state="normal"); self.material_text.delete("1.0", tk.END); self.material_text.insert("1.0", mat or ""); self.material_text.config(state="disabled")
     
@@ -179,7 +180,8 @@ class AttendanceFrame(ttk.Frame):
         if not selected_items: return
         active_tab_index = self.status_notebook.index(self.status_notebook.select())
         status = list(self.status_trees.keys())[active_tab_index]
-        for item_id in selected_items: self.db.set_player_attendance(self.training_id, int(item_id), status)
+        with self.db.transaction():
+            for item_id in selected_items: self.db.set_player_attendance(self.training_id, int(item_id), status)
         self.load_attendance_data(self.training_id)
 
     def move_to_available(self):
@@ -188,7 +190,8 @@ class AttendanceFrame(ttk.Frame):
         active_tree = list(self.status_trees.values())[active_tab_index]
         selected_items = active_tree.selection()
         if not selected_items: return
-        for item_id in selected_items: self.db.remove_player_from_training(self.training_id, int(item_id))
+        with self.db.transaction():
+            for item_id in selected_items: self.db.remove_player_from_training(self.training_id, int(item_id))
         self.load_attendance_data(self.training_id)
 
 class ExercisesFrame(ttk.Frame):
@@ -263,7 +266,7 @@ class TrainingDialog(tk.Toplevel):
 
     def populate_form(self):
         tid, date, meso, sess, coach, assist, mat = self.training_data
-        self.entries["date"].insert(0, date); self.entries["mesocycle"].insert(0, meso); self.entries["session"].insert(0, str(sess))
+        self.entries["date"].insert(0, to_display_date(date)); self.entries["mesocycle"].insert(0, meso); self.entries["session"].insert(0, str(sess))
         self.entries["coach"].set(coach); self.entries["assistant"].set(assist); self.entries["material"].insert(0, mat)
 
     def save(self):
@@ -373,8 +376,7 @@ class ExerciseDetailsDialog(tk.Toplevel):
         try:
             full_path = resource_path(path)
             if os.path.exists(full_path):
-                img = Image.open(full_path); img.thumbnail((300, 200), Image.LANCZOS)
-                self.exercise_image = ImageTk.PhotoImage(img); self.image_label.config(image=self.exercise_image, text="")
+                self.exercise_image = photo_thumbnail(full_path, (300, 200)); self.image_label.config(image=self.exercise_image, text="")
             else: self.image_label.config(image='', text="Sin Imagen"); self.exercise_image = None
         except Exception as e:
             print(f"Error al cargar imagen: {e}"); self.image_label.config(image='', text="Error Imagen")
@@ -2,6 +2,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from tkcalendar import DateEntry
 from datetime import datetime
+from date_utils import to_display_date
+from virtual_list import PagedTreeview
 
 class TemplateManagerWindow(tk.Toplevel):
     """Ventana para Cargar y Eliminar plantillas."""
@@ -148,6 +150,7 @@ class TrainingsTab:
         for col in columns: self.trainings_tree.heading(col, text=col.capitalize())
         self.trainings_tree.column("id", width=40)
         self.trainings_tree.pack(fill="both", expand=True)
+        self.trainings_pager = PagedTreeview(self.trainings_tree, self.db.get_trainings_page, lambda t: t._replace(date=to_display_date(t.date)))
         
         bottom_frame = ttk.Frame(list_frame)
         bottom_frame.pack(fill="x", pady=5)
@@ -231,9 +234,7 @@ class TrainingsTab:
             messagebox.showwarning("Campos Requeridos", "Debe rellenar los campos: Fecha, Mesociclo y Nº Sesión.")
 
     def load_trainings(self):
-        for item in self.trainings_tree.get_children(): self.trainings_tree.delete(item)
-        for training in self.db.get_all_trainings():
-            self.trainings_tree.insert("", tk.END, values=training)
+        self.trainings_pager.reload()
     
     def get_selected_training_id(self):
         selected_items = self.trainings_tree.selection()
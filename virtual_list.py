@@ -0,0 +1,56 @@
+"""Carga por páginas para los Treeview de listas largas.
+
+PagedTreeview envuelve un ttk.Treeview ya creado: al recargar solo inserta la primera página y va
+pidiendo las siguientes (con las consultas get_*_page de Database, paginadas por clave) cuando el
+usuario se acerca al final de la lista. Así el tiempo de refresco no crece con el historial.
+"""
+from database import PAGE_SIZE
+
+class PagedTreeview:
+    def __init__(self, tree, fetch_page, row_values, row_iid=None, page_size=PAGE_SIZE, threshold=0.9):
+        """`fetch_page(after, limit)` devuelve los registros siguientes a `after` (None = primera página).
+
+        `row_values(registro)` da los valores de la fila y `row_iid(registro)`, si se indica, su iid.
+        """
+        self.tree = tree
+        self.fetch_page = fetch_page
+        self.row_values = row_values
+        self.row_iid = row_iid
+        self.page_size = page_size
+        self.threshold = threshold
+        self._last = None
+        self._exhausted = True
+        self._pending = None
+        self._scroll_command = tree.cget("yscrollcommand")
+        tree.configure(yscrollcommand=self._on_yscroll)
+
+    def reload(self):
+        """Vacía la lista y carga la primera página."""
+        if self._pending: self.tree.after_cancel(self._pending); self._pending = None
+        self.tree.delete(*self.tree.get_children())
+        self._last = None
+        self._exhausted = False
+        self.load_more()
+
+    def load_more(self):
+        """Añade la siguiente página; devuelve False si ya no quedaban filas."""
+        self._pending = None
+        if self._exhausted: return False
+        rows = self.fetch_page(self._last, self.page_size)
+        for row in rows:
+            if self.row_iid: self.tree.insert("", "end", values=self.row_values(row), iid=self.row_iid(row))
+            else: self.tree.insert("", "end", values=self.row_values(row))
+        if rows: self._last = rows[-1]
+        self._exhausted = len(rows) < self.page_size
+        return bool(rows)
+
+    def ensure_loaded(self, iid):
+        """Carga páginas hasta que aparezca la fila `iid` (p. ej. para seleccionarla tras guardar)."""
+        while not self.tree.exists(iid) and self.load_more(): pass
+        return self.tree.exists(iid)
+
+    def _on_yscroll(self, first, last):
+        if self._scroll_command: self.tree.tk.call(*self.tree.tk.splitlist(self._scroll_command), first, last)
+        # Tk avisa cada vez que cambia la vista; también al insertar, así que la lista se llena hasta cubrir la altura visible
+        if float(last) >= self.threshold and not self._exhausted and not self._pending:
+            self._pending = self.tree.after_idle(self.load_more)